@@ -1,13 +1,7 @@
-import pandas as pd
-from pathlib import Path
+from ingest import ingest_tables, print_report
 
-raw_path = Path("data/raw/") / "diabetic_data.csv"
-output_path = Path("data/processed/")
-output_path.mkdir(parents=True, exist_ok=True)
-
-print("Reading CSV...")
-df = pd.read_csv(raw_path)
-
-print("Writing Parquet...")
-df.to_parquet(output_path / "uci_diabetes.parquet", index=False)
-print("Done.")
+# Streams diabetic_data.csv through pyarrow with an explicit schema (see ingest.py)
+if __name__ == "__main__":
+    print("Converting CSV to Parquet...")
+    print_report(ingest_tables(["uci"]))
+    print("Done.")
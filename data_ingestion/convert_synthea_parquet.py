@@ -1,15 +1,9 @@
-import pandas as pd
-from pathlib import Path
-
-input_dir = Path("data/raw/Synthea/")
-output_dir = Path("data/processed/synthea")
-output_dir.mkdir(parents=True, exist_ok=True)
-
-files = ["patients", "encounters", "conditions"]
-
-for fname in files:
-    print(f"Processing {fname}.csv...")
-    df = pd.read_csv(input_dir / f"{fname}.csv")
-    df.to_parquet(output_dir / f"{fname}.parquet", index=False)
-
-print("✅ All Synthea files converted to Parquet.")
+from ingest import SYNTHEA_TABLES, ingest_tables, print_report
+
+# Streams each CSV through pyarrow with explicit schemas (see ingest.py);
+# use `python data_ingestion/ingest.py --partition` for year-partitioned output
+if __name__ == "__main__":
+    print(f"Processing {', '.join(f'{t}.csv' for t in SYNTHEA_TABLES)}...")
+    results = ingest_tables(SYNTHEA_TABLES, workers=len(SYNTHEA_TABLES))
+    print_report(results)
+    print("✅ All Synthea files converted to Parquet.")
@@ -0,0 +1,271 @@
+"""
+Streaming CSV -> Parquet ingestion for the Synthea and UCI sources.
+
+Each CSV is read block by block with pyarrow's streaming reader against an
+explicit schema (timestamps/dates parsed, ids and codes as integers,
+low-cardinality text dictionary-encoded; unknown columns stay strings), so
+memory is bounded by the block size instead of the file size. Output is
+zstd-compressed Parquet with fixed-size row groups, optionally hive-partitioned
+(e.g. encounters by START year). Tables are converted in parallel, one process
+each, and every file reports rows/s and peak RSS.
+
+Run from the project root:
+    python data_ingestion/ingest.py
+    python data_ingestion/ingest.py --tables encounters --partition --workers 2
+"""
+import argparse
+import csv
+import resource
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.csv as pv
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+
+project_root = Path(__file__).parent.parent
+RAW_DIR = project_root / "data" / "raw"
+PROCESSED_DIR = project_root / "data" / "processed"
+
+DICT = pa.dictionary(pa.int32(), pa.string())
+TIMESTAMP = pa.timestamp("s")
+
+# Per-table layout. `types` pins known columns; `casts` converts some of them
+# after parsing (see CastingReader); `dictionary` lists the text columns to
+# dictionary-encode (True = every column not in `types`); `partition` is
+# (column, "year") and only applies with --partition.
+SOURCES = {
+    "patients": {
+        "csv": RAW_DIR / "Synthea" / "patients.csv",
+        "output": PROCESSED_DIR / "synthea" / "patients",
+        "types": {
+            "BIRTHDATE": pa.date32(), "DEATHDATE": pa.date32(),
+            "LAT": pa.float64(), "LON": pa.float64(),
+            "HEALTHCARE_EXPENSES": pa.float64(), "HEALTHCARE_COVERAGE": pa.float64(),
+            "INCOME": pa.int64(),
+        },
+        "dictionary": ["MARITAL", "RACE", "ETHNICITY", "GENDER", "BIRTHPLACE", "CITY", "STATE", "COUNTY",
+                       "PREFIX", "SUFFIX"],
+    },
+    "encounters": {
+        "csv": RAW_DIR / "Synthea" / "encounters.csv",
+        "output": PROCESSED_DIR / "synthea" / "encounters",
+        "types": {
+            "START": TIMESTAMP, "STOP": TIMESTAMP,
+            "CODE": pa.int64(), "REASONCODE": pa.float64(),
+            "BASE_ENCOUNTER_COST": pa.float64(), "TOTAL_CLAIM_COST": pa.float64(),
+            "PAYER_COVERAGE": pa.float64(),
+        },
+        # Empty for encounters without a reason, so the CSV writer emits it as a float ("7631.0")
+        "casts": {"REASONCODE": pa.int64()},
+        "dictionary": ["ORGANIZATION", "PROVIDER", "PAYER", "ENCOUNTERCLASS", "DESCRIPTION",
+                       "REASONDESCRIPTION"],
+        "partition": ("START", "year"),
+    },
+    "conditions": {
+        "csv": RAW_DIR / "Synthea" / "conditions.csv",
+        "output": PROCESSED_DIR / "synthea" / "conditions",
+        "types": {"START": pa.date32(), "STOP": pa.date32(), "CODE": pa.int64()},
+        "dictionary": ["SYSTEM", "DESCRIPTION"],
+        "partition": ("START", "year"),
+    },
+    "uci": {
+        "csv": RAW_DIR / "diabetic_data.csv",
+        "output": PROCESSED_DIR / "uci_diabetes",
+        "types": {name: pa.int64() for name in [
+            "encounter_id", "patient_nbr", "admission_type_id", "discharge_disposition_id",
+            "admission_source_id", "time_in_hospital", "num_lab_procedures", "num_procedures",
+            "num_medications", "number_outpatient", "number_emergency", "number_inpatient",
+            "number_diagnoses",
+        ]},
+        # Everything else is a coded category ("?" marks missing, kept as-is)
+        "dictionary": True,
+    },
+}
+
+SYNTHEA_TABLES = ["patients", "encounters", "conditions"]
+
+
+def peak_rss_mb() -> float:
+    """Peak resident set size of this process (ru_maxrss is KB on Linux, bytes on macOS)."""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def read_header(path: Path) -> list:
+    with open(path, newline="") as f:
+        return next(csv.reader(f))
+
+
+def build_schema(spec: dict, columns: list) -> dict:
+    """Column types for every column in the file, in file order."""
+    types = {}
+    for name in columns:
+        if name in spec["types"]:
+            types[name] = spec["types"][name]
+        elif spec.get("dictionary") is True or name in spec.get("dictionary", ()):
+            types[name] = DICT
+        else:
+            types[name] = pa.string()
+    return types
+
+
+def open_reader(path: Path, column_types: dict, block_size: int) -> pv.CSVStreamingReader:
+    return pv.open_csv(
+        path,
+        read_options=pv.ReadOptions(block_size=block_size),
+        convert_options=pv.ConvertOptions(
+            column_types=column_types,
+            # Empty fields become nulls for text too, as pd.read_csv did
+            strings_can_be_null=True,
+            # Synthea writes UTC timestamps with a trailing Z
+            timestamp_parsers=[pv.ISO8601, "%Y-%m-%dT%H:%M:%SZ"],
+        ),
+    )
+
+
+class CastingReader:
+    """
+    A CSV streaming reader whose batches have `casts` applied: columns the CSV
+    parser can't read as their final type, e.g. integer codes written as
+    "7631.0". Casts are safe, so nulls stay null and a fractional code raises.
+    """
+
+    def __init__(self, reader: pv.CSVStreamingReader, casts: dict):
+        self.reader = reader
+        self.casts = casts
+        self.schema = pa.schema([field.with_type(casts.get(field.name, field.type)) for field in reader.schema])
+
+    def __iter__(self):
+        for batch in self.reader:
+            columns = [pc.cast(column, self.schema.field(name).type) if name in self.casts else column
+                       for name, column in zip(batch.schema.names, batch.columns)]
+            yield pa.RecordBatch.from_arrays(columns, schema=self.schema)
+
+
+def write_single(reader, output: Path, row_group_size: int) -> int:
+    """Stream into one Parquet file, buffering batches into full row groups."""
+    output.parent.mkdir(parents=True, exist_ok=True)
+    rows = 0
+    pending, pending_rows = [], 0
+    with pq.ParquetWriter(output, reader.schema, compression="zstd") as writer:
+        for batch in reader:
+            pending.append(batch)
+            pending_rows += batch.num_rows
+            if pending_rows >= row_group_size:
+                writer.write_table(pa.Table.from_batches(pending, reader.schema), row_group_size=row_group_size)
+                rows += pending_rows
+                pending, pending_rows = [], 0
+        if pending:
+            writer.write_table(pa.Table.from_batches(pending, reader.schema), row_group_size=row_group_size)
+            rows += pending_rows
+    return rows
+
+
+def write_partitioned(reader, output: Path, row_group_size: int, partition: tuple) -> int:
+    """Stream into a hive-partitioned directory, e.g. encounters/START_year=2019/part-0.parquet."""
+    column, unit = partition
+    key = f"{column}_{unit}"
+    schema = reader.schema.append(pa.field(key, pa.int32()))
+    rows = 0
+
+    def batches():
+        nonlocal rows
+        for batch in reader:
+            rows += batch.num_rows
+            values = pc.cast(getattr(pc, unit)(batch.column(column)), pa.int32())
+            yield pa.RecordBatch.from_arrays([*batch.columns, values], schema=schema)
+
+    ds.write_dataset(
+        batches(),
+        output,
+        schema=schema,
+        format="parquet",
+        partitioning=ds.partitioning(pa.schema([(key, pa.int32())]), flavor="hive"),
+        file_options=ds.ParquetFileFormat().make_write_options(compression="zstd"),
+        min_rows_per_group=row_group_size,
+        max_rows_per_group=row_group_size,
+        existing_data_behavior="delete_matching",
+    )
+    return rows
+
+
+def ingest_table(name: str, partition: bool = False, row_group_size: int = 128_000,
+                 block_size: int = 16 << 20) -> dict:
+    """Convert one source table; returns its stats."""
+    spec = SOURCES[name]
+    source = Path(spec["csv"])
+    start = time.perf_counter()
+    reader = open_reader(source, build_schema(spec, read_header(source)), block_size)
+    if spec.get("casts"):
+        reader = CastingReader(reader, spec["casts"])
+
+    if partition and spec.get("partition"):
+        output = Path(spec["output"])
+        rows = write_partitioned(reader, output, row_group_size, spec["partition"])
+        size = sum(f.stat().st_size for f in output.rglob("*.parquet"))
+    else:
+        output = Path(spec["output"]).with_suffix(".parquet")
+        rows = write_single(reader, output, row_group_size)
+        size = output.stat().st_size
+
+    elapsed = time.perf_counter() - start
+    return {
+        "table": name,
+        "rows": rows,
+        "seconds": round(elapsed, 2),
+        "rows_per_s": round(rows / elapsed) if elapsed else 0,
+        "peak_rss_mb": round(peak_rss_mb(), 1),
+        "csv_mb": round(source.stat().st_size / 1e6, 1),
+        "parquet_mb": round(size / 1e6, 1),
+        "output": str(output),
+    }
+
+
+def ingest_tables(tables: list, workers: int = 1, **kwargs) -> list:
+    """
+    Convert `tables`, in parallel when workers > 1. Each table gets a fresh
+    process so its peak RSS is measured on its own.
+    """
+    found = []
+    for table in tables:
+        if SOURCES[table]["csv"].exists():
+            found.append(table)
+        else:
+            print(f"❌ Skipping {table}: {SOURCES[table]['csv']} not found")
+    if not found:
+        return []
+
+    with ProcessPoolExecutor(max_workers=max(1, min(workers, len(found))), max_tasks_per_child=1) as pool:
+        futures = [pool.submit(ingest_table, table, **kwargs) for table in found]
+        return [future.result() for future in futures]
+
+
+def print_report(results: list):
+    print(f"\n{'table':<12}{'rows':>12}{'sec':>8}{'rows/s':>12}{'peak RSS MB':>13}{'csv MB':>9}{'parquet MB':>12}")
+    for r in results:
+        print(f"{r['table']:<12}{r['rows']:>12,}{r['seconds']:>8.2f}{r['rows_per_s']:>12,}"
+              f"{r['peak_rss_mb']:>13.1f}{r['csv_mb']:>9.1f}{r['parquet_mb']:>12.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Stream raw CSVs into typed, compressed Parquet.")
+    parser.add_argument("--tables", nargs="+", default=SYNTHEA_TABLES, choices=list(SOURCES))
+    parser.add_argument("--partition", action="store_true",
+                        help="Hive-partition tables that define a partition column (encounters/conditions by START year)")
+    parser.add_argument("--row-group-size", type=int, default=128_000)
+    parser.add_argument("--block-size-mb", type=int, default=16, help="CSV read block size")
+    parser.add_argument("--workers", type=int, default=3, help="Tables converted in parallel")
+    args = parser.parse_args()
+
+    results = ingest_tables(args.tables, workers=args.workers, partition=args.partition,
+                            row_group_size=args.row_group_size, block_size=args.block_size_mb << 20)
+    print_report(results)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,312 @@
+"""
+Skip-unchanged, concurrent sync of processed data and model artifacts to S3.
+
+Every local file gets the ETag S3 would assign it (MD5, or the multipart
+MD5-of-MD5s for the part size used below) and is compared with the object
+already in the bucket; only new or changed files are uploaded, several at a
+time, each as a parallel multipart transfer. Hashes are cached in a local
+manifest keyed on size + mtime so unchanged files are not re-read, and
+--manifest-only skips the remote HEAD requests entirely.
+
+Models are published in the layout the API's registry polls
+(MODEL_REGISTRY_URI=s3://<bucket>/models, see readmission_api/api/registry.py):
+ml/models/ goes to models/<version>/, then models/LATEST is set to <version>
+once every file is up, so the API never loads a half-uploaded version. The
+version defaults to the newest file's mtime plus a fingerprint of the files,
+so an unchanged model directory maps to the same version and uploads nothing.
+
+Run from anywhere:
+    python data_ingestion/s3_sync.py                   # everything
+    python data_ingestion/s3_sync.py --sets features models --dry-run
+    python data_ingestion/s3_sync.py --sets models --model-version 2025-10-18
+"""
+import argparse
+import hashlib
+import json
+import os
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import boto3
+from boto3.exceptions import S3UploadFailedError
+from boto3.s3.transfer import TransferConfig
+from botocore.config import Config
+from botocore.exceptions import BotoCoreError, ClientError
+from dotenv import load_dotenv
+
+TRANSFER_ERRORS = (BotoCoreError, ClientError, S3UploadFailedError)
+
+project_root = Path(__file__).parent.parent
+PROCESSED_DIR = project_root / "data" / "processed"
+MODEL_DIR = project_root / "readmission_api" / "ml" / "models"
+MANIFEST_PATH = project_root / ".s3_sync_manifest.json"
+
+MB = 1024 * 1024
+MULTIPART_THRESHOLD = 16 * MB
+MULTIPART_CHUNKSIZE = 16 * MB
+MAX_PARTS = 10000  # S3 limit; s3transfer doubles the part size to stay under it
+
+# Local directory -> key prefix; every file below it is synced
+# (models: below <prefix>/<version>/, with <prefix>/LATEST naming the version)
+ARTIFACT_SETS = {
+    "synthea": (PROCESSED_DIR / "synthea", "processed/synthea"),
+    "uci": (PROCESSED_DIR / "uci_diabetes.parquet", "processed/uci_diabetes.parquet"),
+    "features": (PROCESSED_DIR / "fct_patient_features.parquet", "processed/fct_patient_features.parquet"),
+    "models": (MODEL_DIR, "models"),
+}
+
+
+LATEST = "LATEST"
+
+
+def model_version(model_dir: Path) -> str:
+    """<newest mtime, UTC>-<fingerprint of file names, sizes and mtimes>: sorts by age, stable while unchanged."""
+    digest = hashlib.sha1()
+    newest = 0
+    for path in sorted(model_dir.rglob("*")):
+        if path.is_file() and not path.name.startswith("."):
+            stat = path.stat()
+            newest = max(newest, stat.st_mtime_ns)
+            digest.update(f"{path.relative_to(model_dir).as_posix()}:{stat.st_size}:{stat.st_mtime_ns};".encode())
+    return f"{time.strftime('%Y%m%dT%H%M%S', time.gmtime(newest / 1e9))}-{digest.hexdigest()[:8]}"
+
+
+def collect_artifacts(sets: list, version: str = None) -> list:
+    """(local path, S3 key) for every file in the selected sets; models under `version`."""
+    artifacts = []
+    for name in sets:
+        source, prefix = ARTIFACT_SETS[name]
+        if name == "models":
+            prefix = f"{prefix}/{version}"
+        if source.is_file():
+            artifacts.append((source, prefix))
+        elif source.is_dir():
+            for path in sorted(source.rglob("*")):
+                if path.is_file() and not path.name.startswith("."):
+                    artifacts.append((path, f"{prefix}/{path.relative_to(source).as_posix()}"))
+        else:
+            print(f"❌ {name}: {source} not found")
+    return artifacts
+
+
+def part_size(size: int, chunksize: int = MULTIPART_CHUNKSIZE) -> int:
+    while size > chunksize * MAX_PARTS:
+        chunksize *= 2
+    return chunksize
+
+
+def local_etag(path: Path, size: int) -> str:
+    """The ETag S3 reports for this file when uploaded with the multipart settings above."""
+    if size < MULTIPART_THRESHOLD:
+        digest = hashlib.md5()
+        with open(path, "rb") as f:
+            for block in iter(lambda: f.read(MB), b""):
+                digest.update(block)
+        return digest.hexdigest()
+
+    chunk = part_size(size)
+    part_digests = []
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(chunk), b""):
+            part_digests.append(hashlib.md5(block).digest())
+    return f"{hashlib.md5(b''.join(part_digests)).hexdigest()}-{len(part_digests)}"
+
+
+def load_manifest(bucket: str) -> dict:
+    if MANIFEST_PATH.exists():
+        manifest = json.loads(MANIFEST_PATH.read_text())
+        if manifest.get("bucket") == bucket:
+            return manifest
+    return {"bucket": bucket, "files": {}}
+
+
+def save_manifest(manifest: dict):
+    tmp = MANIFEST_PATH.with_suffix(".tmp")
+    tmp.write_text(json.dumps(manifest, indent=2, sort_keys=True))
+    tmp.replace(MANIFEST_PATH)
+
+
+class S3Sync:
+    def __init__(self, bucket: str, s3=None, workers: int = 4, part_concurrency: int = 8,
+                 max_attempts: int = 4, manifest_only: bool = False, dry_run: bool = False):
+        self.bucket = bucket
+        self.workers = workers
+        self.max_attempts = max_attempts
+        self.manifest_only = manifest_only
+        self.dry_run = dry_run
+        self.transfer_config = TransferConfig(
+            multipart_threshold=MULTIPART_THRESHOLD,
+            multipart_chunksize=MULTIPART_CHUNKSIZE,
+            max_concurrency=part_concurrency,
+            use_threads=True,
+        )
+        self.s3 = s3 or boto3.client(
+            "s3",
+            aws_access_key_id=os.getenv("AWS_ACCESS_KEY_ID"),
+            aws_secret_access_key=os.getenv("AWS_SECRET_ACCESS_KEY"),
+            region_name=os.getenv("AWS_REGION"),
+            endpoint_url=os.getenv("S3_ENDPOINT_URL"),
+            # Enough connections for every file's parts; botocore retries throttling/5xx per request
+            config=Config(max_pool_connections=workers * part_concurrency,
+                          retries={"max_attempts": max_attempts, "mode": "adaptive"}),
+        )
+        self.manifest = load_manifest(bucket)
+        self._lock = threading.Lock()
+
+    def sync(self, artifacts: list) -> dict:
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            results = list(pool.map(lambda item: self.sync_file(*item), artifacts))
+        summary = summarize(results, time.perf_counter() - start, self.manifest.get("upload_mb_per_s"))
+        if not self.dry_run:
+            if summary["bytes_uploaded"] >= MULTIPART_THRESHOLD:
+                # Remembered so runs that upload nothing can still estimate what they saved
+                self.manifest["upload_mb_per_s"] = summary["upload_mb_per_s"]
+            save_manifest(self.manifest)
+        return summary
+
+    def publish(self, prefix: str, version: str):
+        """Point <prefix>/LATEST at an uploaded version (the API swaps it in on its next poll)."""
+        if self.dry_run:
+            print(f"Would publish {prefix}/{version}")
+            return
+        self.s3.put_object(Bucket=self.bucket, Key=f"{prefix}/{LATEST}", Body=version.encode())
+        print(f"✅ {prefix}/{LATEST} -> {version}")
+
+    def sync_file(self, path: Path, key: str) -> dict:
+        stat = path.stat()
+        etag = self._etag(path, key, stat)
+        result = {"key": key, "bytes": stat.st_size, "seconds": 0.0, "retries": 0}
+
+        try:
+            if self._is_current(key, etag):
+                result["status"] = "skipped"
+            elif self.dry_run:
+                result["status"] = "would_upload"
+            else:
+                result["seconds"], result["retries"] = self._upload(path, key, etag)
+                result["status"] = "uploaded"
+        except TRANSFER_ERRORS as e:
+            with self._lock:
+                print(f"❌ Error uploading {key}: {e}")
+            result["status"] = "failed"
+            result["retries"] = getattr(e, "retries", 0)
+            return result
+
+        with self._lock:
+            entry = self.manifest["files"].setdefault(key, {})
+            entry.update({"size": stat.st_size, "mtime_ns": stat.st_mtime_ns, "etag": etag})
+            if result["status"] in ("skipped", "uploaded"):
+                entry["remote_etag"] = etag
+            print(f"✅ {key}: {result['status']}")
+        return result
+
+    def _etag(self, path: Path, key: str, stat) -> str:
+        entry = self.manifest["files"].get(key)
+        if entry and entry.get("size") == stat.st_size and entry.get("mtime_ns") == stat.st_mtime_ns:
+            return entry["etag"]
+        return local_etag(path, stat.st_size)
+
+    def _is_current(self, key: str, etag: str) -> bool:
+        if self.manifest_only:
+            entry = self.manifest["files"].get(key, {})
+            return entry.get("remote_etag") == etag
+        try:
+            head = self.s3.head_object(Bucket=self.bucket, Key=key)
+        except ClientError as e:
+            if e.response["Error"]["Code"] in ("404", "NoSuchKey", "NotFound"):
+                return False
+            raise
+        # SSE-KMS ETags are not MD5s, so uploads also record the local ETag as metadata
+        remote = {head["ETag"].strip('"'), head.get("Metadata", {}).get("local-etag")}
+        return etag in remote
+
+    def _upload(self, path: Path, key: str, etag: str) -> tuple:
+        """
+        Upload with backoff on top of botocore's per-request retries; returns
+        (seconds, retries). The error of the last attempt carries `retries` too.
+        """
+        for attempt in range(self.max_attempts):
+            start = time.perf_counter()
+            try:
+                self.s3.upload_file(str(path), self.bucket, key, Config=self.transfer_config,
+                                    ExtraArgs={"Metadata": {"local-etag": etag}})
+                return time.perf_counter() - start, attempt
+            except TRANSFER_ERRORS as e:
+                if attempt + 1 == self.max_attempts:
+                    e.retries = attempt
+                    raise
+                delay = min(30, 2 ** attempt) * (0.5 + random.random())
+                print(f"⚠️  {key}: {e}; retrying in {delay:.1f}s")
+                time.sleep(delay)
+
+
+def summarize(results: list, elapsed: float, known_mb_per_s: float = None) -> dict:
+    by_status = {}
+    for r in results:
+        by_status.setdefault(r["status"], []).append(r)
+    uploaded = by_status.get("uploaded", [])
+    skipped = by_status.get("skipped", [])
+    bytes_uploaded = sum(r["bytes"] for r in uploaded)
+    bytes_skipped = sum(r["bytes"] for r in skipped)
+    upload_seconds = sum(r["seconds"] for r in uploaded)
+    throughput = bytes_uploaded / upload_seconds if upload_seconds else None
+    estimate = throughput if bytes_uploaded >= MULTIPART_THRESHOLD or not known_mb_per_s else known_mb_per_s * MB
+    return {
+        "files": len(results),
+        **{status: len(items) for status, items in by_status.items()},
+        "retries": sum(r["retries"] for r in results),
+        "bytes_uploaded": bytes_uploaded,
+        "bytes_skipped": bytes_skipped,
+        "seconds": round(elapsed, 2),
+        "upload_mb_per_s": round(throughput / MB, 1) if throughput else None,
+        # What re-uploading the skipped files would have cost at the observed throughput
+        "est_seconds_saved": round(bytes_skipped / estimate, 1) if estimate else None,
+    }
+
+
+def print_summary(summary: dict):
+    counts = f"{summary.get('uploaded', 0)} uploaded, {summary.get('skipped', 0)} unchanged, {summary.get('failed', 0)} failed"
+    if "would_upload" in summary:
+        counts += f", {summary['would_upload']} to upload (dry run)"
+    print(f"\n{summary['files']} files: {counts}; {summary['retries']} retries")
+    saved = f", ~{summary['est_seconds_saved']}s saved" if summary["est_seconds_saved"] is not None else ""
+    print(f"{summary['bytes_uploaded'] / MB:.1f} MB uploaded, {summary['bytes_skipped'] / MB:.1f} MB skipped{saved} "
+          f"in {summary['seconds']:.2f}s")
+
+
+def sync_sets(sets: list, version: str = None, **kwargs) -> dict:
+    load_dotenv()
+    syncer = S3Sync(os.getenv("S3_BUCKET_NAME"), **kwargs)
+    source, prefix = ARTIFACT_SETS["models"]
+    version = version or (model_version(source) if "models" in sets and source.is_dir() else None)
+    summary = syncer.sync(collect_artifacts(sets, version))
+    print_summary(summary)
+    if version and not summary.get("failed"):
+        syncer.publish(prefix, version)
+    return summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Upload new or changed artifacts to S3.")
+    parser.add_argument("--sets", nargs="+", default=list(ARTIFACT_SETS), choices=list(ARTIFACT_SETS))
+    parser.add_argument("--workers", type=int, default=4, help="Files uploaded concurrently")
+    parser.add_argument("--part-concurrency", type=int, default=8, help="Parallel parts per multipart upload")
+    parser.add_argument("--max-attempts", type=int, default=4)
+    parser.add_argument("--manifest-only", action="store_true",
+                        help="Trust the local manifest instead of checking remote ETags")
+    parser.add_argument("--dry-run", action="store_true")
+    parser.add_argument("--model-version", help="Version the models are published as (default: fingerprint)")
+    args = parser.parse_args()
+
+    summary = sync_sets(args.sets, args.model_version, workers=args.workers, part_concurrency=args.part_concurrency,
+                        max_attempts=args.max_attempts, manifest_only=args.manifest_only, dry_run=args.dry_run)
+    if summary.get("failed"):
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
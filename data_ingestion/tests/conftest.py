@@ -0,0 +1,7 @@
+"""data_ingestion/ scripts import their siblings; so do the tests."""
+import sys
+from pathlib import Path
+
+INGESTION_DIR = Path(__file__).parent.parent
+if str(INGESTION_DIR) not in sys.path:
+    sys.path.insert(0, str(INGESTION_DIR))
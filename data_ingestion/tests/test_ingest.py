@@ -0,0 +1,50 @@
+"""CSV -> Parquet ingestion of Synthea encounters as the Synthea CSV writer formats them."""
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+import pytest
+
+import ingest
+
+# REASONCODE is empty when there is no reason, so the column is written as floats
+ENCOUNTERS_CSV = """\
+Id,START,STOP,PATIENT,ORGANIZATION,PROVIDER,PAYER,ENCOUNTERCLASS,CODE,DESCRIPTION,BASE_ENCOUNTER_COST,TOTAL_CLAIM_COST,PAYER_COVERAGE,REASONCODE,REASONDESCRIPTION
+e0,2016-07-15T06:00:00Z,2016-07-15T08:00:00Z,p1,org,prov,payer,wellness,295814,Encounter for problem,100.8,80.29,0.0,7631.0,Viral sinusitis (disorder)
+e1,2017-06-15T22:00:00Z,2017-06-17T13:00:00Z,p2,org,prov,payer,emergency,336843,General examination of patient,162.33,563.73,0.0,,
+e2,2017-05-10T20:00:00Z,2017-05-11T00:00:00Z,p1,org,prov,payer,outpatient,830325,Urgent care clinic,53.88,807.62,0.0,444814009.0,Viral sinusitis (disorder)
+"""
+
+
+@pytest.fixture
+def encounters(tmp_path, monkeypatch):
+    """SOURCES["encounters"] pointed at a CSV under tmp_path; returns a writer for its contents."""
+    csv = tmp_path / "encounters.csv"
+    spec = {**ingest.SOURCES["encounters"], "csv": csv, "output": tmp_path / "out" / "encounters"}
+    monkeypatch.setitem(ingest.SOURCES, "encounters", spec)
+    return csv.write_text
+
+
+def test_float_formatted_codes_become_integers(encounters):
+    encounters(ENCOUNTERS_CSV)
+    result = ingest.ingest_table("encounters")
+    table = pq.read_table(result["output"])
+    assert result["rows"] == 3
+    assert table.schema.field("REASONCODE").type == pa.int64()
+    assert table.column("REASONCODE").to_pylist() == [7631, None, 444814009]
+    assert table.column("CODE").to_pylist() == [295814, 336843, 830325]
+    assert pa.types.is_dictionary(table.schema.field("REASONDESCRIPTION").type)
+
+
+def test_partitioned_output_has_the_cast_type(encounters):
+    encounters(ENCOUNTERS_CSV)
+    result = ingest.ingest_table("encounters", partition=True)
+    table = ds.dataset(result["output"], partitioning="hive").to_table()
+    assert table.schema.field("REASONCODE").type == pa.int64()
+    assert sorted(table.column("START_year").to_pylist()) == [2016, 2017, 2017]
+    assert sorted(table.column("REASONCODE").drop_null().to_pylist()) == [7631, 444814009]
+
+
+def test_fractional_code_is_an_error(encounters):
+    encounters(ENCOUNTERS_CSV.replace("7631.0", "7631.5"))
+    with pytest.raises(pa.ArrowInvalid):
+        ingest.ingest_table("encounters")
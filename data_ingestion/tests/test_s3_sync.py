@@ -0,0 +1,202 @@
+"""S3Sync against moto's in-memory S3."""
+import json
+
+import boto3
+import pytest
+from boto3.exceptions import S3UploadFailedError
+
+import s3_sync
+from s3_sync import (MB, MULTIPART_CHUNKSIZE, MULTIPART_THRESHOLD, S3Sync, local_etag, model_version, part_size,
+                     summarize, sync_sets)
+
+moto = pytest.importorskip("moto")
+
+BUCKET = "readmission-test"
+
+
+@pytest.fixture
+def s3(monkeypatch, tmp_path):
+    """A moto S3 client with the bucket created; the manifest lives under tmp_path."""
+    for name, value in {"AWS_ACCESS_KEY_ID": "testing", "AWS_SECRET_ACCESS_KEY": "testing",
+                        "AWS_SESSION_TOKEN": "testing", "AWS_DEFAULT_REGION": "us-east-1"}.items():
+        monkeypatch.setenv(name, value)
+    monkeypatch.setattr(s3_sync, "MANIFEST_PATH", tmp_path / "manifest.json")
+    monkeypatch.setattr(s3_sync.time, "sleep", lambda seconds: None)
+    with moto.mock_aws():
+        client = boto3.client("s3", region_name="us-east-1")
+        client.create_bucket(Bucket=BUCKET)
+        yield client
+
+
+@pytest.fixture
+def artifacts(tmp_path):
+    """A small and a multipart-sized file (three parts: 16 + 16 + 8 MB), with their keys."""
+    files = tmp_path / "files"
+    files.mkdir()
+    small = files / "small.json"
+    small.write_text(json.dumps({"version": 1}))
+    large = files / "large.bin"
+    large.write_bytes(bytes(range(256)) * (40 * MB // 256))
+    return [(small, "models/small.json"), (large, "models/large.bin")]
+
+
+def sync(s3, items, **kwargs) -> dict:
+    return S3Sync(BUCKET, s3=s3, workers=2, **kwargs).sync(items)
+
+
+def test_local_etag_matches_remote(s3, artifacts):
+    sync(s3, artifacts)
+    for path, key in artifacts:
+        remote = s3.head_object(Bucket=BUCKET, Key=key)["ETag"].strip('"')
+        assert local_etag(path, path.stat().st_size) == remote
+    large = artifacts[1][0]
+    assert local_etag(large, large.stat().st_size).endswith("-3")
+
+
+def test_part_size_stays_under_the_part_limit():
+    assert part_size(MULTIPART_THRESHOLD) == MULTIPART_CHUNKSIZE
+    assert part_size(MULTIPART_CHUNKSIZE * 10000) == MULTIPART_CHUNKSIZE
+    assert part_size(MULTIPART_CHUNKSIZE * 10000 + 1) == 2 * MULTIPART_CHUNKSIZE
+
+
+def test_unchanged_files_are_skipped(s3, artifacts):
+    first = sync(s3, artifacts)
+    assert first["uploaded"] == 2 and "skipped" not in first
+
+    second = sync(s3, artifacts)
+    assert second["skipped"] == 2 and "uploaded" not in second
+    assert second["bytes_uploaded"] == 0
+    assert second["bytes_skipped"] == sum(path.stat().st_size for path, _ in artifacts)
+
+    artifacts[0][0].write_text(json.dumps({"version": 2}))
+    third = sync(s3, artifacts)
+    assert (third["uploaded"], third["skipped"]) == (1, 1)
+    assert s3.get_object(Bucket=BUCKET, Key="models/small.json")["Body"].read() == b'{"version": 2}'
+
+
+def test_dry_run_uploads_nothing(s3, artifacts):
+    summary = sync(s3, artifacts, dry_run=True)
+    assert summary["would_upload"] == 2
+    assert "Contents" not in s3.list_objects_v2(Bucket=BUCKET)
+    assert not s3_sync.MANIFEST_PATH.exists()
+
+
+def test_manifest_records_etags(s3, artifacts):
+    sync(s3, artifacts)
+    manifest = json.loads(s3_sync.MANIFEST_PATH.read_text())
+    assert manifest["bucket"] == BUCKET
+    assert manifest["upload_mb_per_s"] > 0  # 40 MB uploaded: enough to remember the throughput
+    for path, key in artifacts:
+        entry = manifest["files"][key]
+        stat = path.stat()
+        assert (entry["size"], entry["mtime_ns"]) == (stat.st_size, stat.st_mtime_ns)
+        assert entry["etag"] == entry["remote_etag"] == local_etag(path, stat.st_size)
+
+
+def test_manifest_only_skips_remote_checks(s3, artifacts, monkeypatch):
+    sync(s3, artifacts)
+
+    def no_head(**kwargs):
+        raise AssertionError("HEAD request with --manifest-only")
+
+    monkeypatch.setattr(s3, "head_object", no_head)
+    assert sync(s3, artifacts, manifest_only=True)["skipped"] == 2
+
+
+def test_manifest_for_another_bucket_is_ignored(s3, artifacts):
+    sync(s3, artifacts)
+    assert s3_sync.load_manifest("other-bucket") == {"bucket": "other-bucket", "files": {}}
+
+
+def test_transient_upload_error_is_retried(s3, artifacts, monkeypatch):
+    upload_file = s3.upload_file
+    calls = []
+
+    def flaky_upload(*args, **kwargs):
+        calls.append(args[2])
+        if calls.count(args[2]) == 1:
+            raise S3UploadFailedError("Failed to upload: An error occurred (SlowDown)")
+        return upload_file(*args, **kwargs)
+
+    monkeypatch.setattr(s3, "upload_file", flaky_upload)
+    summary = sync(s3, artifacts)
+    assert summary["uploaded"] == 2 and summary["retries"] == 2
+    assert sorted(calls) == sorted(key for _, key in artifacts for _ in range(2))
+
+
+def test_upload_fails_after_max_attempts(s3, artifacts, monkeypatch):
+    def failing_upload(*args, **kwargs):
+        raise S3UploadFailedError("Failed to upload: An error occurred (SlowDown)")
+
+    monkeypatch.setattr(s3, "upload_file", failing_upload)
+    summary = sync(s3, artifacts[:1], max_attempts=3)
+    assert summary["failed"] == 1 and "uploaded" not in summary
+    assert summary["retries"] == 2
+    # A failed file stays out of the manifest, so the next run tries it again
+    assert "models/small.json" not in json.loads(s3_sync.MANIFEST_PATH.read_text())["files"]
+
+
+@pytest.fixture
+def model_dir(tmp_path, monkeypatch):
+    """A small ml/models/ directory, synced by the models set."""
+    models = tmp_path / "models"
+    (models / "feature_index").mkdir(parents=True)
+    (models / "readmission_model.txt").write_text("tree")
+    (models / "feature_index" / "config.json").write_text("{}")
+    monkeypatch.setitem(s3_sync.ARTIFACT_SETS, "models", (models, "models"))
+    monkeypatch.setenv("S3_BUCKET_NAME", BUCKET)
+    return models
+
+
+def keys(s3) -> list:
+    return sorted(obj["Key"] for obj in s3.list_objects_v2(Bucket=BUCKET).get("Contents", []))
+
+
+def test_models_are_published_as_a_version(s3, model_dir):
+    """models/<version>/ plus models/LATEST: the layout the API's S3 registry source polls."""
+    version = model_version(model_dir)
+    assert sync_sets(["models"])["uploaded"] == 2
+    assert keys(s3) == sorted(["models/LATEST", f"models/{version}/feature_index/config.json",
+                               f"models/{version}/readmission_model.txt"])
+    assert s3.get_object(Bucket=BUCKET, Key="models/LATEST")["Body"].read().decode() == version
+
+    # Unchanged: same version, nothing uploaded
+    assert sync_sets(["models"])["skipped"] == 2
+
+    (model_dir / "readmission_model.txt").write_text("retrained")
+    assert model_version(model_dir) != version
+    sync_sets(["models"], "v2")
+    assert s3.get_object(Bucket=BUCKET, Key="models/LATEST")["Body"].read() == b"v2"
+    assert "models/v2/readmission_model.txt" in keys(s3) and f"models/{version}/readmission_model.txt" in keys(s3)
+
+
+def test_failed_model_upload_is_not_published(s3, model_dir, monkeypatch):
+    def failing_upload(self, *args, **kwargs):
+        raise S3UploadFailedError("Failed to upload: An error occurred (SlowDown)")
+
+    monkeypatch.setattr(s3_sync.boto3.s3.transfer.S3Transfer, "upload_file", failing_upload)
+    assert sync_sets(["models"], "v1", max_attempts=1)["failed"] == 2
+    assert "models/LATEST" not in keys(s3)
+
+
+def test_summary_estimates_time_saved():
+    results = [
+        {"key": "a", "status": "uploaded", "bytes": 32 * MB, "seconds": 4.0, "retries": 1},
+        {"key": "b", "status": "skipped", "bytes": 80 * MB, "seconds": 0.0, "retries": 0},
+        {"key": "c", "status": "failed", "bytes": MB, "seconds": 0.0, "retries": 3},
+    ]
+    summary = summarize(results, elapsed=5.0)
+    assert summary["upload_mb_per_s"] == 8.0
+    assert summary["est_seconds_saved"] == 10.0  # 80 MB at 8 MB/s
+    assert (summary["uploaded"], summary["skipped"], summary["failed"], summary["retries"]) == (1, 1, 1, 4)
+    assert (summary["bytes_uploaded"], summary["bytes_skipped"]) == (32 * MB, 80 * MB)
+
+
+def test_summary_uses_remembered_throughput():
+    """A run that uploads too little to measure estimates with the manifest's throughput."""
+    results = [
+        {"key": "a", "status": "uploaded", "bytes": MB, "seconds": 1.0, "retries": 0},
+        {"key": "b", "status": "skipped", "bytes": 100 * MB, "seconds": 0.0, "retries": 0},
+    ]
+    assert summarize(results, elapsed=1.0, known_mb_per_s=20.0)["est_seconds_saved"] == 5.0
+    assert summarize(results[1:], elapsed=0.1)["est_seconds_saved"] is None
@@ -0,0 +1,117 @@
+"""
+Wall-clock and peak-memory comparison of feature export strategies.
+
+Builds a synthetic fct_patient_features table of --rows rows in a temporary
+DuckDB file, then runs each strategy in a fresh process (so peak RSS is its
+own) and reports seconds, peak RSS and output size:
+  pandas        the previous export: fetchdf() + DataFrame.to_parquet()
+  copy_all      export_features.py --projection all
+  copy_training export_features.py (default projection)
+  arrow_stream  fetch_record_batch() -> pyarrow ParquetWriter, all columns
+
+    python dbt_pipeline/benchmark_export.py --rows 5000000
+"""
+import argparse
+import json
+import shutil
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+
+import duckdb
+
+DBT_DIR = Path(__file__).parent
+
+STRATEGIES = {
+    "pandas": """
+df = con.execute("select * exclude (labeled_at) from fct_patient_features").fetchdf()
+df.to_parquet(output, index=False)
+""",
+    "copy_all": """
+from export_features import export
+export(con, Path(output), projection="all")
+""",
+    "copy_training": """
+from export_features import export
+export(con, Path(output), projection="training")
+""",
+    "arrow_stream": """
+import pyarrow.parquet as pq
+reader = con.execute("select * exclude (labeled_at) from fct_patient_features").fetch_record_batch(122_880)
+with pq.ParquetWriter(output, reader.schema, compression="zstd") as writer:
+    for batch in reader:
+        writer.write_batch(batch)
+""",
+}
+
+RUNNER = """
+import json, resource, sys, time
+from pathlib import Path
+sys.path.insert(0, {dbt_dir!r})
+import duckdb
+con = duckdb.connect({db!r}, read_only=True)
+output = {output!r}
+start = time.perf_counter()
+{body}
+elapsed = time.perf_counter() - start
+print(json.dumps({{"seconds": elapsed, "peak_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024}}))
+"""
+
+
+def build_table(db_path: Path, rows: int):
+    """Synthetic rows shaped like the dbt mart (same columns and types)."""
+    con = duckdb.connect(str(db_path))
+    con.execute(f"""
+        create table fct_patient_features as
+        select
+            'e' || lpad(i::varchar, 10, '0') as encounter_id,
+            'p' || lpad((i // 20)::varchar, 8, '0') as patient,
+            ['M', 'F'][1 + (hash(i // 20) % 2)::bigint] as gender,
+            ['white', 'black', 'asian', 'hispanic', 'native', 'other'][1 + (hash(i // 20 + 1) % 6)::bigint] as race,
+            (18 + hash(i // 20 + 2) % 80)::bigint as age,
+            case when i % 20 = 19 then null else (hash(i) % 400)::bigint end as days_to_next,
+            case when hash(i) % 400 <= 30 then 1 else 0 end as readmitted_within_30d,
+            ['ambulatory', 'emergency', 'inpatient', 'wellness'][1 + (hash(i + 3) % 4)::bigint] as encounterclass,
+            ['Encounter for problem', 'Emergency room admission', 'General examination of patient',
+             'Hospital admission', 'Follow-up encounter'][1 + (hash(i + 4) % 5)::bigint] as encounter_description,
+            (1000 + hash(i + 5) % 9000)::bigint as reasoncode,
+            ['Diabetes', 'Hypertension', 'Prediabetes', 'Viral sinusitis (disorder)'][1 + (hash(i + 6) % 4)::bigint]
+                as reasondescription,
+            round((hash(i + 7) % 50000) / 100.0, 2) as base_cost,
+            round((hash(i + 8) % 200000) / 100.0, 2) as total_cost,
+            current_timestamp as labeled_at
+        from range({rows}) t(i)
+    """)
+    con.close()
+
+
+def run_strategy(name: str, db_path: Path, output: Path) -> dict:
+    script = RUNNER.format(dbt_dir=str(DBT_DIR), db=str(db_path), output=str(output), body=STRATEGIES[name])
+    out = subprocess.run([sys.executable, "-c", script], capture_output=True, text=True, check=True)
+    result = json.loads(out.stdout.strip().splitlines()[-1])
+    result["output_mb"] = output.stat().st_size / 1e6
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark feature export strategies.")
+    parser.add_argument("--rows", type=int, default=2_000_000)
+    parser.add_argument("--strategies", nargs="+", default=list(STRATEGIES), choices=list(STRATEGIES))
+    args = parser.parse_args()
+
+    work_dir = Path(tempfile.mkdtemp(prefix="export_bench_"))
+    try:
+        db_path = work_dir / "features.duckdb"
+        build_table(db_path, args.rows)
+        print(f"{args.rows:,} rows\n")
+        print(f"{'strategy':<15}{'seconds':>9}{'peak RSS MB':>13}{'output MB':>11}")
+        for name in args.strategies:
+            r = run_strategy(name, db_path, work_dir / f"{name}.parquet")
+            print(f"{name:<15}{r['seconds']:>9.2f}{r['peak_rss_mb']:>13.1f}{r['output_mb']:>11.1f}")
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
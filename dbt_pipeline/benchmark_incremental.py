@@ -0,0 +1,132 @@
+"""
+Full-refresh vs incremental dbt build benchmark on synthetic Synthea data.
+
+Generates a base encounter history plus a delta of newer encounters, then:
+  1. full:        `dbt run --full-refresh` over base + delta
+  2. incremental: `dbt run --full-refresh` over base only (untimed), then
+                  `dbt run` once the delta file lands next to it (timed)
+Per-model wall time comes from target/run_results.json. Finally both DuckDB
+files are compared: the incremental build must produce exactly the same
+labels and features as the full rebuild.
+
+    python benchmark_incremental.py --patients 20000 --delta-fraction 0.02
+"""
+import argparse
+import json
+import shutil
+import subprocess
+import tempfile
+import time
+from pathlib import Path
+
+import duckdb
+
+from synthetic_synthea import generate, split_delta, write
+
+PROJECT_DIR = Path(__file__).parent / "diabetes_agent"
+MODELS = ["stg_encounters", "stg_patients", "fct_readmission_labels", "fct_patient_features"]
+
+
+def dbt_run(work_dir: Path, db_path: Path, data_dir: Path, full_refresh: bool, extra_vars: dict = None) -> dict:
+    """Run the project against `db_path`; returns {"total": s, <model>: s}."""
+    profiles_dir = work_dir / f"profiles_{db_path.stem}"
+    profiles_dir.mkdir(exist_ok=True)
+    (profiles_dir / "profiles.yml").write_text(
+        "diabetes_agent:\n"
+        "  target: bench\n"
+        "  outputs:\n"
+        "    bench:\n"
+        "      type: duckdb\n"
+        f"      path: '{db_path}'\n"
+        "      threads: 1\n"
+    )
+    target_dir = work_dir / f"target_{db_path.stem}"
+    dbt_vars = {
+        "encounters_path": str(data_dir / "encounters_*.parquet"),
+        "patients_path": str(data_dir / "patients.parquet"),
+        **(extra_vars or {}),
+    }
+    cmd = ["dbt", "run", "--profiles-dir", str(profiles_dir), "--target-path", str(target_dir),
+           "--log-path", str(work_dir / "logs"), "--vars", json.dumps(dbt_vars)]
+    if full_refresh:
+        cmd.append("--full-refresh")
+
+    start = time.perf_counter()
+    subprocess.run(cmd, cwd=PROJECT_DIR, check=True, capture_output=True, text=True)
+    timings = {"total": time.perf_counter() - start}
+
+    run_results = json.loads((target_dir / "run_results.json").read_text())
+    for result in run_results["results"]:
+        timings[result["unique_id"].split(".")[-1]] = result["execution_time"]
+    return timings
+
+
+def compare(full_db: Path, incremental_db: Path):
+    """Row counts and symmetric differences of both marts (labeled_at excluded)."""
+    con = duckdb.connect()
+    con.execute(f"attach '{full_db}' as full_db (read_only)")
+    con.execute(f"attach '{incremental_db}' as inc_db (read_only)")
+    report = {}
+    for table in ("fct_readmission_labels", "fct_patient_features"):
+        query = "select * exclude (labeled_at) from {db}.main." + table
+        full_q, inc_q = query.format(db="full_db"), query.format(db="inc_db")
+        report[table] = {
+            "rows": con.execute(f"select count(*) from ({full_q})").fetchone()[0],
+            "only_in_full": con.execute(f"select count(*) from ({full_q} except all {inc_q})").fetchone()[0],
+            "only_in_incremental": con.execute(f"select count(*) from ({inc_q} except all {full_q})").fetchone()[0],
+        }
+    con.close()
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark incremental vs full-refresh dbt builds.")
+    parser.add_argument("--patients", type=int, default=20000)
+    parser.add_argument("--encounters-per-patient", type=float, default=20)
+    parser.add_argument("--delta-fraction", type=float, default=0.02,
+                        help="Share of (newest) encounters that arrive in the delta")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--keep", action="store_true", help="Keep the temp directory")
+    args = parser.parse_args()
+
+    work_dir = Path(tempfile.mkdtemp(prefix="dbt_incremental_bench_"))
+    try:
+        patients, encounters = generate(args.patients, args.encounters_per_patient, seed=args.seed)
+        base, delta = split_delta(encounters, args.delta_fraction)
+        print(f"{len(patients):,} patients, {len(base):,} base + {len(delta):,} delta encounters")
+
+        full_data, inc_data = work_dir / "data_full", work_dir / "data_incremental"
+        for data_dir in (full_data, inc_data):
+            write(patients, data_dir / "patients.parquet")
+            write(base, data_dir / "encounters_base.parquet")
+        write(delta, full_data / "encounters_delta.parquet")
+
+        full_db, inc_db = work_dir / "full.duckdb", work_dir / "incremental.duckdb"
+        full = dbt_run(work_dir, full_db, full_data, full_refresh=True)
+
+        dbt_run(work_dir, inc_db, inc_data, full_refresh=True)
+        shutil.copy(full_data / "encounters_delta.parquet", inc_data / "encounters_delta.parquet")
+        incremental = dbt_run(work_dir, inc_db, inc_data, full_refresh=False)
+
+        print(f"\n{'model':<26}{'full (s)':>10}{'incr (s)':>10}{'speedup':>9}")
+        for model in MODELS + ["total"]:
+            f, i = full.get(model, 0.0), incremental.get(model, 0.0)
+            print(f"{model:<26}{f:>10.3f}{i:>10.3f}{(f / i if i else 0):>8.1f}x")
+
+        report = compare(full_db, inc_db)
+        print()
+        for table, stats in report.items():
+            print(f"{table}: {stats['rows']:,} rows, {stats['only_in_full']} only in full, "
+                  f"{stats['only_in_incremental']} only in incremental")
+        if any(s["only_in_full"] or s["only_in_incremental"] for s in report.values()):
+            raise SystemExit("Incremental build does not match the full rebuild")
+        print("Incremental build matches the full rebuild")
+    finally:
+        if args.keep:
+            print(f"Artifacts kept in {work_dir}")
+        else:
+            shutil.rmtree(work_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,117 @@
+"""
+Per-model dbt timings with staging as views vs. materialized, sorted tables.
+
+Generates a synthetic Synthea export (base history plus a delta of newer
+encounters) and builds the project once per staging mode:
+  view:  staging models are views, so every mart that refers to one
+         re-reads and re-casts the raw Parquet
+  table: staging is read from Parquet once per run into typed DuckDB tables
+         sorted by (patient, start_ts) (--vars '{staging_materialization: table}')
+Each mode runs `dbt run --full-refresh` over the base files --repeat times
+(the best time per model is kept), then a timed incremental `dbt run` once
+the delta lands. Per-model wall time comes from target/run_results.json.
+Finally the marts of both modes are compared: they must be identical.
+
+    python benchmark_staging.py --patients 50000 --repeat 3
+"""
+import argparse
+import shutil
+import tempfile
+from pathlib import Path
+
+import duckdb
+
+from benchmark_incremental import MODELS, dbt_run
+from synthetic_synthea import generate, split_delta, write
+
+MODES = ("view", "table")
+
+
+def run_mode(work_dir: Path, data_dir: Path, delta, mode: str, repeat: int):
+    """Best-of-`repeat` full-refresh timings, then one incremental run after the delta lands."""
+    db_path = work_dir / f"{mode}.duckdb"
+    mode_vars = {"staging_materialization": mode}
+    full = {}
+    for _ in range(repeat):
+        timings = dbt_run(work_dir, db_path, data_dir, full_refresh=True, extra_vars=mode_vars)
+        full = {model: min(seconds, full.get(model, seconds)) for model, seconds in timings.items()}
+    write(delta, data_dir / "encounters_delta.parquet")
+    incremental = dbt_run(work_dir, db_path, data_dir, full_refresh=False, extra_vars=mode_vars)
+    (data_dir / "encounters_delta.parquet").unlink()
+    return db_path, full, incremental
+
+
+def compare(view_db: Path, table_db: Path) -> dict:
+    """Rows in one mode's marts but not the other's (labeled_at excluded)."""
+    con = duckdb.connect()
+    con.execute(f"attach '{view_db}' as view_db (read_only)")
+    con.execute(f"attach '{table_db}' as table_db (read_only)")
+    differences = {}
+    for table in ("fct_readmission_labels", "fct_patient_features"):
+        query = "select * exclude (labeled_at) from {db}.main." + table
+        view_q, table_q = query.format(db="view_db"), query.format(db="table_db")
+        differences[table] = con.execute(
+            f"select (select count(*) from ({view_q} except all {table_q}))"
+            f" + (select count(*) from ({table_q} except all {view_q}))"
+        ).fetchone()[0]
+    con.close()
+    return differences
+
+
+def print_timings(title: str, results: dict):
+    print(f"\n{title}")
+    print(f"{'model':<26}" + "".join(f"{mode + ' (s)':>12}" for mode in MODES) + f"{'speedup':>9}")
+    for model in MODELS + ["total"]:
+        view_s, table_s = (results[mode].get(model, 0.0) for mode in MODES)
+        print(f"{model:<26}{view_s:>12.3f}{table_s:>12.3f}{(view_s / table_s if table_s else 0):>8.2f}x")
+    view_sum, table_sum = (sum(results[mode].get(model, 0.0) for model in MODELS) for mode in MODES)
+    print(f"{'sum of models':<26}{view_sum:>12.3f}{table_sum:>12.3f}{(view_sum / table_sum if table_sum else 0):>8.2f}x")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark view vs. materialized staging in the dbt project.")
+    parser.add_argument("--patients", type=int, default=50000)
+    parser.add_argument("--encounters-per-patient", type=float, default=20)
+    parser.add_argument("--delta-fraction", type=float, default=0.02,
+                        help="Share of (newest) encounters added before the incremental run")
+    parser.add_argument("--repeat", type=int, default=3, help="Full-refresh runs per mode (best is kept)")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--keep", action="store_true", help="Keep the temp directory")
+    args = parser.parse_args()
+
+    work_dir = Path(tempfile.mkdtemp(prefix="dbt_staging_bench_"))
+    try:
+        patients, encounters = generate(args.patients, args.encounters_per_patient, seed=args.seed)
+        base, delta = split_delta(encounters, args.delta_fraction)
+        data_dir = work_dir / "data"
+        write(patients, data_dir / "patients.parquet")
+        write(base, data_dir / "encounters_base.parquet")
+        size_mb = sum(path.stat().st_size for path in data_dir.glob("*.parquet")) / 1e6
+        print(f"{len(patients):,} patients, {len(base):,} base + {len(delta):,} delta encounters "
+              f"({size_mb:.1f} MB of Parquet)")
+
+        dbs, full, incremental = {}, {}, {}
+        for mode in MODES:
+            dbs[mode], full[mode], incremental[mode] = run_mode(work_dir, data_dir, delta, mode, args.repeat)
+
+        print_timings(f"full refresh (best of {args.repeat})", full)
+        print_timings("incremental run after the delta", incremental)
+        for mode in MODES:
+            print(f"\n{mode}: {dbs[mode].stat().st_size / 1e6:.1f} MB DuckDB file", end="")
+        print()
+
+        differences = compare(dbs["view"], dbs["table"])
+        for table, count in differences.items():
+            print(f"{table}: {count} rows differ between view and table staging")
+        if any(differences.values()):
+            raise SystemExit("Materialized staging changed the marts")
+        print("Both staging modes build the same marts")
+    finally:
+        if args.keep:
+            print(f"Artifacts kept in {work_dir}")
+        else:
+            shutil.rmtree(work_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
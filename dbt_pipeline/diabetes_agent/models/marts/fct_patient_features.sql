@@ -1,5 +1,17 @@
+{{
+    config(
+        materialized='incremental',
+        unique_key='encounter_id',
+        incremental_strategy='delete+insert'
+    )
+}}
+
 with e as (
     select * from {{ ref('fct_readmission_labels') }}
+    {% if is_incremental() %}
+    -- Only encounters labeled or relabeled since the last run
+    where labeled_at > (select max(labeled_at) from {{ this }})
+    {% endif %}
 ),
 p as (
     select * from {{ ref('stg_patients') }}
@@ -22,8 +34,8 @@ select
     enc.reasoncode,
     enc.reasondescription,
     enc.base_cost,
-    enc.total_cost
+    enc.total_cost,
+    e.labeled_at
 from e
 left join p on e.patient = p.patient_id
 left join enc on e.encounter_id = enc.encounter_id
-
@@ -1,22 +1,66 @@
-with visits as (
-    select
-        *,
-        row_number() over (
-            partition by patient
-            order by start_ts
-        ) as visit_num
+{{
+    config(
+        materialized='incremental',
+        unique_key='encounter_id',
+        incremental_strategy='delete+insert'
+    )
+}}
+
+with source as (
+    select encounter_id, patient, start_ts, stop_ts
     from {{ ref('stg_encounters') }}
 ),
 
+{% if is_incremental() %}
+-- Encounters not labeled yet (keyed on encounter_id, so late arrivals count too)
+new_encounters as (
+    select s.*
+    from source s
+    left join {{ this }} t on s.encounter_id = t.encounter_id
+    where t.encounter_id is null
+),
+
+changed_patients as (
+    select patient, min(start_ts) as first_new_ts
+    from new_encounters
+    group by patient
+),
+
+-- Start each changed patient's window at the last labeled visit before the
+-- first new one: that visit's next visit (and days_to_next) may have changed
+reprocess_from as (
+    select
+        c.patient,
+        coalesce(max(t.start_ts), c.first_new_ts) as from_ts
+    from changed_patients c
+    left join {{ this }} t
+      on t.patient = c.patient
+     and t.start_ts < c.first_new_ts
+    group by c.patient, c.first_new_ts
+),
+
+visits as (
+    select s.*
+    from source s
+    join reprocess_from r
+      on s.patient = r.patient
+     and s.start_ts >= r.from_ts
+),
+{% else %}
+visits as (
+    select * from source
+),
+{% endif %}
+
 with_leads as (
     select
-        a.*,
-        b.start_ts as next_visit_ts,
-        datediff('day', a.stop_ts, b.start_ts) as days_to_next
-    from visits a
-    left join visits b
-      on a.patient = b.patient
-     and a.visit_num + 1 = b.visit_num
+        *,
+        -- encounter_id breaks ties so same-time visits order the same way every build
+        lead(start_ts) over (
+            partition by patient
+            order by start_ts, encounter_id
+        ) as next_visit_ts
+    from visits
 )
 
 select
@@ -24,10 +68,11 @@ select
     patient,
     start_ts,
     stop_ts,
-    days_to_next,
+    datediff('day', stop_ts, next_visit_ts) as days_to_next,
     case 
-        when days_to_next <= 30 then 1
+        when datediff('day', stop_ts, next_visit_ts) <= 30 then 1
         else 0
-    end as readmitted_within_30d
+    end as readmitted_within_30d,
+    -- Lets downstream incremental models pick up rows (re)labeled in this run
+    current_timestamp as labeled_at
 from with_leads
-
@@ -1,20 +1,24 @@
+-- Typed encounters. Only the columns the marts use are read from Parquet; with
+-- staging_materialization 'table' they are stored sorted by (patient, start_ts)
 with raw as (
-    select * 
-    from read_parquet('../../data/processed/synthea/encounters.parquet')
+    select
+        "Id", "PATIENT", "ENCOUNTERCLASS", "CODE", "DESCRIPTION", "REASONCODE", "REASONDESCRIPTION",
+        "START", "STOP", "BASE_ENCOUNTER_COST", "TOTAL_CLAIM_COST"
+    from read_parquet('{{ var("encounters_path") }}')
 )
 select
-    "Id" as encounter_id,
-    "PATIENT" as patient,
-    "ENCOUNTERCLASS" as encounterclass,
-    "CODE" as encounter_code,
-    "DESCRIPTION" as encounter_description,
-    "REASONCODE" as reasoncode,
-    "REASONDESCRIPTION" as reasondescription,
-    "START" as start,
-    "STOP" as stop,
-    "BASE_ENCOUNTER_COST" as base_cost,
-    "TOTAL_CLAIM_COST" as total_cost,
+    cast("Id" as varchar) as encounter_id,
+    cast("PATIENT" as varchar) as patient,
+    cast("ENCOUNTERCLASS" as varchar) as encounterclass,
+    cast("CODE" as bigint) as encounter_code,
+    cast("DESCRIPTION" as varchar) as encounter_description,
+    cast("REASONCODE" as bigint) as reasoncode,
+    cast("REASONDESCRIPTION" as varchar) as reasondescription,
+    cast("BASE_ENCOUNTER_COST" as double) as base_cost,
+    cast("TOTAL_CLAIM_COST" as double) as total_cost,
     cast("START" as timestamp) as start_ts,
     cast("STOP" as timestamp) as stop_ts
 from raw
-
+{% if var("staging_materialization") == "table" %}
+order by patient, start_ts, encounter_id
+{% endif %}
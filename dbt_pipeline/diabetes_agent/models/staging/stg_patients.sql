@@ -1,15 +1,14 @@
+-- Typed patients: just the demographics fct_patient_features joins (see stg_encounters)
 with raw as (
-    select * 
-    from read_parquet('../../data/processed/synthea/patients.parquet')
+    select "Id", "BIRTHDATE", "GENDER", "RACE"
+    from read_parquet('{{ var("patients_path") }}')
 )
 select
-    id as patient_id,
-    birthdate,
-    gender,
-    race,
-    address,
-    city,
-    state,
-    cast(birthdate as timestamp) as dob
+    cast("Id" as varchar) as patient_id,
+    cast("GENDER" as varchar) as gender,
+    cast("RACE" as varchar) as race,
+    cast("BIRTHDATE" as timestamp) as dob
 from raw
-
+{% if var("staging_materialization") == "table" %}
+order by patient_id
+{% endif %}
@@ -1,18 +1,168 @@
-import duckdb
+"""
+Export fct_patient_features from DuckDB to Parquet.
+
+DuckDB writes the Parquet itself (`COPY (...) TO ... (FORMAT PARQUET)`), so
+the table is streamed to disk without being materialized in pandas. Only
+the columns a consumer needs are projected:
+  training  encounter_id, PATIENT, GENDER, RACE, age, days_to_next,
+            readmitted_within_30d and the encounter features (encounterclass,
+            encounter_description, reasoncode, reasondescription, base_cost,
+            total_cost): the ids and label ml/train_model.py drops plus every
+            column it trains on
+  nlp       encounter_id, encounter_description, reasondescription
+  all       every column except the labeled_at build watermark
+
+--incremental treats the output as a Parquet directory whose files keep the
+labeled_at column, and exports only rows labeled after the newest labeled_at
+already there: new encounters, and encounters dbt relabeled (a patient's
+previous last visit gaining a next visit). Older copies of those rows are
+first removed from the files holding them, then the rows are appended as a
+new file, so every encounter_id appears once with its current label.
+
+    python dbt_pipeline/export_features.py
+    python dbt_pipeline/export_features.py --incremental --partition-by readmitted_within_30d
+"""
+import argparse
+import time
+import uuid
+from datetime import datetime
 from pathlib import Path
 
+import duckdb
+
 # Get the project root directory (go up one level from dbt_pipeline)
 project_root = Path(__file__).parent.parent
+DB_PATH = project_root / "data" / "duckdb" / "diabetes.duckdb"
+OUTPUT_PATH = project_root / "data" / "processed" / "fct_patient_features.parquet"
+
+PROJECTIONS = {
+    "training": [
+        "encounter_id", "patient as PATIENT", "gender as GENDER", "race as RACE",
+        "age", "days_to_next", "readmitted_within_30d", "encounterclass", "encounter_description",
+        "reasoncode", "reasondescription", "base_cost", "total_cost",
+    ],
+    "nlp": ["encounter_id", "encounter_description", "reasondescription"],
+    "all": ["* exclude (labeled_at)"],
+}
+COMPRESSIONS = ["zstd", "snappy", "gzip", "lz4", "uncompressed"]
+
+
+def build_query(projection: str, incremental: bool = False) -> str:
+    """
+    The projection. Incremental exports also keep labeled_at and select only
+    rows labeled after the $labeled_after parameter.
+    """
+    columns = PROJECTIONS[projection]
+    if not incremental:
+        return f"select {', '.join(columns)} from fct_patient_features"
+    if projection == "all":
+        columns = ["*"]
+    elif "labeled_at" not in columns:
+        columns = [*columns, "labeled_at"]
+    return f"select {', '.join(columns)} from fct_patient_features where labeled_at > $labeled_after"
+
+
+def exported_watermark(con, files: list):
+    """Newest labeled_at in an incremental export's files (datetime.min when there are none)."""
+    if not files:
+        return datetime.min
+    names = con.execute(f"describe select * from read_parquet({[str(f) for f in files]}, union_by_name = true)") \
+        .fetchall()
+    if "labeled_at" not in {row[0] for row in names}:
+        raise ValueError("--incremental output has no labeled_at column (written by an older version); "
+                         "re-create it by running --incremental into an empty directory")
+    latest = con.execute(f"select max(labeled_at) from read_parquet({[str(f) for f in files]}, "
+                         f"union_by_name = true)").fetchone()[0]
+    return latest or datetime.min
+
+
+def drop_superseded(con, files: list, compression: str, row_group_size: int) -> int:
+    """
+    Rewrite every file holding an encounter_id in the `delta` temp table without
+    those rows (files left empty are deleted); returns the rows dropped.
+    """
+    dropped = 0
+    for path in files:
+        # Partition values live in the directory names, not in the files: read them as written
+        source = f"read_parquet('{path}', hive_partitioning = false)"
+        stale = con.execute(f"select count(*) from {source} where encounter_id in (select encounter_id from delta)") \
+            .fetchone()[0]
+        if not stale:
+            continue
+        dropped += stale
+        kept = con.execute(f"select count(*) from {source}").fetchone()[0] - stale
+        if kept:
+            tmp = path.with_name(f".{path.name}.tmp")
+            con.execute(f"copy (select * from {source} where encounter_id not in (select encounter_id from delta)) "
+                        f"to '{tmp}' ({copy_options(compression, row_group_size)})")
+            tmp.replace(path)
+        else:
+            path.unlink()
+    return dropped
+
+
+def copy_options(compression: str, row_group_size: int, partition_by: list = None) -> str:
+    options = ["format parquet", f"compression {compression}", f"row_group_size {row_group_size}"]
+    if partition_by:
+        options.append(f"partition_by ({', '.join(partition_by)})")
+    return ", ".join(options)
+
+
+def export(con, output: Path, projection: str = "training", compression: str = "zstd",
+           row_group_size: int = 122_880, partition_by: list = None, incremental: bool = False) -> int:
+    """Write the projected table to `output`; returns rows written."""
+    options = copy_options(compression, row_group_size, partition_by)
+    output.parent.mkdir(parents=True, exist_ok=True)
+    if incremental:
+        if output.is_file():
+            raise ValueError(f"--incremental needs a directory output, but {output} is a file")
+        # Directory dataset: each run adds its own uniquely named file(s)
+        existing = sorted(output.rglob("*.parquet")) if output.is_dir() else []
+        query = build_query(projection, incremental=True)
+        con.execute(f"create or replace temp table delta as {query}",
+                    {"labeled_after": exported_watermark(con, existing)})
+        new_rows = con.execute("select count(*) from delta").fetchone()[0]
+        if not new_rows:
+            return 0
+        # Old copies go first: if the run stops before the append, the watermark
+        # hasn't moved and the next run exports these rows again
+        drop_superseded(con, existing, compression, row_group_size)
+        stamp = time.strftime("%Y%m%dT%H%M%S")
+        if partition_by:
+            options += f", filename_pattern 'part_{stamp}_{{uuid}}', append"
+            con.execute(f"copy delta to '{output}' ({options})")
+        else:
+            output.mkdir(parents=True, exist_ok=True)
+            filename = output / f"part_{stamp}_{uuid.uuid4().hex[:8]}.parquet"
+            con.execute(f"copy delta to '{filename}' ({options})")
+        return new_rows
+
+    query = build_query(projection)
+    if partition_by:
+        options += ", overwrite_or_ignore"
+    return con.execute(f"copy ({query}) to '{output}' ({options})").fetchone()[0]
+
 
-# Connect to DuckDB database
-db_path = project_root / "data" / "duckdb" / "diabetes.duckdb"
-con = duckdb.connect(str(db_path))
+def main():
+    parser = argparse.ArgumentParser(description="Stream fct_patient_features from DuckDB to Parquet.")
+    parser.add_argument("--db", default=str(DB_PATH))
+    parser.add_argument("--output", default=str(OUTPUT_PATH))
+    parser.add_argument("--projection", choices=list(PROJECTIONS), default="training")
+    parser.add_argument("--compression", choices=COMPRESSIONS, default="zstd")
+    parser.add_argument("--row-group-size", type=int, default=122_880)
+    parser.add_argument("--partition-by", nargs="+", help="Hive-partition the output by these columns")
+    parser.add_argument("--incremental", action="store_true",
+                        help="Export only rows (re)labeled since the output directory's newest labeled_at, "
+                             "replacing their older copies")
+    args = parser.parse_args()
 
-# Query the feature table
-df = con.execute("select * from fct_patient_features").fetchdf()
+    con = duckdb.connect(args.db, read_only=True)
+    start = time.perf_counter()
+    rows = export(con, Path(args.output), args.projection, args.compression, args.row_group_size,
+                  args.partition_by, args.incremental)
+    con.close()
+    print(f"Feature table exported to: {args.output} ({rows:,} rows in {time.perf_counter() - start:.2f}s)")
 
-# Export to Parquet
-output_path = project_root / "data" / "processed" / "fct_patient_features.parquet"
-df.to_parquet(str(output_path), index=False)
 
-print(f"Feature table exported to: {output_path}")
+if __name__ == "__main__":
+    main()
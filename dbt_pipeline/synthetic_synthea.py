@@ -0,0 +1,73 @@
+"""
+Synthetic Synthea-shaped patients/encounters Parquet for dbt benchmarks.
+
+Only the columns the staging models read are generated. Encounters can be
+split at a point in time into a "base" file and a "delta" file of newer
+encounters, to simulate what a nightly export adds.
+"""
+import numpy as np
+import pandas as pd
+from pathlib import Path
+
+ENCOUNTER_CLASSES = ["ambulatory", "emergency", "inpatient", "wellness", "outpatient", "urgentcare"]
+DESCRIPTIONS = [
+    "Encounter for problem", "Emergency room admission", "General examination of patient",
+    "Hospital admission", "Follow-up encounter", "Urgent care clinic", "Encounter for symptom",
+]
+REASONS = [
+    "Acute bronchitis (disorder)", "Viral sinusitis (disorder)", "Diabetes", "Hypertension",
+    "Chronic kidney disease stage 1 (disorder)", "Prediabetes", "Hyperlipidemia", None,
+]
+RACES = ["white", "black", "asian", "hispanic", "native", "other"]
+
+
+def generate(n_patients: int, encounters_per_patient: float = 20, years: int = 10, seed: int = 42):
+    """Returns (patients, encounters) DataFrames with Synthea's column names."""
+    rng = np.random.default_rng(seed)
+    patient_ids = np.array([f"p{i:08d}" for i in range(n_patients)])
+    patients = pd.DataFrame({
+        "Id": patient_ids,
+        "BIRTHDATE": (pd.Timestamp("1930-01-01")
+                      + pd.to_timedelta(rng.integers(0, 70 * 365, n_patients), unit="D")).strftime("%Y-%m-%d"),
+        "GENDER": rng.choice(["M", "F"], n_patients),
+        "RACE": rng.choice(RACES, n_patients),
+        "ADDRESS": "1 Main St",
+        "CITY": "Boston",
+        "STATE": "Massachusetts",
+    })
+
+    counts = rng.poisson(encounters_per_patient, n_patients) + 1
+    n = int(counts.sum())
+    start = pd.Timestamp("2015-01-01") + pd.to_timedelta(rng.integers(0, years * 365 * 24, n), unit="h")
+    stop = start + pd.to_timedelta(rng.integers(1, 96, n), unit="h")
+    encounters = pd.DataFrame({
+        "Id": np.array([f"e{i:010d}" for i in range(n)]),
+        "START": start,
+        "STOP": stop,
+        "PATIENT": np.repeat(patient_ids, counts),
+        "ENCOUNTERCLASS": rng.choice(ENCOUNTER_CLASSES, n),
+        "CODE": rng.integers(100000, 999999, n),
+        "DESCRIPTION": rng.choice(DESCRIPTIONS, n),
+        "REASONCODE": rng.integers(1000, 9999, n),
+        "REASONDESCRIPTION": rng.choice(np.array(REASONS, dtype=object), n),
+        "BASE_ENCOUNTER_COST": rng.gamma(2, 60, n).round(2),
+        "TOTAL_CLAIM_COST": rng.gamma(2, 200, n).round(2),
+    })
+    return patients, encounters
+
+
+def split_delta(encounters: pd.DataFrame, delta_fraction: float):
+    """Split off the newest `delta_fraction` of encounters (by START)."""
+    cutoff = encounters["START"].quantile(1 - delta_fraction)
+    newer = encounters["START"] > cutoff
+    return encounters[~newer], encounters[newer]
+
+
+def write(frame: pd.DataFrame, path: Path):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    out = frame.copy()
+    # Synthea exports timestamps as ISO strings; staging casts them
+    for col in ("START", "STOP"):
+        if col in out:
+            out[col] = out[col].dt.strftime("%Y-%m-%dT%H:%M:%SZ")
+    out.to_parquet(path, index=False)
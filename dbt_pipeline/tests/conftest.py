@@ -0,0 +1,7 @@
+"""dbt_pipeline/ scripts import their siblings; so do the tests."""
+import sys
+from pathlib import Path
+
+PIPELINE_DIR = Path(__file__).parent.parent
+if str(PIPELINE_DIR) not in sys.path:
+    sys.path.insert(0, str(PIPELINE_DIR))
@@ -0,0 +1,92 @@
+"""export_features.py's incremental mode against a DuckDB fct_patient_features."""
+import duckdb
+import pyarrow.dataset as ds
+import pytest
+
+from export_features import export
+
+COLUMNS = """encounter_id varchar, patient varchar, gender varchar, race varchar, age integer,
+             days_to_next integer, readmitted_within_30d integer, encounterclass varchar,
+             encounter_description varchar, reasoncode bigint, reasondescription varchar, base_cost double,
+             total_cost double, labeled_at timestamp with time zone"""
+
+
+@pytest.fixture
+def con():
+    """fct_patient_features as dbt builds it; label(...) (re)labels encounters like an incremental dbt run."""
+    con = duckdb.connect()
+    con.execute(f"create table fct_patient_features ({COLUMNS})")
+    return con
+
+
+def label(con, at: str, *rows):
+    """Upsert (encounter_id, patient, days_to_next) rows labeled at `at`, like delete+insert does."""
+    for encounter_id, patient, days_to_next in rows:
+        con.execute("delete from fct_patient_features where encounter_id = ?", [encounter_id])
+        con.execute("insert into fct_patient_features values (?, ?, 'F', 'white', 60, ?, ?, 'inpatient', "
+                    "'Encounter', null, null, 100.0, 120.0, ?::timestamptz)",
+                    [encounter_id, patient, days_to_next, int(days_to_next is not None and days_to_next <= 30), at])
+
+
+def exported(output, partitioned: bool = False) -> dict:
+    table = ds.dataset(str(output), format="parquet", partitioning="hive" if partitioned else None).to_table()
+    ids = table.column("encounter_id").to_pylist()
+    assert len(ids) == len(set(ids)), "an encounter was exported twice"
+    return dict(zip(ids, table.column("readmitted_within_30d").to_pylist()))
+
+
+@pytest.mark.parametrize("partition_by", [None, ["readmitted_within_30d"]])
+def test_relabeled_rows_replace_their_exported_copies(con, tmp_path, partition_by):
+    output = tmp_path / "features"
+    label(con, "2025-01-01 00:00:00+00", ("e1", "p1", None), ("e2", "p2", None), ("e3", "p3", 45))
+    assert export(con, output, incremental=True, partition_by=partition_by) == 3
+    assert export(con, output, incremental=True, partition_by=partition_by) == 0
+
+    # p2 comes back within 30 days: e2 is relabeled, e4 is new
+    label(con, "2025-02-01 00:00:00+00", ("e2", "p2", 12), ("e4", "p2", None))
+    assert export(con, output, incremental=True, partition_by=partition_by) == 2
+    assert exported(output, bool(partition_by)) == {"e1": 0, "e2": 1, "e3": 0, "e4": 0}
+    assert export(con, output, incremental=True, partition_by=partition_by) == 0
+
+
+def test_all_rows_relabeled_empties_the_old_files(con, tmp_path):
+    output = tmp_path / "features"
+    label(con, "2025-01-01 00:00:00+00", ("e1", "p1", None))
+    export(con, output, incremental=True)
+    first = list(output.glob("*.parquet"))
+    # A dbt --full-refresh relabels everything
+    label(con, "2025-03-01 00:00:00+00", ("e1", "p1", 5))
+    assert export(con, output, incremental=True) == 1
+    assert not any(path.exists() for path in first)
+    assert exported(output) == {"e1": 1}
+
+
+def test_incremental_files_keep_labeled_at(con, tmp_path):
+    output = tmp_path / "features"
+    label(con, "2025-01-01 00:00:00+00", ("e1", "p1", None))
+    export(con, output, projection="nlp", incremental=True)
+    names = ds.dataset(str(output), format="parquet").schema.names
+    assert names == ["encounter_id", "encounter_description", "reasondescription", "labeled_at"]
+    # A full export leaves it out
+    export(con, tmp_path / "full.parquet", projection="all")
+    assert "labeled_at" not in ds.dataset(str(tmp_path / "full.parquet")).schema.names
+
+
+def test_output_without_labeled_at_is_rejected(con, tmp_path):
+    output = tmp_path / "features"
+    output.mkdir()
+    label(con, "2025-01-01 00:00:00+00", ("e1", "p1", None))
+    export(con, output / "old.parquet")
+    with pytest.raises(ValueError, match="labeled_at"):
+        export(con, output, incremental=True)
+
+
+def test_training_projection_keeps_every_feature(con, tmp_path):
+    """The default export is everything but labeled_at, with the column names ml/train_model.py expects."""
+    label(con, "2025-01-01 00:00:00+00", ("e1", "p1", None))
+    export(con, tmp_path / "training.parquet")
+    export(con, tmp_path / "all.parquet", projection="all")
+    training = ds.dataset(str(tmp_path / "training.parquet")).schema.names
+    everything = ds.dataset(str(tmp_path / "all.parquet")).schema.names
+    renamed = {"patient": "PATIENT", "gender": "GENDER", "race": "RACE"}
+    assert training == [renamed.get(name, name) for name in everything]
@@ -0,0 +1,55 @@
+"""The incremental marts, built by dbt-duckdb in two runs, against a full refresh of the same data."""
+import shutil
+
+import duckdb
+import pandas as pd
+import pytest
+
+pytest.importorskip("dbt.adapters.duckdb")
+from benchmark_incremental import compare, dbt_run  # noqa: E402
+from synthetic_synthea import generate, split_delta, write  # noqa: E402
+
+
+def days_to_next(db_path) -> dict:
+    con = duckdb.connect(str(db_path), read_only=True)
+    try:
+        return dict(con.execute("select encounter_id, days_to_next from fct_readmission_labels").fetchall())
+    finally:
+        con.close()
+
+
+@pytest.mark.parametrize("staging", ["view", "table"])
+def test_two_runs_match_a_full_refresh(tmp_path, staging):
+    patients, encounters = generate(40, 6, seed=7)
+    base, delta = split_delta(encounters, 0.15)
+    # A late arrival: an old visit of a patient with later labeled visits that only shows up in run 2
+    history = base[base["PATIENT"] == base["PATIENT"].iloc[0]].sort_values("START")
+    late = history.iloc[[len(history) // 2]]
+    base, delta = base.drop(late.index), pd.concat([delta, late])
+
+    full_data, inc_data = tmp_path / "data_full", tmp_path / "data_incremental"
+    write(patients, full_data / "patients.parquet")
+    write(base, full_data / "encounters_base.parquet")
+    write(delta, full_data / "encounters_delta.parquet")
+    write(patients, inc_data / "patients.parquet")
+    write(base, inc_data / "encounters_base.parquet")
+
+    extra_vars = {"staging_materialization": staging}
+    full_db, inc_db = tmp_path / "full.duckdb", tmp_path / "incremental.duckdb"
+    dbt_run(tmp_path, full_db, full_data, full_refresh=True, extra_vars=extra_vars)
+    dbt_run(tmp_path, inc_db, inc_data, full_refresh=True, extra_vars=extra_vars)
+    first = days_to_next(inc_db)
+    shutil.copy(full_data / "encounters_delta.parquet", inc_data / "encounters_delta.parquet")
+    dbt_run(tmp_path, inc_db, inc_data, full_refresh=False, extra_vars=extra_vars)
+    second = days_to_next(inc_db)
+
+    # Run 2 relabeled visits of run 1: last visits gaining a next visit, and the late arrival's predecessor
+    changed = {encounter_id for encounter_id, days in first.items() if second[encounter_id] != days}
+    assert any(first[encounter_id] is None for encounter_id in changed)
+    assert history.iloc[len(history) // 2 - 1]["Id"] in changed
+    assert len(second) == len(encounters)
+
+    report = compare(full_db, inc_db)
+    for table, stats in report.items():
+        assert stats["rows"] == len(encounters), table
+        assert stats["only_in_full"] == stats["only_in_incremental"] == 0, table
@@ -0,0 +1,46 @@
+"""
+Loaders for the compact serving bundle written by ml/serving_bundle.py.
+
+Nothing here imports sklearn, shap or joblib: the LightGBM model is read from
+its native text format and the NLP arrays are memory-mapped, so pages are only
+faulted in when a request actually touches them.
+"""
+import json
+import numpy as np
+from pathlib import Path
+
+BOOSTER_FILE = "readmission_model.txt"
+NLP_BUNDLE_DIR = "nlp_bundle"
+
+
+def has_booster(model_dir: Path) -> bool:
+    return (model_dir / BOOSTER_FILE).exists()
+
+
+def load_booster(model_dir: Path):
+    import lightgbm as lgb
+    return lgb.Booster(model_file=str(model_dir / BOOSTER_FILE))
+
+
+def has_nlp_bundle(model_dir: Path) -> bool:
+    return (model_dir / NLP_BUNDLE_DIR / "config.json").exists()
+
+
+class NlpBundle:
+    """TF-IDF + Multinomial NB parameters as plain (memory-mapped) arrays."""
+
+    def __init__(self, bundle_dir: Path, mmap: bool = True):
+        mode = 'r' if mmap else None
+        with open(bundle_dir / "config.json") as f:
+            self.config = json.load(f)
+        self.terms = np.load(bundle_dir / "vocabulary.npy", mmap_mode=mode)
+        self.idf = np.load(bundle_dir / "idf.npy", mmap_mode=mode)
+        self.feature_log_prob = np.load(bundle_dir / "feature_log_prob.npy", mmap_mode=mode)
+        self.class_log_prior = np.load(bundle_dir / "class_log_prior.npy", mmap_mode=mode)
+        self.classes = np.load(bundle_dir / "classes.npy", mmap_mode=mode)
+        # term -> column index, the only structure built at load time
+        self.vocabulary = {str(term): idx for idx, term in enumerate(self.terms)}
+
+
+def load_nlp_bundle(model_dir: Path, mmap: bool = True) -> NlpBundle:
+    return NlpBundle(model_dir / NLP_BUNDLE_DIR, mmap=mmap)
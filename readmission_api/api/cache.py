@@ -0,0 +1,107 @@
+"""
+Bounded, thread-safe LRU + TTL cache for model results.
+
+Risk scores, SHAP top-k and NLP diagnoses are stored as separate entries
+(one namespace each). Keys carry the version of the model set that computed
+them (api/registry.py), and the cache clears itself when the registry swaps
+in a new version.
+"""
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Hashable, List
+
+from api import config
+
+
+class ResultCache:
+    def __init__(self, max_entries: int, ttl_seconds: float, enabled: bool = True):
+        self.max_entries = max_entries
+        self.ttl = ttl_seconds
+        self.enabled = enabled
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._hits = {}
+        self._misses = {}
+        self._evictions = 0
+        self._invalidations = 0
+        self.version = None
+
+    def get_or_compute(self, namespace: str, keys: List[Hashable],
+                       compute: Callable[[List[int]], List[Any]], version: str = None) -> List[Any]:
+        """
+        Look up every key; call `compute(miss_positions)` once for the misses
+        (positions index into `keys`) and store what it returns. `version` is
+        the model set the caller computes with, so a request that started
+        before a swap can't store old-model results under the new version.
+        """
+        if not self.enabled:
+            return compute(list(range(len(keys))))
+
+        version = version or self.version
+        now = time.monotonic()
+        results = [None] * len(keys)
+        missing = []
+        with self._lock:
+            for pos, key in enumerate(keys):
+                full_key = (namespace, version, key)
+                entry = self._entries.get(full_key)
+                if entry is not None and entry[0] > now:
+                    self._entries.move_to_end(full_key)
+                    results[pos] = entry[1]
+                else:
+                    if entry is not None:
+                        del self._entries[full_key]
+                    missing.append(pos)
+            self._hits[namespace] = self._hits.get(namespace, 0) + len(keys) - len(missing)
+            self._misses[namespace] = self._misses.get(namespace, 0) + len(missing)
+
+        if missing:
+            computed = compute(missing)
+            expires = time.monotonic() + self.ttl
+            with self._lock:
+                for pos, value in zip(missing, computed):
+                    results[pos] = value
+                    self._entries[(namespace, version, keys[pos])] = (expires, value)
+                    self._entries.move_to_end((namespace, version, keys[pos]))
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+                    self._evictions += 1
+        return results
+
+    def set_version(self, version: str):
+        """Called by the registry when it swaps models: entries of older versions can't hit again."""
+        with self._lock:
+            if version != self.version:
+                if self.version is not None:
+                    self._invalidations += 1
+                self.version = version
+                self._entries.clear()
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            namespaces = sorted(set(self._hits) | set(self._misses))
+            return {
+                "enabled": self.enabled,
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "ttl_seconds": self.ttl,
+                "model_version": self.version,
+                "evictions": self._evictions,
+                "invalidations": self._invalidations,
+                "namespaces": {
+                    ns: {"hits": self._hits.get(ns, 0), "misses": self._misses.get(ns, 0)}
+                    for ns in namespaces
+                },
+            }
+
+
+result_cache = ResultCache(
+    max_entries=config.CACHE_MAX_ENTRIES,
+    ttl_seconds=config.CACHE_TTL_SECONDS,
+    enabled=config.CACHE_ENABLED,
+)
@@ -0,0 +1,75 @@
+"""
+Runtime settings for the API, read from environment variables.
+"""
+import os
+
+# Micro-batching of concurrent single-row /predict calls.
+# 0 disables it (the default: a Lambda instance only serves one request at a time).
+MICROBATCH_WAIT_MS = float(os.getenv("MICROBATCH_WAIT_MS", "0"))
+MICROBATCH_MAX_SIZE = int(os.getenv("MICROBATCH_MAX_SIZE", "64"))
+
+# SHAP backend for /explain and risk factors:
+#   "native_contrib" - LightGBM's built-in exact TreeSHAP (pred_contrib=True); shap is never imported
+#   "shap"           - the pickled shap.Explainer from ml/explain_model.py
+EXPLANATION_BACKEND = os.getenv("EXPLANATION_BACKEND", "native_contrib")
+if EXPLANATION_BACKEND not in ("native_contrib", "shap"):
+    raise ValueError(f"EXPLANATION_BACKEND must be 'native_contrib' or 'shap', got {EXPLANATION_BACKEND!r}")
+
+# Artifact format for the risk model:
+#   "native" - readmission_model.txt (LightGBM text format, no sklearn/joblib unpickling)
+#   "pickle" - readmission_model.pkl
+#   "auto"   - native when readmission_model.txt exists, otherwise pickle
+MODEL_FORMAT = os.getenv("MODEL_FORMAT", "auto")
+if MODEL_FORMAT not in ("auto", "native", "pickle"):
+    raise ValueError(f"MODEL_FORMAT must be 'auto', 'native' or 'pickle', got {MODEL_FORMAT!r}")
+
+# When the model artifacts load:
+#   "lazy"  - each on the first request that needs it
+#   "eager" - all at once in background threads started at import (the Lambda init phase),
+#             each followed by a dummy inference; requests wait only for what they use
+WARMUP_MODE = os.getenv("WARMUP_MODE", "lazy")
+if WARMUP_MODE not in ("lazy", "eager"):
+    raise ValueError(f"WARMUP_MODE must be 'lazy' or 'eager', got {WARMUP_MODE!r}")
+# Eager only: seconds the import blocks for the warm-up, keeping it inside the init phase (0 = don't wait)
+WARMUP_INIT_WAIT_S = float(os.getenv("WARMUP_INIT_WAIT_S", "0"))
+
+# Hot model reload (api/registry.py). MODEL_REGISTRY_URI unset watches ml/models/ in
+# place; a directory or s3://bucket/prefix holds <version>/ subdirectories plus a LATEST pointer.
+MODEL_REGISTRY_URI = os.getenv("MODEL_REGISTRY_URI", "")
+# Seconds between checks for a new version; 0 loads once and never reloads
+MODEL_POLL_INTERVAL_S = float(os.getenv("MODEL_POLL_INTERVAL_S", "30"))
+# Where S3 versions are downloaded (/tmp is the writable path on Lambda)
+MODEL_DOWNLOAD_DIR = os.getenv("MODEL_DOWNLOAD_DIR", "/tmp/model_registry")
+
+# Precomputed risk table (api/risk_table.py, written by train_model.py --risk-table-ages):
+# in-grid requests skip the booster. Cells re-scored against the booster at load (0 = all).
+RISK_TABLE_ENABLED = os.getenv("RISK_TABLE_ENABLED", "true").lower() in ("1", "true", "yes")
+RISK_TABLE_CHECK_CELLS = int(os.getenv("RISK_TABLE_CHECK_CELLS", "256"))
+
+# Scorer for rows the table doesn't answer:
+#   "numpy"   - api/tree_evaluator.py over the booster's dumped trees (checked against the booster at load)
+#   "booster" - Booster.predict
+RISK_SCORER = os.getenv("RISK_SCORER", "numpy")
+if RISK_SCORER not in ("numpy", "booster"):
+    raise ValueError(f"RISK_SCORER must be 'numpy' or 'booster', got {RISK_SCORER!r}")
+
+# Encounter feature index (api/feature_index.py, written by train_model.py --feature-index):
+# /predict_by_encounter and /predict_by_patient score IDs from it. IDs accepted per batch call.
+FEATURE_INDEX_ENABLED = os.getenv("FEATURE_INDEX_ENABLED", "true").lower() in ("1", "true", "yes")
+LOOKUP_MAX_IDS = int(os.getenv("LOOKUP_MAX_IDS", "10000"))
+
+# Result cache (api/cache.py) for risk, SHAP and NLP results
+CACHE_ENABLED = os.getenv("CACHE_ENABLED", "true").lower() in ("1", "true", "yes")
+CACHE_MAX_ENTRIES = int(os.getenv("CACHE_MAX_ENTRIES", "20000"))
+CACHE_TTL_SECONDS = float(os.getenv("CACHE_TTL_SECONDS", "3600"))
+# Precompute the whole age x gender x race grid when the app starts
+CACHE_WARM = os.getenv("CACHE_WARM", "false").lower() in ("1", "true", "yes")
+
+# /predict_combined runs its stages concurrently on a bounded thread pool.
+# SHAP and NLP are optional: past their timeout the response omits them.
+STAGE_POOL_WORKERS = int(os.getenv("STAGE_POOL_WORKERS", "8"))
+STAGE_TIMEOUT_SHAP_S = float(os.getenv("STAGE_TIMEOUT_SHAP_S", "10"))
+STAGE_TIMEOUT_NLP_S = float(os.getenv("STAGE_TIMEOUT_NLP_S", "10"))
+
+# Return the per-request stage breakdown in a Server-Timing response header
+TIMING_HEADER = os.getenv("TIMING_HEADER", "true").lower() in ("1", "true", "yes")
@@ -0,0 +1,245 @@
+"""
+Vectorized feature encoding shared by the risk predictor and SHAP explainer.
+
+Replaces the per-request pandas path (DataFrame -> get_dummies -> fill missing
+columns -> reorder) with lookup tables built once, from the model's feature
+spec (ml/feature_spec.py) or, for models without one, the booster's feature
+list. Inputs are written straight into a preallocated float32 matrix.
+"""
+import numpy as np
+from typing import Dict, List, Sequence, Tuple, Union
+
+from api.feature_spec import FeatureSpecError
+from api.schemas import PatientInput
+
+# Request normalization for models without a feature spec (see ml/feature_spec.py INPUTS)
+GENDER_MAP = {'male': 'M', 'female': 'F', 'm': 'M', 'f': 'F'}
+COLUMN_RENAMES = {'gender': 'GENDER', 'race': 'RACE'}
+DROP_COLUMNS = {'days_to_next', 'DAYS_TO_NEXT'}
+
+EncoderInput = Union[PatientInput, dict]
+
+
+class FeatureEncoder:
+    """
+    Maps patient inputs to the model's feature layout.
+
+    Numeric fields land in the column with the same name. String fields either
+    go to a native categorical feature as the category's code (models from
+    the Arrow training pipeline), or are one-hot encoded into the
+    `{COLUMN}_{value}` column exactly as `pd.get_dummies` named them (older
+    models). Values the model never saw are missing (NaN) for categorical
+    features and leave the row all zeros for one-hot ones, matching the old
+    missing-column fill.
+
+    Built from a feature spec, each request field is compiled to a column and
+    a raw value -> encoded value table, and requests with missing fields,
+    non-numeric numbers or values outside the training categories raise
+    FeatureSpecError instead of being encoded as missing.
+    """
+
+    def __init__(self, feature_names: Sequence[str], categories: Dict[str, Sequence[str]] = None,
+                 inputs: Dict[str, dict] = None, version: str = None):
+        self.feature_names = list(feature_names)
+        self.n_features = len(self.feature_names)
+        self.version = version
+        # Column-index lookup table: feature name -> position in the matrix
+        self.index = {name: i for i, name in enumerate(self.feature_names)}
+        # Categorical feature -> {category: code}; codes index the training category list
+        self.categories = {name: list(values) for name, values in (categories or {}).items()}
+        self.codes = {name: {value: code for code, value in enumerate(values)}
+                      for name, values in self.categories.items()}
+        # Row template: categorical features no input fills stay missing, not code 0
+        self.blank = np.zeros(self.n_features, dtype=np.float32)
+        for name in self.categories:
+            self.blank[self.index[name]] = np.nan
+        self.inputs = self._compile(inputs) if inputs is not None else None
+
+    @classmethod
+    def from_spec(cls, spec: dict) -> "FeatureEncoder":
+        """Encoder for a feature spec written by ml/feature_spec.py."""
+        names = [column["name"] for column in spec["features"]]
+        categories = {column["name"]: column["categories"]
+                      for column in spec["features"] if column["kind"] == "categorical"}
+        return cls(names, categories, spec["inputs"], spec["version"])
+
+    @classmethod
+    def from_booster(cls, booster) -> "FeatureEncoder":
+        """Feature layout plus the category lists LightGBM saved with the model."""
+        levels = booster.pandas_categorical or []
+        if not levels:
+            return cls(booster.feature_name())
+        # Categorical features list their category codes in feature_infos; dumping
+        # from past the last iteration skips serializing the trees
+        infos = booster.dump_model(start_iteration=booster.current_iteration())["feature_infos"]
+        categorical = [name for name, info in infos.items() if info["values"]]
+        return cls(booster.feature_name(), dict(zip(categorical, levels)))
+
+    def _compile(self, inputs: Dict[str, dict]) -> Dict[str, tuple]:
+        """
+        Request field -> (column index, lookup). lookup is None for numeric
+        columns; otherwise it maps each accepted raw value straight to the
+        category code (native categorical) or to the dummy column index
+        (one-hot, column index None).
+        """
+        compiled = {}
+        for field, spec in inputs.items():
+            column = spec["column"]
+            normalize = spec.get("map")
+            if column in self.codes:
+                codes = self.codes[column]
+                raw = normalize or {value: value for value in codes}
+                lookup = {value: codes[target] for value, target in raw.items() if target in codes}
+                compiled[field] = (self.index[column], lookup)
+            elif column in self.index:
+                compiled[field] = (self.index[column], None)
+            else:
+                dummies = {value[len(column) + 1:]: col for value, col in self.index.items()
+                           if value.startswith(f"{column}_")}
+                raw = normalize or {value: value for value in dummies}
+                compiled[field] = (None, {value: dummies[target] for value, target in raw.items()
+                                          if target in dummies})
+        return compiled
+
+    def encode(self, inputs: Union[EncoderInput, List[EncoderInput]]) -> np.ndarray:
+        """
+        Encode one input or a list of inputs.
+
+        Returns:
+            float32 array of shape (n_rows, n_features)
+        """
+        if isinstance(inputs, (dict, PatientInput)):
+            inputs = [inputs]
+
+        X = np.tile(self.blank, (len(inputs), 1))
+        if self.inputs is None:
+            for row, item in enumerate(inputs):
+                self._encode_row(item if isinstance(item, dict) else item.dict(), X[row])
+            return X
+
+        errors = []
+        for row, item in enumerate(inputs):
+            self._encode_spec_row(item if isinstance(item, dict) else item.dict(), X[row], row, errors)
+        if errors:
+            raise FeatureSpecError(errors, self.version)
+        return X
+
+    def sample_input(self) -> dict:
+        """A request the encoder accepts, for smoke-testing a freshly loaded model."""
+        if self.inputs is None:
+            return {"age": 60, "gender": "male", "race": "white"}
+        return {field: next(iter(lookup)) if lookup else 50 for field, (_, lookup) in self.inputs.items()}
+
+    def validate(self, inputs: Union[EncoderInput, List[EncoderInput]]) -> None:
+        """Raise FeatureSpecError if encode() would reject `inputs`."""
+        if self.inputs is not None:
+            self.encode(inputs)
+
+    def _encode_spec_row(self, data: Dict, out: np.ndarray, row: int, errors: List[dict]) -> None:
+        for field, (col, lookup) in self.inputs.items():
+            value = data.get(field)
+            if value is None:
+                errors.append({"row": row, "field": field, "msg": "field required"})
+            elif lookup is None:
+                if isinstance(value, bool) or not isinstance(value, (int, float)):
+                    errors.append({"row": row, "field": field, "msg": f"expected a number, got {value!r}"})
+                else:
+                    out[col] = value
+            else:
+                hit = lookup.get(value)
+                if hit is None:
+                    errors.append({"row": row, "field": field,
+                                   "msg": f"unknown value {value!r}, expected one of {sorted(lookup)}"})
+                elif col is None:
+                    out[hit] = 1.0
+                else:
+                    out[col] = hit
+
+    def _encode_row(self, data: Dict, out: np.ndarray) -> None:
+        index = self.index
+        for key, value in data.items():
+            if value is None or key in DROP_COLUMNS:
+                continue
+            if key == 'gender':
+                value = GENDER_MAP.get(value)
+                if value is None:
+                    continue
+            column = COLUMN_RENAMES.get(key, key)
+
+            codes = self.codes.get(column)
+            if codes is not None:
+                out[index[column]] = codes.get(value, np.nan)
+            elif isinstance(value, str):
+                col = index.get(f"{column}_{value}")
+                if col is not None:
+                    out[col] = 1.0
+            else:
+                col = index.get(column)
+                if col is not None:
+                    out[col] = value
+
+    def uses_column(self, name: str) -> bool:
+        """Whether a training-table column feeds any feature (directly or one-hot)."""
+        prefix = f"{name}_"
+        return name in self.index or any(f.startswith(prefix) for f in self.feature_names)
+
+    def known_values(self, column: str) -> List[str]:
+        """Categories the model was trained on for a string column."""
+        if column in self.categories:
+            return list(self.categories[column])
+        prefix = f"{column}_"
+        return [name[len(prefix):] for name in self.feature_names if name.startswith(prefix)]
+
+    def top_labels(self, X: np.ndarray, top: np.ndarray) -> np.ndarray:
+        """
+        Display names for the feature columns `top` (n_rows, k) picked per row
+        of X: categorical features read as `{COLUMN}_{value}`, like the one-hot
+        features of older models, everything else by feature name.
+        """
+        labels = np.array(self.feature_names, dtype=object)[top]
+        for name, values in self.categories.items():
+            col = self.index[name]
+            rows, slots = np.nonzero(top == col)
+            if not len(rows):
+                continue
+            codes = X[rows, col]
+            named = np.array([f"{name}_{value}" for value in values] + [name], dtype=object)
+            valid = ~np.isnan(codes) & (codes >= 0) & (codes < len(values))
+            labels[rows, slots] = named[np.where(valid, codes, len(values)).astype(np.intp)]
+        return labels
+
+    def encode_columns(self, n_rows: int, numeric: Dict[str, np.ndarray],
+                       categorical: Dict[str, Tuple[Sequence[str], np.ndarray]]) -> np.ndarray:
+        """
+        Encode columns laid out like the training table (fct_patient_features),
+        i.e. with the raw column names get_dummies saw, no API-side renames.
+
+        Args:
+            n_rows: Rows in the batch
+            numeric: column name -> values
+            categorical: column name -> (categories, codes), codes index into
+                categories and are -1 for nulls (dictionary encoding)
+
+        Returns:
+            float32 array of shape (n_rows, n_features); features the batch has
+            no column for stay as in `blank` (categorical ones missing, not code 0)
+        """
+        X = np.tile(self.blank, (n_rows, 1))
+        for name, values in numeric.items():
+            col = self.index.get(name)
+            if col is not None:
+                X[:, col] = values
+        for name, (categories, codes) in categorical.items():
+            model_codes = self.codes.get(name)
+            if model_codes is not None:
+                # Batch dictionary -> model category code, NaN for unseen values and nulls
+                lookup = np.array([model_codes.get(value, np.nan) for value in categories] + [np.nan],
+                                  dtype=np.float32)
+                X[:, self.index[name]] = lookup[codes]
+                continue
+            # Category -> feature column, -1 where the model has no such dummy
+            lookup = np.array([self.index.get(f"{name}_{value}", -1) for value in categories] + [-1], dtype=np.intp)
+            cols = lookup[codes]  # codes of -1 hit the trailing -1 sentinel
+            rows = np.nonzero(cols >= 0)[0]
+            X[rows, cols[rows]] = 1.0
+        return X
@@ -1,29 +1,79 @@
-import pandas as pd
-from api.model_loader import explainer, model
-
-def get_shap_explanation(input_data: dict) -> dict:
-    df = pd.DataFrame([input_data])
-    
-    # Transform to match training data format (same as predictor.py)
-    if 'gender' in df.columns:
-        df['gender'] = df['gender'].map({'male': 'M', 'female': 'F', 'm': 'M', 'f': 'F'})
-    
-    df = df.rename(columns={'gender': 'GENDER', 'race': 'RACE'})
-    
-    # Drop days_to_next if present (not used in training)
-    if 'days_to_next' in df.columns or 'DAYS_TO_NEXT' in df.columns:
-        df = df.drop(columns=['days_to_next', 'DAYS_TO_NEXT'], errors='ignore')
-    
-    df = pd.get_dummies(df)
-    
-    # Ensure all expected columns are present (same as predictor)
-    missing_cols = set(model.booster_.feature_name()) - set(df.columns)
-    for col in missing_cols:
-        df[col] = 0
-    
-    # Reorder columns to match model's expected order
-    df = df[model.booster_.feature_name()]
-    
-    shap_values = explainer(df)
-    contribs = dict(zip(df.columns, shap_values.values[0]))
-    return dict(sorted(contribs.items(), key=lambda item: abs(item[1]), reverse=True)[:5])
+import numpy as np
+from typing import List
+from api import config
+from api.cache import result_cache
+from api.metrics import timed
+from api.registry import registry
+from api.risk_table import answer_rows
+
+def get_shap_explanation(input_data: dict, models=None) -> dict:
+    return get_shap_explanation_batch([input_data], models=models)[0]
+
+def get_shap_explanation_batch(inputs: List[dict], top_k: int = 5, models=None) -> List[dict]:
+    """Top-k SHAP contributions per patient: precomputed table where it covers them, else one explainer call."""
+    models = models or registry.current()
+    with timed("encode"):
+        X = models.encoder.encode(inputs)
+    table = models.risk_table
+    # The table stores its top contributions computed by LightGBM's TreeSHAP
+    if table is not None and not (config.EXPLANATION_BACKEND == "native_contrib" and table.covers_top_k(top_k)):
+        table = None
+
+    def lookup(rows, cells) -> List[dict]:
+        with timed("risk_table"):
+            k = min(top_k, table.config["n_features"])
+            top = table.top_index[cells, :k].astype(np.intp)
+            return label_contributions(top, table.top_value[cells, :k], models.encoder.feature_names,
+                                       X[rows], models.encoder)
+
+    def live(rows: List[int]) -> List[dict]:
+        X_live = X[rows]
+        keys = [(row.tobytes(), top_k) for row in X_live]
+
+        def explain(missing: List[int]) -> List[dict]:
+            with timed("shap"):
+                if config.EXPLANATION_BACKEND == "native_contrib":
+                    contribs = native_contributions(X_live[missing], models)
+                else:
+                    contribs = models.explainer(X_live[missing]).values
+                return top_contributions(contribs, models.encoder.feature_names, top_k, X_live[missing],
+                                         models.encoder)
+
+        return result_cache.get_or_compute("shap", keys, explain, models.version)
+
+    return answer_rows(table, X, models.encoder.blank, lookup, live)
+
+def native_contributions(X: np.ndarray, models=None) -> np.ndarray:
+    # LightGBM computes exact TreeSHAP itself; the last column is the expected value
+    booster = (models or registry.current()).booster
+    return booster.predict(X, pred_contrib=True)[:, :-1]
+
+def top_indices(contribs: np.ndarray, top_k: int = 5) -> np.ndarray:
+    """Per row, column indices of the top_k |contributions|, largest first."""
+    k = min(top_k, contribs.shape[1])
+    magnitude = np.abs(contribs)
+    top = np.argpartition(-magnitude, k - 1, axis=1)[:, :k]
+    # argpartition leaves the k winners unordered; sort just those
+    order = np.argsort(-np.take_along_axis(magnitude, top, axis=1), axis=1, kind="stable")
+    return np.take_along_axis(top, order, axis=1)
+
+def top_contributions(contribs: np.ndarray, feature_names: List[str], top_k: int = 5,
+                      X: np.ndarray = None, encoder=None) -> List[dict]:
+    """
+    Per row, the top_k features by |contribution|, largest first. With the
+    encoded rows X and their encoder, categorical features are named after their value.
+    """
+    top = top_indices(contribs, top_k)
+    return label_contributions(top, np.take_along_axis(contribs, top, axis=1), feature_names, X, encoder)
+
+def label_contributions(top: np.ndarray, values: np.ndarray, feature_names: List[str],
+                        X: np.ndarray = None, encoder=None) -> List[dict]:
+    """{label: contribution} per row for the feature columns `top` and their `values`, both (n_rows, k)."""
+    if X is not None and encoder is not None and encoder.categories:
+        labels = encoder.top_labels(X, top)
+    else:
+        labels = np.array(feature_names, dtype=object)[top]
+    return [
+        {labels[row, slot]: values[row, slot] for slot in range(top.shape[1])}
+        for row in range(len(top))
+    ]
@@ -0,0 +1,92 @@
+"""
+Loader for the encounter feature index written by ml/feature_index.py.
+
+Every array is memory-mapped, so loading reads a JSON file and a few .npy
+headers whatever the index size. A lookup binary-searches the sorted key
+array (np.searchsorted touches log2(n) keys) and copies out only the feature
+rows it hits; nothing else is paged in. The rows are already encoded in the
+model's layout and go straight to the scorer. An index built for another
+feature spec is dropped at load (FeatureIndex.check) instead of served.
+"""
+import json
+import numpy as np
+from pathlib import Path
+from typing import List, Optional, Sequence
+
+FEATURE_INDEX_DIR = "feature_index"
+ARRAYS = ("encounter_ids", "features", "encounter_patient", "patient_ids", "patient_offsets", "patient_rows")
+
+
+class FeatureIndex:
+    def __init__(self, index_dir: Path, mmap: bool = True):
+        mode = 'r' if mmap else None
+        self.config = json.loads((index_dir / "config.json").read_text())
+        for name in ARRAYS:
+            setattr(self, name, np.load(index_dir / f"{name}.npy", mmap_mode=mode))
+
+    def __len__(self) -> int:
+        return len(self.encounter_ids)
+
+    @staticmethod
+    def _find(keys: np.ndarray, ids: Sequence[str]) -> np.ndarray:
+        """Position of each ID in the sorted `keys`, -1 where it isn't there."""
+        found = np.full(len(ids), -1, dtype=np.int64)
+        if not len(keys) or not len(ids):
+            return found
+        raw = [str(key).encode() for key in ids]
+        # Longer than the widest key: can't be present (and would be truncated by the cast)
+        fits = np.array([len(key) <= keys.itemsize for key in raw])
+        query = np.array([key if ok else b"" for key, ok in zip(raw, fits)], dtype=keys.dtype)
+        positions = np.searchsorted(keys, query)
+        inside = positions < len(keys)
+        hit = np.zeros(len(ids), dtype=bool)
+        hit[inside] = keys[positions[inside]] == query[inside]
+        hit &= fits
+        found[hit] = positions[hit]
+        return found
+
+    def encounter_rows(self, encounter_ids: Sequence[str]) -> np.ndarray:
+        """Row per encounter ID, -1 for IDs not in the index."""
+        return self._find(self.encounter_ids, encounter_ids)
+
+    def patient_rows_of(self, patient_ids: Sequence[str]) -> List[np.ndarray]:
+        """The rows of each patient's encounters (in encounter ID order), empty for unknown patients."""
+        positions = self._find(self.patient_ids, patient_ids)
+        known = positions >= 0
+        starts = np.zeros(len(positions), dtype=np.int64)
+        counts = np.zeros(len(positions), dtype=np.int64)
+        starts[known] = self.patient_offsets[positions[known]]
+        counts[known] = self.patient_offsets[positions[known] + 1] - starts[known]
+        # One gather from the mapping for all patients: start + 0..count-1 per patient
+        ends = np.cumsum(counts)
+        slots = np.arange(ends[-1] if len(ends) else 0) + np.repeat(starts - (ends - counts), counts)
+        return np.split(np.asarray(self.patient_rows[slots]), ends[:-1])
+
+    def rows(self, rows: np.ndarray) -> np.ndarray:
+        """Encoded feature matrix for `rows` (copied out of the mapping)."""
+        return np.asarray(self.features[rows], dtype=np.float32)
+
+    def encounter_id(self, rows: np.ndarray) -> List[str]:
+        return [key.decode() for key in self.encounter_ids[rows]]
+
+    def patient_id(self, rows: np.ndarray) -> List[str]:
+        return [key.decode() for key in self.patient_ids[self.encounter_patient[rows]]]
+
+    def check(self, encoder) -> None:
+        """Raise ValueError unless the index was built for this encoder's feature layout."""
+        if self.config["feature_spec_version"] != encoder.version:
+            raise ValueError(f"feature index was built for feature spec {self.config['feature_spec_version']}, "
+                             f"model has {encoder.version}")
+        if self.config["features"] != encoder.feature_names or self.features.shape[1:] != (encoder.n_features,):
+            raise ValueError("feature index columns do not match the model")
+
+
+def has_feature_index(model_dir: Path) -> bool:
+    return (model_dir / FEATURE_INDEX_DIR / "config.json").exists()
+
+
+def load_feature_index(model_dir: Path, mmap: bool = True) -> Optional[FeatureIndex]:
+    """The index, or None when none was built for this model."""
+    if not has_feature_index(model_dir):
+        return None
+    return FeatureIndex(model_dir / FEATURE_INDEX_DIR, mmap=mmap)
@@ -0,0 +1,32 @@
+"""
+Loader for the feature spec written by ml/feature_spec.py.
+
+Kept free of numpy/LightGBM imports so main.py can register the
+FeatureSpecError handler without loading the model.
+"""
+import json
+from pathlib import Path
+from typing import List, Optional
+
+SPEC_FILE = "feature_spec.json"
+SUPPORTED_SPEC_VERSIONS = {1}
+
+
+class FeatureSpecError(ValueError):
+    """A request the model's feature spec doesn't cover (unknown category, missing field, wrong type)."""
+
+    def __init__(self, errors: List[dict], version: str = None):
+        self.errors = errors
+        self.version = version
+        super().__init__("; ".join(f"{e['field']}: {e['msg']}" for e in errors))
+
+
+def load_feature_spec(model_dir: Path) -> Optional[dict]:
+    """The spec dict, or None for models trained before specs existed."""
+    path = model_dir / SPEC_FILE
+    if not path.exists():
+        return None
+    spec = json.loads(path.read_text())
+    if spec.get("spec_version") not in SUPPORTED_SPEC_VERSIONS:
+        raise ValueError(f"{path}: unsupported spec_version {spec.get('spec_version')!r}")
+    return spec
@@ -1,23 +1,57 @@
-from fastapi import FastAPI
+from fastapi import FastAPI, HTTPException
+from fastapi.responses import JSONResponse, PlainTextResponse
 from mangum import Mangum
-from api.schemas import PatientInput, PredictionOutput, ExplanationOutput, CombinedOutput
+from concurrent.futures import ThreadPoolExecutor
+from api.schemas import PatientInput, PredictionOutput, ExplanationOutput, CombinedOutput, BatchInput, BatchOutput
+from api.schemas import (EncounterPrediction, EncounterBatchInput, EncounterBatchOutput, PatientPrediction,
+                         PatientBatchInput, PatientBatchOutput)
+from api.batcher import MicroBatcher
+from api.cache import result_cache
+from api.feature_spec import FeatureSpecError
+from api.metrics import TimingMiddleware, registry, timed
+from api import config
+import asyncio
+import contextvars
+import json
 import logging
+import time
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger()
 
-app = FastAPI()
+class TimedJSONResponse(JSONResponse):
+    def render(self, content) -> bytes:
+        with timed("serialize"):
+            return super().render(content)
+
+app = FastAPI(default_response_class=TimedJSONResponse)
+app.add_middleware(TimingMiddleware)
+
+@app.exception_handler(FeatureSpecError)
+def feature_spec_error(request, exc: FeatureSpecError):
+    """Inputs outside the model's feature spec are the client's error, not a 500"""
+    return JSONResponse(status_code=422, content={"detail": exc.errors, "feature_spec_version": exc.version})
 
 # Don't import these at module level - lazy load for Lambda cold start optimization
 _predictor = None
 _explainer = None
 _nlp_predictor = None
+_batch_predictor = None
+_batch_explainer = None
+_batch_nlp_predictor = None
+_encounter_predictor = None
+_patient_predictor = None
+_risk_batcher = None
+
+# Bounded pool for the concurrent /predict_combined stages
+_stage_pool = ThreadPoolExecutor(max_workers=config.STAGE_POOL_WORKERS, thread_name_prefix="stage")
 
 def get_predictor():
     global _predictor
     if _predictor is None:
         logger.info("Loading predictor...")
-        from api.predictor import predict_risk
+        with timed("model_load"):
+            from api.predictor import predict_risk
         _predictor = predict_risk
         logger.info("Predictor loaded!")
     return _predictor
@@ -26,7 +60,8 @@ def get_explainer_func():
     global _explainer
     if _explainer is None:
         logger.info("Loading explainer...")
-        from api.explainer import get_shap_explanation
+        with timed("model_load"):
+            from api.explainer import get_shap_explanation
         _explainer = get_shap_explanation
         logger.info("Explainer loaded!")
     return _explainer
@@ -35,11 +70,90 @@ def get_nlp_predictor():
     global _nlp_predictor
     if _nlp_predictor is None:
         logger.info("Loading NLP predictor...")
-        from api.nlp_predictor import predict_diagnosis_from_complaint
+        with timed("model_load"):
+            from api.nlp_predictor import predict_diagnosis_from_complaint
         _nlp_predictor = predict_diagnosis_from_complaint
         logger.info("NLP predictor loaded!")
     return _nlp_predictor
 
+def get_batch_predictor():
+    global _batch_predictor
+    if _batch_predictor is None:
+        with timed("model_load"):
+            from api.predictor import predict_risk_batch
+        _batch_predictor = predict_risk_batch
+    return _batch_predictor
+
+def get_batch_explainer():
+    global _batch_explainer
+    if _batch_explainer is None:
+        with timed("model_load"):
+            from api.explainer import get_shap_explanation_batch
+        _batch_explainer = get_shap_explanation_batch
+    return _batch_explainer
+
+def get_batch_nlp_predictor():
+    global _batch_nlp_predictor
+    if _batch_nlp_predictor is None:
+        with timed("model_load"):
+            from api.nlp_predictor import predict_diagnoses_batch
+        _batch_nlp_predictor = predict_diagnoses_batch
+    return _batch_nlp_predictor
+
+def get_encounter_predictor():
+    global _encounter_predictor
+    if _encounter_predictor is None:
+        with timed("model_load"):
+            from api.predictor import predict_encounters
+        _encounter_predictor = predict_encounters
+    return _encounter_predictor
+
+def get_patient_predictor():
+    global _patient_predictor
+    if _patient_predictor is None:
+        with timed("model_load"):
+            from api.predictor import predict_patients
+        _patient_predictor = predict_patients
+    return _patient_predictor
+
+def get_models():
+    """The registry's active model set; each request reads it once and uses it throughout"""
+    from api.registry import registry
+    return registry.current()
+
+def score_batch_with_version(items):
+    models = get_models()
+    return [(risk, models.version) for risk in get_batch_predictor()(items, models)]
+
+def get_risk_batcher():
+    """Micro-batcher shared by concurrent /predict calls (only when MICROBATCH_WAIT_MS > 0)"""
+    global _risk_batcher
+    if _risk_batcher is None:
+        logger.info(f"Starting micro-batcher ({config.MICROBATCH_WAIT_MS} ms window)")
+        _risk_batcher = MicroBatcher(
+            score_batch_with_version,
+            max_wait_ms=config.MICROBATCH_WAIT_MS,
+            max_batch_size=config.MICROBATCH_MAX_SIZE
+        )
+    return _risk_batcher
+
+def warm_result_cache():
+    """Precompute risk + SHAP for the whole age x gender x race grid (Streamlit input ranges)"""
+    models = get_models()
+    if models.risk_table is not None:
+        logger.info("Risk table loaded; skipping result cache warm-up")
+        return
+    races = models.encoder.known_values("RACE")
+    grid = [
+        {"age": age, "gender": gender, "race": race}
+        for age in range(18, 101)
+        for gender in ("male", "female")
+        for race in races
+    ]
+    get_batch_predictor()(grid, models)
+    get_batch_explainer()(grid, models=models)
+    logger.info(f"Result cache warmed with {len(grid)} profiles")
+
 @app.get("/")
 def root():
     logger.info("Root endpoint hit")
@@ -48,59 +162,249 @@ def root():
 @app.get("/ping")
 def ping():
     logger.info("Ping endpoint hit")
-    return {"status": "ok"}
+    from api.registry import registry
+    # Never loads the model: null until the first request has
+    return {"status": "ok", "model_version": registry.version}
+
+@app.get("/model")
+def model_info():
+    """Active model version and hot-reload counters"""
+    from api.registry import registry
+    return registry.stats()
+
+@app.get("/metrics", response_class=PlainTextResponse)
+def metrics():
+    """Prometheus text format: stage/request latency histograms, cold vs warm invocations"""
+    return registry.render()
+
+@app.get("/cache/stats")
+def cache_stats():
+    return result_cache.stats()
+
+@app.get("/feature_spec")
+def feature_spec():
+    """The feature spec requests are validated against (null for models trained without one)"""
+    return get_models().feature_spec
 
 @app.post("/predict", response_model=PredictionOutput)
 def predict(input: PatientInput):
-    logger.info(f"Predict called with: {input.dict()}")
     try:
-        predict_func = get_predictor()
-        risk = predict_func(input.dict())
-        return {"readmission_risk": risk}
+        models = get_models()
+        # Rows the precomputed table answers never wait out the batching window
+        if config.MICROBATCH_WAIT_MS > 0 and not models.in_risk_table(input.dict()):
+            # Reject bad input before it joins a batch, so it can't fail its batch-mates
+            models.encoder.validate(input.dict())
+            risk, version = get_risk_batcher().submit(input.dict())
+        else:
+            predict_func = get_predictor()
+            risk, version = predict_func(input.dict(), models), models.version
+        return {"readmission_risk": risk, "model_version": version}
+    except FeatureSpecError:
+        raise
     except Exception as e:
         logger.error(f"Prediction error: {str(e)}", exc_info=True)
         raise
 
 @app.post("/explain", response_model=ExplanationOutput)
 def explain(input: PatientInput):
-    logger.info(f"Explain called with: {input.dict()}")
     try:
+        models = get_models()
         explain_func = get_explainer_func()
-        contribs = explain_func(input.dict())
-        return {"feature_contributions": contribs}
+        contribs = explain_func(input.dict(), models)
+        return {"feature_contributions": contribs, "model_version": models.version}
+    except FeatureSpecError:
+        raise
     except Exception as e:
         logger.error(f"Explanation error: {str(e)}", exc_info=True)
         raise
 
+async def run_stage(name: str, func, timeout: float, timings: dict):
+    """Run one stage on the stage pool; None if it misses its timeout."""
+    loop = asyncio.get_running_loop()
+    start = time.perf_counter()
+    try:
+        # copy_context() so stage timings land in this request's breakdown
+        context = contextvars.copy_context()
+        return await asyncio.wait_for(loop.run_in_executor(_stage_pool, context.run, func), timeout)
+    except asyncio.TimeoutError:
+        logger.warning(f"Stage '{name}' timed out after {timeout}s")
+        return None
+    finally:
+        timings[name] = round((time.perf_counter() - start) * 1000, 2)
+
 @app.post("/predict_combined", response_model=CombinedOutput)
-def predict_combined(input: PatientInput):
+async def predict_combined(input: PatientInput):
     """
     Combined endpoint: Structured risk model + NLP diagnosis prediction.
     Returns readmission risk, SHAP explanations, and NLP-predicted diagnoses.
+    The three stages run concurrently; SHAP and NLP are dropped (and listed in
+    timed_out_stages) if they miss their timeout, the risk score always returns.
     """
-    logger.info(f"Combined prediction called with: {input.dict()}")
+    data = input.dict()
+    start = time.perf_counter()
+    timings = {}
     try:
-        # Get structured model predictions
-        predict_func = get_predictor()
-        explain_func = get_explainer_func()
-        
-        risk = predict_func(input.dict())
-        risk_factors = explain_func(input.dict())
-        
+        # All stages score with the same model set (off the event loop: the first call loads it)
+        models = await asyncio.get_running_loop().run_in_executor(_stage_pool, get_models)
+        stages = [
+            run_stage("risk", lambda: get_predictor()(data, models), None, timings),
+            run_stage("shap", lambda: get_explainer_func()(data, models), config.STAGE_TIMEOUT_SHAP_S, timings),
+        ]
         # Get NLP diagnosis predictions if complaint provided
-        predicted_diagnoses = []
         if input.chief_complaint and len(input.chief_complaint.strip()) > 0:
-            nlp_func = get_nlp_predictor()
-            predicted_diagnoses = nlp_func(input.chief_complaint, top_k=3)
-        
+            stages.append(run_stage(
+                "nlp", lambda: get_nlp_predictor()(input.chief_complaint, top_k=3, models=models),
+                config.STAGE_TIMEOUT_NLP_S, timings
+            ))
+
+        results = await asyncio.gather(*stages)
+        risk, risk_factors = results[0], results[1]
+        predicted_diagnoses = results[2] if len(results) > 2 else []
+
+        timed_out = []
+        if risk_factors is None:
+            timed_out.append("shap")
+            risk_factors = {}
+        if predicted_diagnoses is None:
+            timed_out.append("nlp")
+            predicted_diagnoses = []
+
+        logger.info(json.dumps({
+            "event": "predict_combined",
+            "total_ms": round((time.perf_counter() - start) * 1000, 2),
+            "stage_ms": timings,
+            "timed_out_stages": timed_out
+        }))
         return {
             "readmission_risk": risk,
             "risk_factors": risk_factors,
-            "predicted_diagnoses": predicted_diagnoses
+            "predicted_diagnoses": predicted_diagnoses,
+            "timed_out_stages": timed_out,
+            "model_version": models.version
         }
+    except FeatureSpecError:
+        raise
     except Exception as e:
         logger.error(f"Combined prediction error: {str(e)}", exc_info=True)
         raise
 
+@app.post("/predict_batch", response_model=BatchOutput)
+def predict_batch(batch: BatchInput):
+    """
+    Batch endpoint: risk, SHAP top factors and NLP diagnoses for many patients.
+    Each stage runs as one vectorized model call over the whole batch.
+    """
+    logger.info(f"Batch prediction called for {len(batch.patients)} patients")
+    try:
+        if not batch.patients:
+            return {"results": []}
+
+        models = get_models()
+        rows = [patient.dict() for patient in batch.patients]
+        risks = get_batch_predictor()(rows, models)
+        risk_factors = get_batch_explainer()(rows, models=models)
+
+        complaints = [patient.chief_complaint for patient in batch.patients]
+        if any(c and c.strip() for c in complaints):
+            predicted_diagnoses = get_batch_nlp_predictor()(complaints, top_k=3, models=models)
+        else:
+            predicted_diagnoses = [[] for _ in rows]
+
+        return {
+            "results": [
+                {
+                    "readmission_risk": risk,
+                    "risk_factors": factors,
+                    "predicted_diagnoses": diagnoses
+                }
+                for risk, factors, diagnoses in zip(risks, risk_factors, predicted_diagnoses)
+            ],
+            "model_version": models.version
+        }
+    except FeatureSpecError:
+        raise
+    except Exception as e:
+        logger.error(f"Batch prediction error: {str(e)}", exc_info=True)
+        raise
+
+def get_indexed_models(ids: list):
+    """The active model set, if it has a feature index and `ids` is within LOOKUP_MAX_IDS"""
+    if len(ids) > config.LOOKUP_MAX_IDS:
+        raise HTTPException(status_code=422, detail=f"At most {config.LOOKUP_MAX_IDS} IDs per request, got {len(ids)}")
+    models = get_models()
+    if models.feature_index is None:
+        raise HTTPException(status_code=503, detail=f"Model version {models.version} has no feature index; "
+                                                    "train with --feature-index or run ml/feature_index.py")
+    return models
+
+@app.get("/predict_by_encounter/{encounter_id}", response_model=EncounterPrediction)
+def predict_by_encounter(encounter_id: str):
+    """Risk of an exported encounter, from its features in the model's feature index"""
+    models = get_indexed_models([encounter_id])
+    result = get_encounter_predictor()([encounter_id], models)[0]
+    if result["readmission_risk"] is None:
+        raise HTTPException(status_code=404, detail=f"Encounter {encounter_id!r} is not in the feature index")
+    return {**result, "model_version": models.version}
+
+@app.post("/predict_by_encounter", response_model=EncounterBatchOutput)
+def predict_by_encounter_batch(batch: EncounterBatchInput):
+    """Many encounters in one lookup and one model call; unknown IDs return nulls"""
+    models = get_indexed_models(batch.encounter_ids)
+    return {"results": get_encounter_predictor()(batch.encounter_ids, models), "model_version": models.version}
+
+@app.get("/predict_by_patient/{patient_id}", response_model=PatientPrediction)
+def predict_by_patient(patient_id: str):
+    """Risk of each of a patient's exported encounters, and the highest"""
+    models = get_indexed_models([patient_id])
+    result = get_patient_predictor()([patient_id], models)[0]
+    if not result["encounters"]:
+        raise HTTPException(status_code=404, detail=f"Patient {patient_id!r} is not in the feature index")
+    return {**result, "model_version": models.version}
+
+@app.post("/predict_by_patient", response_model=PatientBatchOutput)
+def predict_by_patient_batch(batch: PatientBatchInput):
+    """Many patients in one lookup and one model call; unknown IDs get no encounters"""
+    models = get_indexed_models(batch.patient_ids)
+    return {"results": get_patient_predictor()(batch.patient_ids, models), "model_version": models.version}
+
+def start_warmup():
+    """
+    Load every artifact at once in background threads (the booster on one,
+    the shap explainer and NLP model on the others, see load_model_set), then
+    run a dummy inference through each. Returns the warm-up's Future.
+    """
+    from api.registry import registry, smoke_check
+    pool = ThreadPoolExecutor(max_workers=3, thread_name_prefix="warmup")
+
+    def warm():
+        start = time.perf_counter()
+        models = registry.current(pool)
+        logger.info(f"Warm-up: model set {models.version} ready after {time.perf_counter() - start:.2f}s")
+        # Imports the request-path modules too
+        get_batch_predictor(), get_batch_explainer(), get_batch_nlp_predictor()
+        smoke_check(models)
+        logger.info(f"Warm-up: all artifacts loaded and exercised after {time.perf_counter() - start:.2f}s")
+
+    def report(future):
+        if future.exception() is not None:
+            # Requests load what they need themselves, as in lazy mode
+            logger.error(f"Warm-up failed: {future.exception()}")
+
+    future = pool.submit(warm)
+    future.add_done_callback(report)
+    return future
+
+if config.WARMUP_MODE == "eager":
+    _warmup = start_warmup()
+    if config.WARMUP_INIT_WAIT_S > 0:
+        try:
+            _warmup.result(timeout=config.WARMUP_INIT_WAIT_S)
+        except Exception:
+            # Logged by the callback, or still running; requests wait for what they need
+            pass
+
+if config.CACHE_WARM:
+    warm_result_cache()
+
 # Lambda handler
 handler = Mangum(app, lifespan="off")
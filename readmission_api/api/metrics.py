@@ -0,0 +1,150 @@
+"""
+Lightweight in-process instrumentation.
+
+Stage timings feed fixed-bucket histograms (a bisect and a locked add per
+observation) and, while a request is in flight, a per-request breakdown that
+TimingMiddleware returns in a `Server-Timing` header. /metrics renders
+everything in the Prometheus text format. Pure ASGI, so it behaves the same
+under uvicorn and behind the Mangum Lambda handler.
+"""
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, Optional
+
+from api import config
+
+# Seconds; covers sub-millisecond cache hits up to cold-start model loads
+BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05,
+           0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# Stage timings of the request being served (None outside a request). Stage threads
+# share their request's dict (contextvars.copy_context), so updates hold _timings_lock
+_request_timings: ContextVar[Optional[Dict[str, float]]] = ContextVar("request_timings", default=None)
+_timings_lock = threading.Lock()
+
+
+class Histogram:
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS) + 1)
+        self.total = 0.0
+        self.count = 0
+
+    def observe(self, seconds: float):
+        self.counts[bisect_left(BUCKETS, seconds)] += 1
+        self.total += seconds
+        self.count += 1
+
+
+class Registry:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.histograms: Dict[tuple, Histogram] = {}
+        self.counters: Dict[tuple, float] = {}
+
+    def observe(self, name: str, label: str, value: str, seconds: float):
+        key = (name, label, value)
+        with self._lock:
+            histogram = self.histograms.get(key)
+            if histogram is None:
+                histogram = self.histograms[key] = Histogram()
+            histogram.observe(seconds)
+
+    def inc(self, name: str, label: str, value: str, amount: float = 1):
+        key = (name, label, value)
+        with self._lock:
+            self.counters[key] = self.counters.get(key, 0) + amount
+
+    def render(self) -> str:
+        """Prometheus text exposition format."""
+        lines = []
+        with self._lock:
+            for name in sorted({key[0] for key in self.counters}):
+                lines.append(f"# TYPE {name} counter")
+                for (metric, label, value), total in sorted(self.counters.items()):
+                    if metric == name:
+                        lines.append(f'{name}{{{label}="{value}"}} {total}')
+            for name in sorted({key[0] for key in self.histograms}):
+                lines.append(f"# TYPE {name} histogram")
+                for (metric, label, value), histogram in sorted(self.histograms.items()):
+                    if metric != name:
+                        continue
+                    cumulative = 0
+                    for bound, count in zip(BUCKETS, histogram.counts):
+                        cumulative += count
+                        lines.append(f'{name}_bucket{{{label}="{value}",le="{bound}"}} {cumulative}')
+                    lines.append(f'{name}_bucket{{{label}="{value}",le="+Inf"}} {histogram.count}')
+                    lines.append(f'{name}_sum{{{label}="{value}"}} {histogram.total}')
+                    lines.append(f'{name}_count{{{label}="{value}"}} {histogram.count}')
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+
+
+def record_stage(stage: str, seconds: float):
+    registry.observe("readmission_stage_duration_seconds", "stage", stage, seconds)
+    timings = _request_timings.get()
+    if timings is not None:
+        with _timings_lock:
+            timings[stage] = timings.get(stage, 0.0) + seconds
+
+
+@contextmanager
+def timed(stage: str):
+    """Time a block as `stage` (model_load, encode, predict_proba, shap, nlp, serialize)."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        record_stage(stage, time.perf_counter() - start)
+
+
+def server_timing(timings: Dict[str, float]) -> bytes:
+    # A timed-out stage may still be adding to the dict
+    with _timings_lock:
+        timings = dict(timings)
+    return ", ".join(f"{stage};dur={seconds * 1000:.3f}" for stage, seconds in timings.items()).encode()
+
+
+class TimingMiddleware:
+    """
+    Per-request stage breakdown + request latency histogram + cold/warm
+    invocation counter. The first request a process serves is its cold one.
+    """
+
+    def __init__(self, app):
+        self.app = app
+        self._served = False
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        if not self._served:
+            self._served = True
+            registry.inc("readmission_invocations_total", "start", "cold")
+        else:
+            registry.inc("readmission_invocations_total", "start", "warm")
+
+        timings = {}
+        token = _request_timings.set(timings)
+        start = time.perf_counter()
+
+        async def send_with_timing(message):
+            if message["type"] == "http.response.start" and config.TIMING_HEADER:
+                timings["total"] = time.perf_counter() - start
+                message = {**message, "headers": [*message.get("headers", []), (b"server-timing", server_timing(timings))]}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            _request_timings.reset(token)
+            # Label by route template so path parameters don't explode cardinality
+            route = getattr(scope.get("route"), "path", "unmatched")
+            registry.observe("readmission_request_duration_seconds", "route", route,
+                             time.perf_counter() - start)
@@ -1,10 +1,189 @@
+import logging
+import threading
 import joblib
+from concurrent.futures import Executor, Future
 from pathlib import Path
-import os
+from api import config
+from api.bundle import has_booster, has_nlp_bundle, load_booster, load_nlp_bundle
+from api.encoder import FeatureEncoder
+from api.feature_index import FeatureIndex, load_feature_index
+from api.feature_spec import load_feature_spec
+from api.risk_table import load_risk_table
+from api.tree_evaluator import TreeEvaluator
+
+logger = logging.getLogger(__name__)
 
 # Get the directory where this file is located
 API_DIR = Path(__file__).parent.parent  # readmission_api/
 MODEL_DIR = API_DIR / "ml" / "models"
 
-model = joblib.load(MODEL_DIR / "readmission_model.pkl")
-explainer = joblib.load(MODEL_DIR / "shap_explainer.pkl")
+
+class ModelSet:
+    """
+    One consistent set of loaded artifacts. The registry (api/registry.py)
+    publishes a new ModelSet instead of changing one, so a request that holds
+    it keeps a matching booster, encoder and explainer for its whole run.
+    The shap explainer and the NLP model are loaded on first use, since most
+    requests never touch them, unless load_model_set was given a pool to
+    start them on; either way a request only waits for the artifact it reads.
+    """
+
+    def __init__(self, version: str, model_dir: Path, booster, encoder: FeatureEncoder,
+                 feature_spec: dict = None, risk_table=None, preloading: dict = None,
+                 evaluator: TreeEvaluator = None, feature_index: FeatureIndex = None):
+        self.version = version
+        self.model_dir = model_dir
+        self.booster = booster
+        self.encoder = encoder
+        self.feature_spec = feature_spec
+        self.risk_table = risk_table
+        self.evaluator = evaluator
+        self.feature_index = feature_index
+        # Artifact name -> Future, for the optional artifacts already loading on a pool
+        self._loads = dict(preloading or {})
+        self._lock = threading.Lock()
+
+    def _artifact(self, name: str):
+        future = self._loads.get(name)
+        if future is not None:
+            try:
+                return future.result()
+            except Exception:
+                # A failed background load is retried inline, like a lazy one
+                with self._lock:
+                    if self._loads.get(name) is future:
+                        del self._loads[name]
+        with self._lock:
+            future = self._loads.get(name)
+            if future is None:
+                # Raises without caching anything: the next request tries again
+                value = LOADERS[name](self.model_dir)
+                future = Future()
+                future.set_result(value)
+                self._loads[name] = future
+        return future.result()
+
+    def _loaded(self, name: str) -> bool:
+        future = self._loads.get(name)
+        return future is not None and future.done() and future.exception() is None
+
+    @property
+    def explainer(self):
+        """The pickled shap.Explainer; None unless EXPLANATION_BACKEND is "shap"."""
+        return self._artifact("explainer") if config.EXPLANATION_BACKEND == "shap" else None
+
+    @property
+    def nlp_model(self):
+        """
+        NumPy scorer over the serving bundle when available (no sklearn import),
+        otherwise the pickled sklearn Pipeline. Both expose classes_ / predict_proba.
+        """
+        return self._artifact("nlp_model")
+
+    @property
+    def nlp_loaded(self) -> bool:
+        return self._loaded("nlp_model")
+
+    def predict(self, X):
+        """P(readmitted) per encoded row: the NumPy evaluator when loaded (RISK_SCORER), else the booster."""
+        return (self.evaluator or self.booster).predict(X)
+
+    def in_risk_table(self, input_data: dict) -> bool:
+        """Whether the precomputed table answers this request (encoding it raises on invalid input)."""
+        if self.risk_table is None:
+            return False
+        return bool(self.risk_table.cells(self.encoder.encode(input_data), self.encoder.blank)[0] >= 0)
+
+    def has_nlp_model(self) -> bool:
+        return has_nlp_model(self.model_dir)
+
+
+def has_nlp_model(model_dir: Path) -> bool:
+    return has_nlp_bundle(model_dir) or (model_dir / "nlp_diagnosis_model.pkl").exists()
+
+
+def load_nlp_model(model_dir: Path):
+    model_path = model_dir / "nlp_diagnosis_model.pkl"
+    if config.MODEL_FORMAT != "pickle" and has_nlp_bundle(model_dir):
+        from api.nlp_scorer import NlpScorer
+        return NlpScorer(load_nlp_bundle(model_dir))
+    if model_path.exists():
+        return joblib.load(model_path)
+    raise FileNotFoundError(f"NLP diagnosis model not found at {model_path}. Run train_nlp_diagnosis.py first.")
+
+
+def load_explainer(model_dir: Path):
+    # Unpickling the explainer imports shap
+    return joblib.load(model_dir / "shap_explainer.pkl")
+
+
+# Optional artifacts a ModelSet loads on demand (or on a pool, see load_model_set)
+LOADERS = {"explainer": load_explainer, "nlp_model": load_nlp_model}
+
+
+def load_model_set(model_dir: Path, version: str, pool: Executor = None) -> ModelSet:
+    """
+    Load the booster, encoder, risk table and feature index. With `pool`, the explainer
+    (shap backend only) and the NLP model start loading on it first, alongside the booster.
+    """
+    preloading = {}
+    if pool is not None:
+        if config.EXPLANATION_BACKEND == "shap":
+            preloading["explainer"] = pool.submit(load_explainer, model_dir)
+        if has_nlp_model(model_dir):
+            preloading["nlp_model"] = pool.submit(load_nlp_model, model_dir)
+
+    if config.MODEL_FORMAT == "native" or (config.MODEL_FORMAT == "auto" and has_booster(model_dir)):
+        booster = load_booster(model_dir)
+    else:
+        # LGBMClassifier pickles (older training script) or a pickled Booster
+        model = joblib.load(model_dir / "readmission_model.pkl")
+        booster = getattr(model, "booster_", model)
+
+    # Built once per model set, shared by predictor and explainer: compiled from the
+    # feature spec training wrote, or from the booster's feature list for models that predate it
+    feature_spec = load_feature_spec(model_dir)
+    if feature_spec is not None:
+        encoder = FeatureEncoder.from_spec(feature_spec)
+        if encoder.feature_names != booster.feature_name():
+            raise ValueError(f"{model_dir}: feature spec {feature_spec['version']} does not match the model's features")
+    else:
+        encoder = FeatureEncoder.from_booster(booster)
+
+    risk_table = load_risk_table(model_dir) if config.RISK_TABLE_ENABLED else None
+    if risk_table is not None:
+        try:
+            risk_table.check(booster, encoder, config.RISK_TABLE_CHECK_CELLS)
+        except ValueError as e:
+            # Still a usable model; serve it from the booster alone
+            logger.error(f"{model_dir}: risk table disagrees with the model, not using it: {e}")
+            risk_table = None
+
+    feature_index = load_feature_index(model_dir) if config.FEATURE_INDEX_ENABLED else None
+    if feature_index is not None:
+        try:
+            feature_index.check(encoder)
+        except ValueError as e:
+            # Demographic requests still work; only the by-ID endpoints go unanswered
+            logger.error(f"{model_dir}: feature index does not match the model, not using it: {e}")
+            feature_index = None
+
+    evaluator = None
+    if config.RISK_SCORER == "numpy":
+        try:
+            evaluator = TreeEvaluator.from_booster(booster)
+            evaluator.check(booster)
+        except ValueError as e:
+            logger.error(f"{model_dir}: tree evaluator unavailable, scoring with the booster: {e}")
+            evaluator = None
+    return ModelSet(version, model_dir, booster, encoder, feature_spec, risk_table, preloading, evaluator,
+                    feature_index)
+
+
+def __getattr__(name):
+    # Offline scripts and benchmarks: `from api.model_loader import booster, encoder`
+    # resolves against the registry's active model set
+    if name in ("booster", "encoder", "explainer", "feature_spec"):
+        from api.registry import registry
+        return getattr(registry.current(), name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -1,41 +1,23 @@
 """
 NLP-based diagnosis prediction from chief complaint text.
 """
-import joblib
-from pathlib import Path
-from typing import List, Dict
+import logging
+from typing import List, Dict, Optional
+from api.cache import result_cache
+from api.metrics import timed
+from api.registry import registry
 
-# Get the directory where this file is located
-API_DIR = Path(__file__).parent.parent  # readmission_api/
-MODEL_DIR = API_DIR / "ml" / "models"
+logger = logging.getLogger(__name__)
 
-# Lazy load models
-_nlp_model = None
-_diagnosis_labels = None
+def get_nlp_model(models=None):
+    """The active model set's NLP model (loaded on first use, see ModelSet.nlp_model)."""
+    models = models or registry.current()
+    if not models.nlp_loaded:
+        with timed("model_load"):
+            return models.nlp_model
+    return models.nlp_model
 
-def get_nlp_model():
-    global _nlp_model
-    if _nlp_model is None:
-        model_path = MODEL_DIR / "nlp_diagnosis_model.pkl"
-        if model_path.exists():
-            _nlp_model = joblib.load(model_path)
-        else:
-            raise FileNotFoundError(
-                f"NLP diagnosis model not found at {model_path}. Run train_nlp_diagnosis.py first."
-            )
-    return _nlp_model
-
-def get_diagnosis_labels():
-    global _diagnosis_labels
-    if _diagnosis_labels is None:
-        labels_path = MODEL_DIR / "diagnosis_labels.pkl"
-        if labels_path.exists():
-            _diagnosis_labels = joblib.load(labels_path)
-        else:
-            _diagnosis_labels = []
-    return _diagnosis_labels
-
-def predict_diagnosis_from_complaint(complaint_text: str, top_k: int = 3) -> List[Dict[str, any]]:
+def predict_diagnosis_from_complaint(complaint_text: str, top_k: int = 3, models=None) -> List[Dict[str, any]]:
     """
     Predict likely diagnoses from chief complaint text.
     
@@ -46,29 +28,55 @@ def predict_diagnosis_from_complaint(complaint_text: str, top_k: int = 3) -> Lis
     Returns:
         List of dicts with 'diagnosis' and 'probability'
     """
-    if not complaint_text or len(complaint_text.strip()) < 3:
-        return []
+    return predict_diagnoses_batch([complaint_text], top_k=top_k, models=models)[0]
+
+def predict_diagnoses_batch(complaint_texts: List[Optional[str]], top_k: int = 3,
+                            models=None) -> List[List[Dict[str, any]]]:
+    """
+    Predict likely diagnoses for many chief complaints with one model call.
     
-    try:
-        model = get_nlp_model()
-        
-        # Get prediction probabilities
-        proba = model.predict_proba([complaint_text])[0]
-        classes = model.classes_
+    Args:
+        complaint_texts: Chief complaints; None or too-short entries get []
+        top_k: Number of top predictions to return per complaint
         
-        # Get top K predictions
-        top_indices = proba.argsort()[-top_k:][::-1]
+    Returns:
+        One list of {'diagnosis', 'probability'} dicts per input, in order
+    """
+    results = [[] for _ in complaint_texts]
+    valid = [i for i, text in enumerate(complaint_texts) if text and len(text.strip()) >= 3]
+    if not valid:
+        return results
+    
+    try:
+        models = models or registry.current()
+        texts = [complaint_texts[i] for i in valid]
+        keys = [(text, top_k) for text in texts]
         
-        results = []
-        for idx in top_indices:
-            if proba[idx] > 0.05:  # Only return if >5% confidence
-                results.append({
-                    "diagnosis": classes[idx],
-                    "probability": round(float(proba[idx]), 4)
-                })
+        def predict(missing: List[int]) -> List[List[Dict[str, any]]]:
+            model = get_nlp_model(models)
+            
+            # Get prediction probabilities
+            with timed("nlp"):
+                probas = model.predict_proba([texts[i] for i in missing])
+            classes = model.classes_
+            
+            predictions = []
+            for proba in probas:
+                # Get top K predictions
+                top_indices = proba.argsort()[-top_k:][::-1]
+                predictions.append([
+                    {
+                        "diagnosis": classes[idx],
+                        "probability": round(float(proba[idx]), 4)
+                    }
+                    for idx in top_indices
+                    if proba[idx] > 0.05  # Only return if >5% confidence
+                ])
+            return predictions
         
+        for i, diagnoses in zip(valid, result_cache.get_or_compute("nlp", keys, predict, models.version)):
+            results[i] = diagnoses
         return results
     except Exception as e:
-        print(f"NLP prediction error: {e}")
-        return []
-
+        logger.error(f"NLP prediction error: {e}", exc_info=True)
+        return [[] for _ in complaint_texts]
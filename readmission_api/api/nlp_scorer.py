@@ -0,0 +1,95 @@
+"""
+NumPy-only scorer for the TF-IDF + Multinomial Naive Bayes diagnosis model.
+
+Multinomial NB is linear in log space, so class scores are
+    class_log_prior + tfidf(text) . feature_log_prob
+and only the handful of vocabulary terms present in a complaint contribute.
+Built from the arrays in the serving bundle (api/bundle.py); reproduces
+sklearn's TfidfVectorizer(analyzer='word') + MultinomialNB.predict_proba.
+"""
+import re
+import numpy as np
+from typing import List
+
+from api.bundle import NlpBundle
+
+
+class NlpScorer:
+    """Drop-in for the fitted Pipeline: exposes `classes_` and `predict_proba`."""
+
+    def __init__(self, bundle: NlpBundle):
+        config = bundle.config
+        self.lowercase = config["lowercase"]
+        self.token_re = re.compile(config["token_pattern"])
+        self.min_n, self.max_n = config["ngram_range"]
+        self.stop_words = frozenset(config["stop_words"])
+        self.norm = config["norm"]
+        self.sublinear_tf = config["sublinear_tf"]
+
+        self.vocabulary = bundle.vocabulary
+        self.idf = np.asarray(bundle.idf) if config["use_idf"] else None
+        # (n_features, n_classes) so a complaint's terms are a contiguous row gather
+        self.feature_log_prob_T = np.ascontiguousarray(bundle.feature_log_prob.T)
+        self.class_log_prior = np.asarray(bundle.class_log_prior)
+        self.classes_ = np.asarray(bundle.classes).astype(object)
+
+    def _term_ids(self, text: str) -> List[int]:
+        """Vocabulary ids of the text's n-grams (sklearn's word analyzer)."""
+        if self.lowercase:
+            text = text.lower()
+        tokens = [t for t in self.token_re.findall(text) if t not in self.stop_words]
+
+        vocabulary = self.vocabulary
+        ids = []
+        for n in range(self.min_n, self.max_n + 1):
+            for i in range(len(tokens) - n + 1):
+                idx = vocabulary.get(tokens[i] if n == 1 else " ".join(tokens[i:i + n]))
+                if idx is not None:
+                    ids.append(idx)
+        return ids
+
+    def _tfidf(self, texts: List[str]):
+        """
+        TF-IDF for a batch in coordinate form: (row, feature id, weight) arrays.
+        Each (row, id) pair is packed into one integer key so a single
+        np.unique over the whole batch yields the term counts.
+        """
+        n_features = len(self.vocabulary)
+        keys = []
+        for row, text in enumerate(texts):
+            base = row * n_features
+            keys.extend(base + idx for idx in self._term_ids(text))
+        keys, counts = np.unique(np.array(keys, dtype=np.int64), return_counts=True)
+        rows, ids = np.divmod(keys, n_features)
+
+        weights = counts.astype(np.float64)
+        if self.sublinear_tf:
+            weights = np.log(weights) + 1
+        if self.idf is not None:
+            weights *= self.idf[ids]
+        if self.norm in ('l1', 'l2'):
+            if self.norm == 'l2':
+                norms = np.sqrt(np.bincount(rows, weights * weights, minlength=len(texts)))
+            else:
+                norms = np.bincount(rows, np.abs(weights), minlength=len(texts))
+            # Every row that has entries has a positive norm
+            weights /= norms[rows]
+        return rows, ids, weights
+
+    def predict_log_joint(self, texts: List[str]) -> np.ndarray:
+        """Unnormalized class log-probabilities, shape (n_texts, n_classes)."""
+        jll = np.tile(self.class_log_prior, (len(texts), 1))
+        rows, ids, weights = self._tfidf(texts)
+        if len(ids):
+            # Sparse dot product: only the terms present contribute. Entries are
+            # sorted by row, so each row's terms form one contiguous segment.
+            present, starts = np.unique(rows, return_index=True)
+            jll[present] += np.add.reduceat(weights[:, None] * self.feature_log_prob_T[ids], starts, axis=0)
+        return jll
+
+    def predict_proba(self, texts: List[str]) -> np.ndarray:
+        jll = self.predict_log_joint(texts)
+        # Normalize in log space (logsumexp), as MultinomialNB.predict_proba does
+        top = jll.max(axis=1, keepdims=True)
+        log_norm = top + np.log(np.exp(jll - top).sum(axis=1, keepdims=True))
+        return np.exp(jll - log_norm)
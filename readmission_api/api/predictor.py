@@ -1,29 +1,89 @@
-import pandas as pd
-from api.model_loader import model
-
-def predict_risk(input_data: dict) -> float:
-    df = pd.DataFrame([input_data])
-    
-    # Transform to match training data format
-    # gender: "male" -> "M", "female" -> "F"
-    # race: stays lowercase
-    # Column names: gender -> GENDER, race -> RACE, age -> age
-    if 'gender' in df.columns:
-        df['gender'] = df['gender'].map({'male': 'M', 'female': 'F', 'm': 'M', 'f': 'F'})
-    
-    df = df.rename(columns={'gender': 'GENDER', 'race': 'RACE'})
-    
-    # Drop days_to_next if present (not used in training)
-    if 'days_to_next' in df.columns or 'DAYS_TO_NEXT' in df.columns:
-        df = df.drop(columns=['days_to_next', 'DAYS_TO_NEXT'], errors='ignore')
-    
-    df = pd.get_dummies(df)
-
-    # Ensure all expected columns are present
-    missing_cols = set(model.booster_.feature_name()) - set(df.columns)
-    for col in missing_cols:
-        df[col] = 0
-
-    df = df[model.booster_.feature_name()]
-    risk = model.predict_proba(df)[0][1]
-    return round(risk, 4)
+from typing import List
+import numpy as np
+from api.cache import result_cache
+from api.metrics import timed
+from api.registry import registry
+from api.risk_table import answer_rows
+
+def predict_risk(input_data: dict, models=None) -> float:
+    return predict_risk_batch([input_data], models)[0]
+
+def predict_risk_batch(inputs: List[dict], models=None) -> List[float]:
+    """Score many patients: precomputed table where it covers them, else one vectorized model call (cache misses only)."""
+    # One model set for the whole call, even if the registry swaps meanwhile
+    models = models or registry.current()
+    with timed("encode"):
+        X = models.encoder.encode(inputs)
+    return predict_encoded_batch(X, models)
+
+def predict_encoded_batch(X: np.ndarray, models, use_table: bool = True) -> List[float]:
+    """
+    Risk per row of an encoded matrix. Feature index rows carry encounter features
+    the demographic risk table was never built on, so they pass use_table=False.
+    """
+    if not len(X):
+        return []
+
+    def lookup(rows, cells) -> List[float]:
+        with timed("risk_table"):
+            return [round(float(risk), 4) for risk in models.risk_table.risk[cells]]
+
+    def live(rows: List[int]) -> List[float]:
+        X_live = X[rows]
+        # The encoded row is the normalized input: "m" and "male" share an entry
+        keys = [row.tobytes() for row in X_live]
+
+        def score(missing: List[int]) -> List[float]:
+            # P(readmitted) from the NumPy tree evaluator (Booster.predict with RISK_SCORER=booster):
+            # same values as predict_proba()[:, 1] without the sklearn input validation
+            with timed("predict_proba"):
+                risks = models.predict(X_live[missing])
+            return [round(float(risk), 4) for risk in risks]
+
+        return result_cache.get_or_compute("risk", keys, score, models.version)
+
+    table = models.risk_table if use_table else None
+    return answer_rows(table, X, models.encoder.blank, lookup, live)
+
+def predict_encounters(encounter_ids: List[str], models=None) -> List[dict]:
+    """
+    Risk per encounter ID from the model set's feature index, in request order.
+    IDs the index doesn't hold come back with patient_id and readmission_risk None.
+    """
+    models = models or registry.current()
+    index = models.feature_index
+    with timed("feature_index"):
+        rows = index.encounter_rows(encounter_ids)
+        hit = np.nonzero(rows >= 0)[0]
+        X = index.rows(rows[hit])
+        patients = index.patient_id(rows[hit])
+    results = [{"encounter_id": encounter_id, "patient_id": None, "readmission_risk": None}
+               for encounter_id in encounter_ids]
+    for i, patient, risk in zip(hit, patients, predict_encoded_batch(X, models, use_table=False)):
+        results[i]["patient_id"] = patient
+        results[i]["readmission_risk"] = risk
+    return results
+
+def predict_patients(patient_ids: List[str], models=None) -> List[dict]:
+    """
+    Every indexed encounter of each patient, scored in one call across the batch,
+    plus the patient's highest risk; unknown patients get no encounters and None.
+    """
+    models = models or registry.current()
+    index = models.feature_index
+    with timed("feature_index"):
+        per_patient = index.patient_rows_of(patient_ids)
+        rows = np.concatenate(per_patient) if per_patient else np.empty(0, dtype=np.int64)
+        X = index.rows(rows)
+        encounter_ids = index.encounter_id(rows)
+    risks = predict_encoded_batch(X, models, use_table=False)
+
+    results, start = [], 0
+    for patient_id, patient_rows in zip(patient_ids, per_patient):
+        end = start + len(patient_rows)
+        encounters = [{"encounter_id": encounter_id, "patient_id": patient_id, "readmission_risk": risk}
+                      for encounter_id, risk in zip(encounter_ids[start:end], risks[start:end])]
+        results.append({"patient_id": patient_id, "encounters": encounters,
+                        "max_readmission_risk": max(risks[start:end]) if end > start else None})
+        start = end
+    return results
@@ -0,0 +1,290 @@
+"""
+Model registry: hot reload of the serving artifacts without a restart.
+
+The active ModelSet (api/model_loader.py) is loaded on first use. After that
+a daemon thread polls the model source every MODEL_POLL_INTERVAL_S seconds.
+When a new version shows up, the thread loads it, runs a smoke prediction
+through it, and publishes it with a single reference assignment. Requests
+read `registry.current()` once and keep that set, so they never wait on a
+reload or see half of one. A version that fails to load or fails the smoke
+check is logged and skipped, and the previous set keeps serving.
+
+Sources (MODEL_REGISTRY_URI):
+  unset                  ml/models/ watched in place; the version is a
+                         fingerprint of the file names, sizes and mtimes
+  /some/dir            } versioned layout: <uri>/<version>/<artifacts>, with
+  s3://bucket/prefix   } <uri>/LATEST naming the active version (else the
+                         greatest version). S3 versions are downloaded to
+                         MODEL_DOWNLOAD_DIR first. A local directory in this
+                         layout stands in for the bucket in tests.
+                         `python data_ingestion/s3_sync.py --sets models`
+                         publishes ml/models/ this way under s3://<bucket>/models.
+"""
+import hashlib
+import logging
+import math
+import os
+import shutil
+import threading
+import time
+from pathlib import Path
+from typing import Optional
+
+from api import config
+from api.cache import result_cache
+from api.metrics import timed
+
+logger = logging.getLogger(__name__)
+
+API_DIR = Path(__file__).parent.parent  # readmission_api/
+MODEL_DIR = API_DIR / "ml" / "models"
+LATEST = "LATEST"
+
+
+def artifact_version(model_dir: Path) -> str:
+    """Fingerprint of the model files (names, sizes, mtimes); cheap enough to poll."""
+    digest = hashlib.sha1()
+    if model_dir.exists():
+        for path in sorted(model_dir.rglob("*")):
+            if path.is_file():
+                stat = path.stat()
+                digest.update(f"{path.relative_to(model_dir)}:{stat.st_size}:{stat.st_mtime_ns};".encode())
+    return digest.hexdigest()[:12]
+
+
+class LocalDirSource:
+    """A flat model directory that training overwrites in place."""
+
+    # Files change one by one while training saves; only load a fingerprint seen on two polls in a row
+    settle = True
+
+    def __init__(self, model_dir: Path):
+        self.model_dir = model_dir
+
+    def latest(self) -> str:
+        return artifact_version(self.model_dir)
+
+    def fetch(self, version: str) -> Path:
+        return self.model_dir
+
+
+class VersionedDirSource:
+    """<root>/<version>/ directories, immutable once written; <root>/LATEST points at one."""
+
+    settle = False
+
+    def __init__(self, root: Path):
+        self.root = root
+
+    def latest(self) -> str:
+        pointer = self.root / LATEST
+        if pointer.exists():
+            return pointer.read_text().strip()
+        versions = sorted(path.name for path in self.root.iterdir() if path.is_dir())
+        if not versions:
+            raise FileNotFoundError(f"No model versions under {self.root}")
+        return versions[-1]
+
+    def fetch(self, version: str) -> Path:
+        return self.root / version
+
+
+class S3Source:
+    """The versioned layout in S3, downloaded per version into a local directory."""
+
+    settle = False
+
+    def __init__(self, uri: str, download_dir: Path):
+        bucket, _, prefix = uri[len("s3://"):].partition("/")
+        self.bucket = bucket
+        self.prefix = prefix.strip("/")
+        self.download_dir = download_dir
+        import boto3
+        self.s3 = boto3.client("s3", endpoint_url=os.getenv("S3_ENDPOINT_URL"))
+
+    def _key(self, *parts: str) -> str:
+        return "/".join(part for part in (self.prefix, *parts) if part)
+
+    def latest(self) -> str:
+        try:
+            body = self.s3.get_object(Bucket=self.bucket, Key=self._key(LATEST))["Body"].read()
+            return body.decode().strip()
+        except self.s3.exceptions.NoSuchKey:
+            pass
+        versions = []
+        paginator = self.s3.get_paginator("list_objects_v2")
+        list_prefix = f"{self.prefix}/" if self.prefix else ""
+        for page in paginator.paginate(Bucket=self.bucket, Prefix=list_prefix, Delimiter="/"):
+            versions += [p["Prefix"].rstrip("/").rsplit("/", 1)[-1] for p in page.get("CommonPrefixes", [])]
+        if not versions:
+            raise FileNotFoundError(f"No model versions under s3://{self.bucket}/{self.prefix}")
+        return max(versions)
+
+    def fetch(self, version: str) -> Path:
+        target = self.download_dir / version
+        if target.exists():
+            return target
+        # Download next to the target and rename, so a crash never leaves a partial version behind
+        partial = self.download_dir / f".{version}.partial"
+        shutil.rmtree(partial, ignore_errors=True)
+        prefix = self._key(version) + "/"
+        paginator = self.s3.get_paginator("list_objects_v2")
+        for page in paginator.paginate(Bucket=self.bucket, Prefix=prefix):
+            for obj in page.get("Contents", []):
+                path = partial / obj["Key"][len(prefix):]
+                path.parent.mkdir(parents=True, exist_ok=True)
+                self.s3.download_file(self.bucket, obj["Key"], str(path))
+        if not partial.exists():
+            raise FileNotFoundError(f"s3://{self.bucket}/{prefix} is empty")
+        partial.rename(target)
+        return target
+
+
+def source_from_config():
+    uri = config.MODEL_REGISTRY_URI
+    if not uri:
+        return LocalDirSource(MODEL_DIR)
+    if uri.startswith("s3://"):
+        return S3Source(uri, Path(config.MODEL_DOWNLOAD_DIR))
+    return VersionedDirSource(Path(uri))
+
+
+def smoke_check(models, full: bool = True):
+    """
+    Score one sample row (and, with `full`, explain it and run the NLP model)
+    through a freshly loaded set; raises if anything is off. Also the dummy
+    inference that warms each model up (WARMUP_MODE=eager).
+    """
+    from api.explainer import native_contributions
+    X = models.encoder.encode(models.encoder.sample_input())
+    risk = float(models.predict(X)[0])
+    if not (0.0 <= risk <= 1.0) or math.isnan(risk):
+        raise ValueError(f"smoke prediction out of range: {risk}")
+    if models.feature_index is not None and len(models.feature_index):
+        # Reads one row through the mapping; the index was checked against the encoder at load
+        indexed = float(models.predict(models.feature_index.rows([0]))[0])
+        if not (0.0 <= indexed <= 1.0) or math.isnan(indexed):
+            raise ValueError(f"smoke prediction from the feature index out of range: {indexed}")
+    if not full:
+        return
+    contribs = native_contributions(X, models)
+    if contribs.shape != (1, models.encoder.n_features):
+        raise ValueError(f"smoke explanation has shape {contribs.shape}")
+    if config.EXPLANATION_BACKEND == "shap":
+        values = models.explainer(X).values
+        if values.shape[0] != 1:
+            raise ValueError(f"smoke shap explanation has shape {values.shape}")
+    if models.has_nlp_model():
+        # Also loads the NLP model now, off the request path
+        probas = models.nlp_model.predict_proba(["chest pain and shortness of breath"])
+        if abs(float(probas.sum()) - 1.0) > 1e-6:
+            raise ValueError("smoke NLP probabilities don't sum to 1")
+
+
+class ModelRegistry:
+    def __init__(self, source, poll_interval: float):
+        self.source = source
+        self.poll_interval = poll_interval
+        self._current = None
+        self._lock = threading.Lock()
+        self._watcher = None
+        self._pending = None  # LocalDirSource: version seen once, loaded if it's still there next poll
+        self._rejected = None
+        self.reloads = 0
+        self.failed_reloads = 0
+        self.last_error = None
+
+    @property
+    def version(self) -> Optional[str]:
+        """Active version, None until the first load (never triggers one)."""
+        models = self._current
+        return models.version if models is not None else None
+
+    def current(self, pool=None):
+        """
+        The active ModelSet; the first call loads it, starting the optional
+        artifacts (explainer, NLP model) on `pool` if given.
+        """
+        models = self._current
+        if models is None:
+            with self._lock:
+                if self._current is None:
+                    with timed("model_load"):
+                        self._load_initial(pool)
+                models = self._current
+            self._start_watcher()
+        return models
+
+    def _load_initial(self, pool=None):
+        from api.model_loader import load_model_set
+        version = self.source.latest()
+        models = load_model_set(self.source.fetch(version), version, pool)
+        # Risk only: explaining and the NLP model would add to the cold start
+        smoke_check(models, full=False)
+        self._publish(models)
+
+    def _publish(self, models):
+        self._current = models
+        result_cache.set_version(models.version)
+        logger.info(f"Serving model version {models.version}")
+
+    def _start_watcher(self):
+        if self.poll_interval <= 0 or self._watcher is not None:
+            return
+        with self._lock:
+            if self._watcher is None:
+                self._watcher = threading.Thread(target=self._watch, name="model-registry", daemon=True)
+                self._watcher.start()
+
+    def _watch(self):
+        while True:
+            time.sleep(self.poll_interval)
+            try:
+                self.check()
+            except Exception as e:
+                logger.error(f"Model registry poll failed: {e}", exc_info=True)
+
+    def check(self) -> bool:
+        """Load and swap in the source's latest version if it is new; True when it swapped."""
+        from api.model_loader import load_model_set
+        version = self.source.latest()
+        if version == self.version or version == self._rejected:
+            return False
+        if self.source.settle and version != self._pending:
+            self._pending = version
+            return False
+
+        logger.info(f"Loading model version {version}")
+        start = time.perf_counter()
+        try:
+            candidate = load_model_set(self.source.fetch(version), version)
+            smoke_check(candidate)
+        except Exception as e:
+            self._rejected = version
+            self.failed_reloads += 1
+            self.last_error = f"{version}: {e}"
+            logger.error(f"Model version {version} rejected, still serving {self.version}: {e}", exc_info=True)
+            return False
+        if self.source.latest() != version:
+            # Files changed again while loading; pick it up on a later poll
+            return False
+        self._publish(candidate)
+        self.reloads += 1
+        logger.info(f"Swapped in model version {version} in {time.perf_counter() - start:.2f}s")
+        return True
+
+    def stats(self) -> dict:
+        models = self._current
+        return {
+            "model_version": self.version,
+            "risk_table": models is not None and models.risk_table is not None,
+            "risk_scorer": None if models is None else ("numpy" if models.evaluator is not None else "booster"),
+            "feature_index": None if models is None or models.feature_index is None else len(models.feature_index),
+            "poll_interval_s": self.poll_interval,
+            "reloads": self.reloads,
+            "failed_reloads": self.failed_reloads,
+            "last_error": self.last_error,
+        }
+
+
+registry = ModelRegistry(source_from_config(), config.MODEL_POLL_INTERVAL_S)
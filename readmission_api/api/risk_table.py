@@ -0,0 +1,121 @@
+"""
+Loader for the precomputed risk table written by ml/risk_table.py.
+
+The table covers every integer age in its range x every gender/race category.
+A request inside that grid is answered by indexing two arrays; anything else
+(ages out of range or fractional, rows with any other feature set, models
+without a feature spec) falls back to the booster. Before a model set serves, a sample of cells is re-scored
+with the live booster (RiskTable.check) so a table left over from another
+model is dropped instead of served.
+"""
+import json
+import numpy as np
+from pathlib import Path
+from typing import Callable, List, Optional
+
+RISK_TABLE_FILE = "risk_table.npz"
+
+
+class RiskTable:
+    def __init__(self, risk: np.ndarray, top_index: np.ndarray, top_value: np.ndarray, config: dict):
+        self.risk = risk
+        self.top_index = top_index
+        self.top_value = top_value
+        self.config = config
+        self.axes = config["axes"]
+        self.top_k = config["top_k"]
+        self.shape = tuple(axis["size"] for axis in self.axes)
+
+    def cells(self, X: np.ndarray, blank: np.ndarray) -> np.ndarray:
+        """
+        Flat cell index per encoded row of X, -1 where the row is outside the
+        grid: an axis value out of range, or any other column differing from
+        `blank` (the encoder's empty row, which the table was built on).
+        """
+        others = np.ones(X.shape[1], dtype=bool)
+        others[[axis["column"] for axis in self.axes]] = False
+        rest, empty = X[:, others], blank[others]
+        inside = np.all((rest == empty) | (np.isnan(rest) & np.isnan(empty)), axis=1)
+        index = []
+        for axis in self.axes:
+            offset = X[:, axis["column"]] - axis["low"]
+            # NaN (missing category) fails every comparison
+            inside &= (offset >= 0) & (offset < axis["size"]) & (offset == np.floor(offset))
+            index.append(np.where(inside, offset, 0).astype(np.intp))
+        return np.where(inside, np.ravel_multi_index(index, self.shape), -1)
+
+    def covers_top_k(self, top_k: int) -> bool:
+        # The live path keeps min(top_k, n_features) contributions
+        return min(top_k, self.config["n_features"]) <= self.top_k
+
+    def cell_matrix(self, cells: np.ndarray, blank: np.ndarray) -> np.ndarray:
+        """Encoded rows for `cells`, the inverse of cells()."""
+        X = np.tile(blank, (len(cells), 1))
+        for axis, offset in zip(self.axes, np.unravel_index(cells, self.shape)):
+            X[:, axis["column"]] = offset + axis["low"]
+        return X
+
+    def check(self, booster, encoder, sample: int = 256, seed: int = 0) -> None:
+        """
+        Raise ValueError unless the table was built for this encoder's feature
+        spec and `sample` random cells (0 = all) match the booster's risk and
+        top-k contributions.
+        """
+        if self.config["feature_spec_version"] != encoder.version:
+            raise ValueError(f"risk table was built for feature spec {self.config['feature_spec_version']}, "
+                             f"model has {encoder.version}")
+        if self.config["n_features"] != encoder.n_features or len(self.risk) != int(np.prod(self.shape)):
+            raise ValueError("risk table shape does not match the model")
+        for axis in self.axes:
+            if encoder.inputs.get(axis["field"], (None,))[0] != axis["column"]:
+                raise ValueError(f"risk table axis {axis['field']!r} does not match the feature spec")
+
+        cells = np.arange(len(self.risk))
+        if 0 < sample < len(cells):
+            cells = np.sort(np.random.default_rng(seed).choice(cells, sample, replace=False))
+        X = self.cell_matrix(cells, encoder.blank)
+        risk = booster.predict(X)
+        if not np.allclose(risk, self.risk[cells], rtol=0, atol=1e-9):
+            worst = int(np.argmax(np.abs(risk - self.risk[cells])))
+            raise ValueError(f"risk table cell {cells[worst]}: table {self.risk[cells[worst]]:.6f}, "
+                             f"model {risk[worst]:.6f}")
+        contribs = booster.predict(X, pred_contrib=True)[:, :-1]
+        k = self.top_k
+        stored = self.top_value[cells]
+        # Values at the stored columns, and those columns really being the top k (ties may order differently)
+        at_columns = np.take_along_axis(contribs, self.top_index[cells].astype(np.intp), axis=1)
+        largest = -np.sort(-np.abs(contribs), axis=1)[:, :k]
+        if not (np.allclose(at_columns, stored, rtol=0, atol=1e-9)
+                and np.allclose(np.abs(stored), largest, rtol=0, atol=1e-9)):
+            raise ValueError("risk table SHAP contributions do not match the model")
+
+
+def answer_rows(table: Optional[RiskTable], X: np.ndarray, blank: np.ndarray,
+                lookup: Callable[[np.ndarray, np.ndarray], list], live: Callable[[List[int]], list]) -> list:
+    """
+    Results for every row of X in order: lookup(rows, cells) for the rows the
+    table covers, live(rows) for the rest (all rows when there is no table).
+    """
+    if table is None:
+        return live(list(range(len(X))))
+    cells = table.cells(X, blank)
+    hit = np.nonzero(cells >= 0)[0]
+    results = [None] * len(X)
+    if len(hit):
+        for row, result in zip(hit, lookup(hit, cells[hit])):
+            results[row] = result
+    missing = np.nonzero(cells < 0)[0].tolist()
+    if not missing:
+        return results
+    for row, result in zip(missing, live(missing)):
+        results[row] = result
+    return results
+
+
+def load_risk_table(model_dir: Path) -> Optional[RiskTable]:
+    """The table, or None when training didn't write one."""
+    path = model_dir / RISK_TABLE_FILE
+    if not path.exists():
+        return None
+    with np.load(path) as data:
+        return RiskTable(data["risk"], data["top_index"], data["top_value"], json.loads(str(data["config"])))
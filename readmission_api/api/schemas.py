@@ -9,16 +9,66 @@ class PatientInput(BaseModel):
 
 class PredictionOutput(BaseModel):
     readmission_risk: float
+    model_version: Optional[str] = None  # registry version that scored the request
 
 class ExplanationOutput(BaseModel):
     feature_contributions: dict
+    model_version: Optional[str] = None
 
 class DiagnosisOutput(BaseModel):
     diagnosis: str
     probability: float
 
-class CombinedOutput(BaseModel):
-    """Combined output from structured + NLP models"""
+class BatchResult(BaseModel):
+    """Structured risk + SHAP + NLP output for one patient of a /predict_batch call"""
     readmission_risk: float
     risk_factors: Dict[str, float]  # SHAP values
     predicted_diagnoses: List[DiagnosisOutput]  # NLP predictions
+
+class CombinedResult(BatchResult):
+    """Combined output from structured + NLP models"""
+    timed_out_stages: List[str] = []  # "shap" / "nlp" when that part was skipped
+
+class CombinedOutput(CombinedResult):
+    model_version: Optional[str] = None
+
+class BatchInput(BaseModel):
+    patients: List[PatientInput]
+
+class BatchOutput(BaseModel):
+    """One BatchResult per patient, in request order"""
+    results: List[BatchResult]
+    model_version: Optional[str] = None
+
+class EncounterRisk(BaseModel):
+    """Risk of one encounter looked up in the feature index"""
+    encounter_id: str
+    patient_id: Optional[str] = None  # null (with readmission_risk) when the index doesn't hold the encounter
+    readmission_risk: Optional[float] = None
+
+class EncounterPrediction(EncounterRisk):
+    model_version: Optional[str] = None
+
+class EncounterBatchInput(BaseModel):
+    encounter_ids: List[str]
+
+class EncounterBatchOutput(BaseModel):
+    """One EncounterRisk per requested ID, in request order"""
+    results: List[EncounterRisk]
+    model_version: Optional[str] = None
+
+class PatientRisk(BaseModel):
+    """Every indexed encounter of a patient, scored; empty for unknown patients"""
+    patient_id: str
+    encounters: List[EncounterRisk]
+    max_readmission_risk: Optional[float] = None
+
+class PatientPrediction(PatientRisk):
+    model_version: Optional[str] = None
+
+class PatientBatchInput(BaseModel):
+    patient_ids: List[str]
+
+class PatientBatchOutput(BaseModel):
+    results: List[PatientRisk]
+    model_version: Optional[str] = None
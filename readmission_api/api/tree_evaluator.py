@@ -0,0 +1,317 @@
+"""
+NumPy evaluator for a LightGBM booster's trees.
+
+Booster.predict pays a fixed cost on every call (argument checks, C API
+setup, thread dispatch) that is far larger than walking the trees for one
+row. Here the booster's dump_model() is flattened once into contiguous
+per-node arrays (split feature, threshold, children, leaf value, default
+direction). When every tree has at most 64 leaves they are compiled further
+into per-feature leaf bitmasks, so a batch is scored with a few array
+operations per feature however deep the trees are; otherwise all trees are
+walked together for every row, one level per step. The split rules are
+LightGBM's own (tree.h NumericalDecision / CategoricalDecision, including
+missing values) and the trees are summed in order, so raw scores match
+Booster.predict(raw_score=True) exactly.
+"""
+from bisect import bisect_left
+
+import numpy as np
+
+MISSING_TYPES = {"None": 0, "Zero": 1, "NaN": 2}
+MISSING_NONE, MISSING_ZERO, MISSING_NAN = 0, 1, 2
+ZERO_THRESHOLD = float(np.float32(1e-35))  # LightGBM's kZeroThreshold, declared as 1e-35f
+
+
+class TreeEvaluator:
+    """
+    Node arrays are indexed by a global node id across all trees. Leaves point
+    to themselves, so rows that reach a leaf early just stay there until the
+    deepest tree is done.
+    """
+
+    def __init__(self, model: dict):
+        """`model` is Booster.dump_model() output for a binary model."""
+        objective = model["objective"].split()
+        if model["num_tree_per_iteration"] != 1 or objective[0] != "binary":
+            raise ValueError(f"Only binary models are supported, got {model['objective']!r}")
+        self.sigmoid = float(dict(part.split(":") for part in objective[1:]).get("sigmoid", 1.0))
+        self.average_output = model.get("average_output", False)
+        self.feature_names = model["feature_names"]
+
+        feature, threshold, default_left, missing_type = [], [], [], []
+        left, right, leaf_value, cat_row = [], [], [], []
+        categories = []  # per categorical split, the category codes that go left
+        roots, depth = [], 0
+        # For the bitmask path: node -> tree, and per tree its leaves left to right
+        tree_of, tree_leaves = [], []
+
+        for tree in model["tree_info"]:
+            if tree.get("is_linear"):
+                raise ValueError("Linear trees are not supported")
+            roots.append(len(feature))
+            tree_leaves.append([])
+            # (dict, depth, parent id, is left child); left children pop first, so leaves come out left to right
+            stack = [(tree["tree_structure"], 0, None, False)]
+            while stack:
+                node, level, parent, is_left = stack.pop()
+                node_id = len(feature)
+                if parent is not None:
+                    (left if is_left else right)[parent] = node_id
+                depth = max(depth, level)
+                tree_of.append(len(roots) - 1)
+                if "leaf_value" in node:
+                    tree_leaves[-1].append(node_id)
+                    feature.append(0)
+                    threshold.append(0.0)
+                    default_left.append(False)
+                    missing_type.append(MISSING_NONE)
+                    left.append(node_id)
+                    right.append(node_id)
+                    leaf_value.append(node["leaf_value"])
+                    cat_row.append(-1)
+                    continue
+                feature.append(node["split_feature"])
+                default_left.append(node["default_left"])
+                missing_type.append(MISSING_TYPES[node["missing_type"]])
+                left.append(-1)
+                right.append(-1)
+                leaf_value.append(0.0)
+                if node["decision_type"] == "==":
+                    # "1||4||5": categories sent left
+                    threshold.append(0.0)
+                    cat_row.append(len(categories))
+                    categories.append([int(code) for code in str(node["threshold"]).split("||")])
+                else:
+                    # dump_model writes infinite thresholds as +-1e300 (AvoidInf); the trees compare against inf
+                    value = node["threshold"]
+                    threshold.append(np.copysign(np.inf, value) if abs(value) >= 1e300 else value)
+                    cat_row.append(-1)
+                stack.append((node["right_child"], level + 1, node_id, False))
+                stack.append((node["left_child"], level + 1, node_id, True))
+
+        self.roots = np.array(roots, dtype=np.intp)
+        self.depth = depth
+        self.feature = np.array(feature, dtype=np.intp)
+        self.threshold = np.array(threshold, dtype=np.float64)
+        self.default_left = np.array(default_left, dtype=bool)
+        self.missing_type = np.array(missing_type, dtype=np.int8)
+        self.left = np.array(left, dtype=np.intp)
+        self.right = np.array(right, dtype=np.intp)
+        self.leaf_value = np.array(leaf_value, dtype=np.float64)
+        self.cat_row = np.array(cat_row, dtype=np.intp)
+        # Membership table: cat_member[split, code] is True when that code goes left
+        width = max((max(codes) for codes in categories), default=-1) + 1
+        self.cat_member = np.zeros((max(len(categories), 1), max(width, 1)), dtype=bool)
+        for row, codes in enumerate(categories):
+            self.cat_member[row, codes] = True
+        self.has_categorical = bool(categories)
+        self.n_features = len(self.feature_names)
+        self.masks = self._compile_masks(np.array(tree_of, dtype=np.intp), tree_leaves, categories) \
+            if max(len(leaves) for leaves in tree_leaves or [[]]) <= 64 else None
+
+    def _compile_masks(self, tree_of: np.ndarray, tree_leaves: list, categories: list) -> list:
+        """
+        Bitmask form of the trees (QuickScorer): bit i of a tree's word is its
+        i-th leaf from the left. A split that sends the row right rules out its
+        left subtree's leaves, so the row's exit leaf is the lowest bit left
+        after ANDing the masks of every split that goes right. Which splits go
+        right depends only on the value of their feature, so per feature the
+        masks are pre-ANDed for every interval between its thresholds (plus
+        NaN, zero and each category code). Scoring is then one lookup per
+        feature, whatever the depth.
+        """
+        n_trees = len(tree_leaves)
+        # Leaf bit per node, and per internal node the bits of its left subtree
+        bit = np.zeros(len(self.feature), dtype=np.uint64)
+        for leaves in tree_leaves:
+            for position, node in enumerate(leaves):
+                bit[node] = np.uint64(1) << np.uint64(position)
+        subtree = bit.copy()
+        # Children always get larger ids than their parent: fold bits upwards in reverse id order
+        for node in range(len(self.feature) - 1, -1, -1):
+            if self.left[node] != node:
+                subtree[node] = subtree[self.left[node]] | subtree[self.right[node]]
+        internal = np.nonzero(self.left != np.arange(len(self.left)))[0]
+        rule_out = {int(node): ~subtree[self.left[node]] for node in internal}
+        # Leaf values by (tree, leaf bit), flattened; leaf_offset[tree] is the tree's first entry
+        leaf_table = np.zeros((n_trees, 64), dtype=np.float64)
+        for tree, leaves in enumerate(tree_leaves):
+            leaf_table[tree, :len(leaves)] = self.leaf_value[leaves]
+        self.leaf_table = leaf_table.ravel()
+        self.leaf_offset = np.arange(n_trees, dtype=np.intp) * 64
+
+        def combined(nodes) -> np.ndarray:
+            """Per tree, the AND of rule_out over `nodes` (all ones where none of them)."""
+            mask = np.full(n_trees, np.uint64(0xFFFFFFFFFFFFFFFF))
+            for node in nodes:
+                mask[tree_of[node]] &= rule_out[node]
+            return mask
+
+        groups = []
+        for f in range(self.n_features):
+            nodes = internal[self.feature[internal] == f]
+            if not len(nodes):
+                continue
+            cat_nodes = nodes[self.cat_row[nodes] >= 0]
+            if len(cat_nodes):
+                # Rows: each valid code, then one for NaN / negative / unseen codes (always right)
+                width = max(max(categories[self.cat_row[node]]) for node in cat_nodes) + 1
+                table = np.stack([combined(node for node in cat_nodes
+                                           if not self.cat_member[self.cat_row[node], code])
+                                  for code in range(width)] + [combined(cat_nodes)])
+                groups.append(("categorical", f, width, table, None))
+                continue
+            # Zero-as-missing splits decide zeros by default_left, the rest by threshold
+            for kind, members in (("numeric", nodes[self.missing_type[nodes] != MISSING_ZERO]),
+                                  ("zero", nodes[self.missing_type[nodes] == MISSING_ZERO])):
+                if not len(members):
+                    continue
+                thresholds = np.unique(self.threshold[members])
+                order = members[np.argsort(self.threshold[members], kind="stable")]
+                # Row k (k thresholds below x): the splits with threshold <= thresholds[k - 1] go right
+                rows = [combined([])]
+                position = 0
+                for value in thresholds:
+                    step = rows[-1].copy()
+                    while position < len(order) and self.threshold[order[position]] <= value:
+                        node = order[position]
+                        step[tree_of[node]] &= rule_out[int(node)]
+                        position += 1
+                    rows.append(step)
+                # NaN row: None -> compared as 0.0, NaN / Zero -> default direction
+                nan_right = [node for node in members
+                             if not (self.default_left[node] if self.missing_type[node] != MISSING_NONE
+                                     else 0.0 <= self.threshold[node])]
+                rows.append(combined(nan_right))
+                if kind == "zero":
+                    # Zero row: every split takes its default direction
+                    rows.append(combined(node for node in members if not self.default_left[node]))
+                groups.append((kind, f, thresholds, np.stack(rows), thresholds.tolist()))
+        return groups
+
+    def probe_rows(self, rows: int = 256, seed: int = 0) -> np.ndarray:
+        """
+        Random rows around the split points: each threshold and the next double
+        up, every category code, 0, -1, +-inf and NaN.
+        """
+        rng = np.random.default_rng(seed)
+        X = np.empty((rows, self.n_features))
+        internal = self.left != np.arange(len(self.left))
+        for f in range(self.n_features):
+            splits = internal & (self.feature == f)
+            numeric = self.threshold[splits & (self.cat_row < 0)]
+            codes = np.arange(self.cat_member.shape[1] + 1) if (splits & (self.cat_row >= 0)).any() else []
+            values = np.concatenate([numeric, np.nextafter(numeric, np.inf), codes, [0.0, -1.0, np.inf, -np.inf, np.nan]])
+            X[:, f] = rng.choice(values, rows)
+        return X
+
+    def check(self, booster, rows: int = 256, seed: int = 0) -> None:
+        """Raise ValueError unless raw scores equal the booster's on `rows` probe_rows()."""
+        X = self.probe_rows(rows, seed)
+        expected = booster.predict(X, raw_score=True)
+        got = self.raw_score(X)
+        differ = ~((expected == got) | (np.isnan(expected) & np.isnan(got)))
+        if differ.any():
+            raise ValueError(f"raw scores differ from the booster's on {int(differ.sum())} of {rows} rows "
+                             f"(max {np.nanmax(np.abs(expected - got)):.3g})")
+
+    @classmethod
+    def from_booster(cls, booster) -> "TreeEvaluator":
+        return cls(booster.dump_model())
+
+    def _go_left(self, x: np.ndarray, node: np.ndarray) -> np.ndarray:
+        nan = np.isnan(x)
+        missing = self.missing_type[node]
+        # NumericalDecision: NaN counts as 0 unless the split tracks NaN itself
+        value = np.where(nan & (missing != MISSING_NAN), 0.0, x)
+        is_missing = (((missing == MISSING_ZERO) & (np.abs(value) <= ZERO_THRESHOLD))
+                      | ((missing == MISSING_NAN) & nan))
+        go_left = np.where(is_missing, self.default_left[node], value <= self.threshold[node])
+        if not self.has_categorical:
+            return go_left
+        # CategoricalDecision: NaN and negative codes go right; codes truncate like static_cast<int>
+        cat = self.cat_row[node]
+        width = self.cat_member.shape[1]
+        valid = (cat >= 0) & ~nan & (x > -1) & (x < width)
+        code = np.where(valid, x, 0).astype(np.intp)
+        in_set = valid & self.cat_member[np.maximum(cat, 0), code]
+        return np.where(cat >= 0, in_set, go_left)
+
+    def _leaf_values_by_levels(self, X: np.ndarray) -> np.ndarray:
+        node = np.repeat(self.roots[None, :], len(X), axis=0)
+        rows = np.arange(len(X))[:, None]
+        for _ in range(self.depth):
+            go_left = self._go_left(X[rows, self.feature[node]], node)
+            node = np.where(go_left, self.left[node], self.right[node])
+        return self.leaf_value[node]
+
+    def _exit_leaves(self, mask: np.ndarray) -> np.ndarray:
+        # Lowest set bit -> its position (powers of two convert to float exactly) -> leaf value
+        lowest = mask & (~mask + np.uint64(1))
+        position = np.frexp(lowest.astype(np.float64))[1] - 1
+        return self.leaf_table[self.leaf_offset + position]
+
+    def _leaf_values_by_masks(self, X: np.ndarray) -> np.ndarray:
+        mask = None
+        for kind, f, thresholds, table, _ in self.masks:
+            x = X[:, f]
+            if kind == "categorical":
+                # `thresholds` is the code width here; anything else is the always-right row
+                index = np.where((x > -1) & (x < thresholds), x, thresholds).astype(np.intp)
+            else:
+                index = np.searchsorted(thresholds, x)
+                index[np.isnan(x)] = len(thresholds) + 1
+                if kind == "zero":
+                    index[x == 0.0] = len(thresholds) + 2
+            if mask is None:
+                mask = table[index]
+            else:
+                mask &= table[index]
+        if mask is None:
+            # No splits at all: every tree is a single leaf
+            mask = np.ones((len(X), len(self.roots)), dtype=np.uint64)
+        return self._exit_leaves(mask)
+
+    def _leaf_values_for_row(self, row: list) -> np.ndarray:
+        """_leaf_values_by_masks for one row of Python floats: the table rows are found without numpy calls."""
+        mask = None
+        for kind, f, thresholds, table, bounds in self.masks:
+            x = row[f]
+            if -ZERO_THRESHOLD <= x <= ZERO_THRESHOLD:
+                x = 0.0
+            if kind == "categorical":
+                index = int(x) if -1 < x < thresholds else thresholds
+            elif x != x:
+                index = len(bounds) + 1
+            elif kind == "zero" and x == 0.0:
+                index = len(bounds) + 2
+            else:
+                index = bisect_left(bounds, x)
+            mask = table[index] if mask is None else mask & table[index]
+        if mask is None:
+            mask = np.ones(len(self.roots), dtype=np.uint64)
+        return self._exit_leaves(mask)
+
+    def raw_score(self, X: np.ndarray) -> np.ndarray:
+        """Sum of leaf values per row, the same as Booster.predict(X, raw_score=True)."""
+        X = np.asarray(X, dtype=np.float64)
+        if X.ndim == 1:
+            X = X[None, :]
+        if self.masks is not None and len(X) == 1:
+            leaves = self._leaf_values_for_row(X[0].tolist())[None, :]
+        else:
+            # Booster.predict passes rows on as sparse pairs: |x| <= kZeroThreshold is dropped, i.e. read as 0
+            X = np.where(np.abs(X) <= ZERO_THRESHOLD, 0.0, X)
+            if self.masks is not None:
+                leaves = self._leaf_values_by_masks(X)
+            else:
+                leaves = self._leaf_values_by_levels(X)
+        # LightGBM adds the trees one after another; cumsum keeps that order (sum() is pairwise)
+        score = np.cumsum(leaves, axis=1)[:, -1] if leaves.shape[1] else np.zeros(len(X))
+        if self.average_output:
+            score = score / leaves.shape[1]
+        return score
+
+    def predict(self, X: np.ndarray) -> np.ndarray:
+        """P(readmitted) per row, like Booster.predict for the binary objective."""
+        return 1.0 / (1.0 + np.exp(-self.sigmoid * self.raw_score(X)))
@@ -0,0 +1,253 @@
+"""
+Load test / latency benchmark for the serving API.
+
+Drives the FastAPI app in-process two ways:
+  - asgi:   httpx.AsyncClient over ASGITransport at --concurrency in-flight requests
+  - mangum: the Lambda `handler` with synthetic API Gateway (REST, v1) events,
+            one at a time, as a Lambda instance would see them
+and reports p50/p95/p99 latency and throughput per endpoint. Cold-start cost of
+importing api.main and of each lazy loader is measured in fresh processes.
+
+The request corpus is either a JSONL file (lines of {"endpoint": ..., "body": ...},
+or bare PatientInput objects sent to every --endpoints entry) or a generated mix.
+
+Run from readmission_api/:
+    python -m benchmarks.bench_api --requests 2000 --concurrency 16 --output bench.json
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import statistics
+import subprocess
+import sys
+import time
+from collections import defaultdict
+from pathlib import Path
+
+import numpy as np
+
+API_DIR = Path(__file__).parent.parent  # readmission_api/
+
+DEFAULT_ENDPOINTS = ["/predict", "/explain", "/predict_combined", "/predict_batch"]
+GENDERS = ["male", "female"]
+RACES = ["white", "black", "asian", "hispanic", "other"]
+COMPLAINTS = [
+    "chest pain and shortness of breath",
+    "fever and cough for three days",
+    "follow-up for diabetes management",
+    "emergency room admission after a fall",
+    "sore throat and ear pain",
+]
+
+# Each snippet runs after `import api.main as m` in a fresh interpreter
+LOADERS = {
+    "predictor": "m.get_predictor()",
+    "explainer": "m.get_explainer_func()",
+    "nlp": "from api.nlp_predictor import get_nlp_model; m.get_nlp_predictor(); get_nlp_model()",
+}
+
+
+def generate_patient(rng: random.Random, complaint_rate: float) -> dict:
+    return {
+        "age": rng.randint(18, 100),
+        "gender": rng.choice(GENDERS),
+        "race": rng.choice(RACES),
+        "chief_complaint": rng.choice(COMPLAINTS) if rng.random() < complaint_rate else None,
+    }
+
+
+def build_corpus(args) -> list:
+    """List of (endpoint, body) pairs."""
+    rng = random.Random(args.seed)
+    if args.corpus:
+        corpus = []
+        with open(args.corpus) as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                record = json.loads(line)
+                if "endpoint" in record:
+                    corpus.append((record["endpoint"], record["body"]))
+                else:
+                    corpus.extend((endpoint, record) for endpoint in args.endpoints)
+        return corpus
+
+    corpus = []
+    for endpoint in args.endpoints:
+        for _ in range(args.requests):
+            if endpoint == "/predict_batch":
+                body = {"patients": [generate_patient(rng, args.complaint_rate) for _ in range(args.batch_size)]}
+            else:
+                body = generate_patient(rng, args.complaint_rate)
+            corpus.append((endpoint, body))
+    return corpus
+
+
+def summarize(latencies: list, errors: int, elapsed: float) -> dict:
+    ms = np.array(latencies) * 1000
+    return {
+        "requests": len(latencies),
+        "errors": errors,
+        "p50_ms": round(float(np.percentile(ms, 50)), 3),
+        "p95_ms": round(float(np.percentile(ms, 95)), 3),
+        "p99_ms": round(float(np.percentile(ms, 99)), 3),
+        "mean_ms": round(float(ms.mean()), 3),
+        "throughput_rps": round(len(latencies) / elapsed, 1),
+    }
+
+
+async def run_asgi(app, requests: list, concurrency: int) -> tuple:
+    import httpx
+
+    queue = asyncio.Queue()
+    for item in requests:
+        queue.put_nowait(item)
+    latencies, errors = [], 0
+
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench") as client:
+        async def worker():
+            nonlocal errors
+            while not queue.empty():
+                endpoint, body = queue.get_nowait()
+                start = time.perf_counter()
+                response = await client.post(endpoint, json=body)
+                latencies.append(time.perf_counter() - start)
+                if response.status_code != 200:
+                    errors += 1
+
+        start = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - start
+    return latencies, errors, elapsed
+
+
+def api_gateway_event(endpoint: str, body: dict) -> dict:
+    return {
+        "resource": "/{proxy+}",
+        "path": endpoint,
+        "httpMethod": "POST",
+        "headers": {"content-type": "application/json"},
+        "multiValueHeaders": {"content-type": ["application/json"]},
+        "queryStringParameters": None,
+        "multiValueQueryStringParameters": None,
+        "pathParameters": {"proxy": endpoint.lstrip("/")},
+        "stageVariables": None,
+        "requestContext": {
+            "resourcePath": "/{proxy+}",
+            "httpMethod": "POST",
+            "path": f"/Prod{endpoint}",
+            "stage": "Prod",
+            "requestId": "bench",
+            "identity": {"sourceIp": "127.0.0.1"},
+        },
+        "body": json.dumps(body),
+        "isBase64Encoded": False,
+    }
+
+
+class LambdaContext:
+    function_name = "bench"
+    aws_request_id = "bench"
+
+
+def run_mangum(handler, requests: list) -> tuple:
+    events = [api_gateway_event(endpoint, body) for endpoint, body in requests]
+    latencies, errors = [], 0
+    context = LambdaContext()
+    # Mangum drives the app on the thread's current loop; asyncio.run() above cleared it
+    loop = asyncio.new_event_loop()
+    asyncio.set_event_loop(loop)
+    try:
+        start = time.perf_counter()
+        for event in events:
+            t = time.perf_counter()
+            response = handler(event, context)
+            latencies.append(time.perf_counter() - t)
+            if response["statusCode"] != 200:
+                errors += 1
+        return latencies, errors, time.perf_counter() - start
+    finally:
+        asyncio.set_event_loop(None)
+        loop.close()
+
+
+def measure_cold_start(runs: int) -> dict:
+    """Fresh-process timings: `import api.main`, then each lazy loader on its own."""
+    timer = ("import time; t = time.perf_counter(); import api.main as m; "
+             "t_import = time.perf_counter() - t; t = time.perf_counter(); {loader}; "
+             "print(t_import, time.perf_counter() - t)")
+    results = {}
+    for name, loader in {"none": "pass", **LOADERS}.items():
+        imports, loads = [], []
+        for _ in range(runs):
+            out = subprocess.run([sys.executable, "-c", timer.format(loader=loader)], cwd=API_DIR,
+                                 env=os.environ.copy(), capture_output=True, text=True, check=True)
+            t_import, t_load = map(float, out.stdout.split()[-2:])
+            imports.append(t_import)
+            loads.append(t_load)
+        if name == "none":
+            results["import_api_main_ms"] = round(statistics.median(imports) * 1000, 1)
+        else:
+            results[f"load_{name}_ms"] = round(statistics.median(loads) * 1000, 1)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Latency / throughput benchmark for the serving API.")
+    parser.add_argument("--corpus", help="JSONL request corpus (default: generated mix)")
+    parser.add_argument("--endpoints", nargs="+", default=DEFAULT_ENDPOINTS)
+    parser.add_argument("--requests", type=int, default=500, help="Generated requests per endpoint")
+    parser.add_argument("--batch-size", type=int, default=100, help="Patients per generated /predict_batch call")
+    parser.add_argument("--complaint-rate", type=float, default=0.5)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--modes", nargs="+", default=["asgi", "mangum"], choices=["asgi", "mangum"])
+    parser.add_argument("--cold-runs", type=int, default=3, help="Fresh processes per cold-start case (0 skips)")
+    parser.add_argument("--no-cache", action="store_true", help="Disable the result cache while benchmarking")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="Write results as JSON here")
+    args = parser.parse_args()
+
+    if args.no_cache:
+        os.environ["CACHE_ENABLED"] = "false"
+
+    results = {
+        "meta": {
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "concurrency": args.concurrency,
+            "corpus": args.corpus or "generated",
+            "cache": not args.no_cache,
+            "env": {k: v for k, v in os.environ.items() if k in (
+                "MODEL_FORMAT", "EXPLANATION_BACKEND", "CACHE_ENABLED", "MICROBATCH_WAIT_MS")},
+        },
+    }
+    if args.cold_runs:
+        results["cold_start"] = measure_cold_start(args.cold_runs)
+
+    from api.main import app, handler
+    corpus = build_corpus(args)
+    by_endpoint = defaultdict(list)
+    for endpoint, body in corpus:
+        by_endpoint[endpoint].append((endpoint, body))
+
+    # Warm every endpoint first so lazy model loads stay out of the latency numbers
+    asyncio.run(run_asgi(app, [reqs[0] for reqs in by_endpoint.values()], 1))
+
+    for mode in args.modes:
+        results[mode] = {}
+        for endpoint, requests in by_endpoint.items():
+            if mode == "asgi":
+                latencies, errors, elapsed = asyncio.run(run_asgi(app, requests, args.concurrency))
+            else:
+                latencies, errors, elapsed = run_mangum(handler, requests)
+            results[mode][endpoint] = summarize(latencies, errors, elapsed)
+
+    print(json.dumps(results, indent=2))
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
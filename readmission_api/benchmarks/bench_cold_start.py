@@ -0,0 +1,111 @@
+"""
+Cold-start benchmark: time to load each artifact format in a fresh interpreter,
+then init time (importing api.main) and first-request latency per WARMUP_MODE.
+
+Every case runs in its own subprocess (imports included), so numbers reflect
+what a new Lambda container pays. Run from readmission_api/:
+    python -m benchmarks.bench_cold_start [--runs 5]
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+from pathlib import Path
+
+API_DIR = Path(__file__).parent.parent  # readmission_api/
+
+CASES = {
+    "risk model: pickle (joblib)": (
+        "import joblib; joblib.load('ml/models/readmission_model.pkl')", {}),
+    "risk model: native text": (
+        "from pathlib import Path; from api.bundle import load_booster; load_booster(Path('ml/models'))", {}),
+    "shap explainer: pickle (joblib)": (
+        "import joblib; joblib.load('ml/models/shap_explainer.pkl')", {}),
+    "nlp model: pickle (joblib)": (
+        "import joblib; joblib.load('ml/models/nlp_diagnosis_model.pkl')", {}),
+    "nlp model: mmap bundle": (
+        "from pathlib import Path; from api.bundle import load_nlp_bundle; load_nlp_bundle(Path('ml/models'))", {}),
+    "api model set (MODEL_FORMAT=pickle)": (
+        "from api.registry import registry; registry.current()", {"MODEL_FORMAT": "pickle"}),
+    "api model set (MODEL_FORMAT=native)": (
+        "from api.registry import registry; registry.current()", {"MODEL_FORMAT": "native"}),
+}
+
+TIMER = "import time; _t = time.perf_counter(); {code}; print(time.perf_counter() - _t)"
+
+# Init phase (import api.main) and the first request right after it, as an on-demand Lambda sees them
+WARMUP_MODES = {
+    "lazy": {"WARMUP_MODE": "lazy"},
+    "eager": {"WARMUP_MODE": "eager"},
+    "eager, init waits": {"WARMUP_MODE": "eager", "WARMUP_INIT_WAIT_S": "10"},
+}
+FIRST_REQUESTS = {
+    "/predict": {"age": 60, "gender": "male", "race": "white"},
+    "/predict_combined": {"age": 60, "gender": "male", "race": "white",
+                          "chief_complaint": "chest pain and shortness of breath"},
+}
+FIRST_REQUEST = """
+import json, logging, time
+from fastapi.testclient import TestClient
+logging.disable(logging.CRITICAL)
+_t = time.perf_counter()
+import api.main as m
+_init = time.perf_counter() - _t
+client = TestClient(m.app)
+_t = time.perf_counter()
+client.post({endpoint!r}, json={body!r}).raise_for_status()
+print(json.dumps({{"init": _init, "first": time.perf_counter() - _t}}))
+"""
+
+
+def run_case(script: str, env: dict) -> str:
+    """Last stdout line of `script` in a fresh interpreter."""
+    out = subprocess.run(
+        [sys.executable, "-c", script],
+        cwd=API_DIR, env={**os.environ, "MODEL_POLL_INTERVAL_S": "0", **env},
+        capture_output=True, text=True, check=True,
+    )
+    return out.stdout.strip().splitlines()[-1]
+
+
+def time_case(code: str, env: dict, runs: int) -> list:
+    return [float(run_case(TIMER.format(code=code), env)) for _ in range(runs)]
+
+
+def time_first_request(endpoint: str, body: dict, env: dict, runs: int) -> dict:
+    """Per run: init seconds (import api.main) and first-request seconds."""
+    runs = [json.loads(run_case(FIRST_REQUEST.format(endpoint=endpoint, body=body), env)) for _ in range(runs)]
+    return {key: [run[key] for run in runs] for key in ("init", "first")}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+
+    print(f"{'case':<42} {'median ms':>10} {'min ms':>10}")
+    for name, (code, env) in CASES.items():
+        try:
+            timings = time_case(code, env, args.runs)
+        except subprocess.CalledProcessError as e:
+            print(f"{name:<42} {'failed':>10}  ({e.stderr.strip().splitlines()[-1]})")
+            continue
+        print(f"{name:<42} {statistics.median(timings) * 1000:>10.1f} {min(timings) * 1000:>10.1f}")
+
+    print(f"\n{'WARMUP_MODE, first request':<42} {'init ms':>10} {'first ms':>10} {'total ms':>10}")
+    for mode, env in WARMUP_MODES.items():
+        for endpoint, body in FIRST_REQUESTS.items():
+            name = f"{mode}, {endpoint}"
+            try:
+                timings = time_first_request(endpoint, body, env, args.runs)
+            except subprocess.CalledProcessError as e:
+                print(f"{name:<42} {'failed':>10}  ({e.stderr.strip().splitlines()[-1]})")
+                continue
+            init, first = statistics.median(timings["init"]), statistics.median(timings["first"])
+            print(f"{name:<42} {init * 1000:>10.1f} {first * 1000:>10.1f} {(init + first) * 1000:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+"""
+Benchmark: legacy pandas feature encoding vs. the shared FeatureEncoder.
+
+The legacy path one-hot encodes with pd.get_dummies, so the parity check
+and legacy timings only run against one-hot models; models with native
+categorical features are timed on the encoder path alone.
+
+Run from readmission_api/ (needs the trained model in ml/models/):
+    python -m benchmarks.bench_encoder
+"""
+import time
+import joblib
+import numpy as np
+import pandas as pd
+
+from api.model_loader import MODEL_DIR, encoder
+
+model = joblib.load(MODEL_DIR / "readmission_model.pkl")
+booster = getattr(model, "booster_", model)
+
+SAMPLES = [
+    {"age": 60, "gender": "male", "race": "white", "chief_complaint": "chest pain"},
+    {"age": 45, "gender": "female", "race": "black", "chief_complaint": None},
+    {"age": 78, "gender": "female", "race": "asian", "chief_complaint": "shortness of breath"},
+    {"age": 33, "gender": "male", "race": "hispanic", "chief_complaint": None},
+]
+
+
+def legacy_encode(input_data: dict) -> pd.DataFrame:
+    """The per-request path predictor.py / explainer.py used before the encoder."""
+    df = pd.DataFrame([input_data])
+    if 'gender' in df.columns:
+        df['gender'] = df['gender'].map({'male': 'M', 'female': 'F', 'm': 'M', 'f': 'F'})
+    df = df.rename(columns={'gender': 'GENDER', 'race': 'RACE'})
+    if 'days_to_next' in df.columns or 'DAYS_TO_NEXT' in df.columns:
+        df = df.drop(columns=['days_to_next', 'DAYS_TO_NEXT'], errors='ignore')
+    df = pd.get_dummies(df)
+    missing_cols = set(booster.feature_name()) - set(df.columns)
+    for col in missing_cols:
+        df[col] = 0
+    return df[booster.feature_name()]
+
+
+def per_row_us(fn, n: int) -> float:
+    start = time.perf_counter()
+    for i in range(n):
+        fn(SAMPLES[i % len(SAMPLES)])
+    return (time.perf_counter() - start) / n * 1e6
+
+
+def main(n: int = 2000):
+    legacy = not encoder.categories
+    results = {}
+    if legacy:
+        # Parity first: both paths must feed the model identical values
+        for sample in SAMPLES:
+            expected = legacy_encode(sample).to_numpy(dtype=np.float32)
+            assert np.array_equal(expected, encoder.encode(sample)), sample
+        results["legacy encode"] = per_row_us(legacy_encode, n)
+    results["encoder encode"] = per_row_us(encoder.encode, n)
+    if legacy and hasattr(model, "predict_proba"):
+        results["legacy encode + predict_proba"] = per_row_us(
+            lambda s: model.predict_proba(legacy_encode(s))[0][1], n)
+    results["encoder encode + booster.predict"] = per_row_us(
+        lambda s: booster.predict(encoder.encode(s))[0], n)
+
+    rows = [SAMPLES[i % len(SAMPLES)] for i in range(1000)]
+
+    start = time.perf_counter()
+    encoder.encode(rows)
+    results["encoder encode (batch of 1000)"] = (time.perf_counter() - start) / len(rows) * 1e6
+
+    print(f"{'path':<40} {'us/row':>10}")
+    for name, us in results.items():
+        print(f"{name:<40} {us:>10.1f}")
+    if legacy:
+        print(f"\nencode speedup: {results['legacy encode'] / results['encoder encode']:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
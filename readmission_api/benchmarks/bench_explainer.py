@@ -0,0 +1,70 @@
+"""
+Benchmark + parity check: pickled shap.Explainer vs. LightGBM native contributions.
+
+Run from readmission_api/ (needs readmission_model.pkl and shap_explainer.pkl):
+    python -m benchmarks.bench_explainer
+"""
+import itertools
+import time
+import joblib
+import numpy as np
+
+from api.model_loader import MODEL_DIR, encoder
+from api.explainer import native_contributions, top_contributions
+
+GENDERS = ["male", "female"]
+RACES = ["white", "black", "asian", "hispanic", "other"]
+
+
+def legacy_top5(shap_row) -> dict:
+    """Top-5 selection as explainer.py did it before (sorted dict)."""
+    contribs = dict(zip(encoder.feature_names, shap_row))
+    return dict(sorted(contribs.items(), key=lambda item: abs(item[1]), reverse=True)[:5])
+
+
+def per_row_us(fn, X: np.ndarray, n: int) -> float:
+    start = time.perf_counter()
+    for i in range(n):
+        fn(X[i % len(X):i % len(X) + 1])
+    return (time.perf_counter() - start) / n * 1e6
+
+
+def main(n: int = 500):
+    shap_explainer = joblib.load(MODEL_DIR / "shap_explainer.pkl")
+    grid = [
+        {"age": age, "gender": gender, "race": race}
+        for age, gender, race in itertools.product(range(18, 101), GENDERS, RACES)
+    ]
+    X = encoder.encode(grid)
+
+    # Parity over the whole Streamlit input grid
+    reference = shap_explainer(X).values
+    native = native_contributions(X)
+    max_diff = float(np.max(np.abs(reference - native)))
+    legacy = [legacy_top5(row) for row in reference]
+    fast = top_contributions(native, encoder.feature_names, 5)
+    same_top5 = sum(list(a) == list(b) for a, b in zip(legacy, fast))
+    print(f"parity: {len(grid)} rows, max |shap - native| = {max_diff:.2e}, "
+          f"identical top-5 ordering on {same_top5}/{len(grid)} rows")
+    assert max_diff < 1e-6
+
+    results = {
+        "shap.Explainer + sorted dict": per_row_us(
+            lambda x: legacy_top5(shap_explainer(x).values[0]), X, n),
+        "native_contrib + argpartition": per_row_us(
+            lambda x: top_contributions(native_contributions(x), encoder.feature_names), X, n),
+    }
+    start = time.perf_counter()
+    [legacy_top5(row) for row in shap_explainer(X).values]
+    results[f"shap.Explainer (batch of {len(X)})"] = (time.perf_counter() - start) / len(X) * 1e6
+    start = time.perf_counter()
+    top_contributions(native_contributions(X), encoder.feature_names)
+    results[f"native_contrib (batch of {len(X)})"] = (time.perf_counter() - start) / len(X) * 1e6
+
+    print(f"\n{'path':<40} {'us/row':>10}")
+    for name, us in results.items():
+        print(f"{name:<40} {us:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,117 @@
+"""
+Benchmark: encounter / patient lookups in the feature index vs. filtering
+the exported Parquet with pyarrow.
+
+Writes a synthetic export (--rows encounters with Synthea-style UUIDs, the
+columns of the current model's feature spec), builds the index with
+ml/feature_index.py, then times loading it and looking up single IDs and
+batches of IDs. The Parquet filter is what a request would otherwise do.
+
+Run from readmission_api/ (needs ml/models/feature_spec.json):
+    python -m benchmarks.bench_feature_index [--rows 5000000] [--batch 1000]
+"""
+import argparse
+import json
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+
+from api.feature_index import load_feature_index
+from api.feature_spec import SPEC_FILE
+from api.model_loader import API_DIR, MODEL_DIR
+
+
+def uuids(rng: np.random.Generator, n: int) -> np.ndarray:
+    raw = rng.bytes(16 * n)
+    return np.array([f"{h[:8]}-{h[8:12]}-{h[12:16]}-{h[16:20]}-{h[20:]}"
+                     for h in (raw[i:i + 16].hex() for i in range(0, 16 * n, 16))])
+
+
+def write_export(path: Path, spec: dict, rows: int, per_patient: int, seed: int):
+    """Synthetic fct_patient_features export with the spec's feature columns."""
+    rng = np.random.default_rng(seed)
+    patients = uuids(rng, max(rows // per_patient, 1))
+    columns = {"encounter_id": uuids(rng, rows), "PATIENT": patients[rng.integers(0, len(patients), rows)]}
+    for feature in spec["features"]:
+        if feature["kind"] == "categorical":
+            columns[feature["name"]] = np.array(feature["categories"])[rng.integers(0, len(feature["categories"]), rows)]
+        else:
+            columns[feature["name"]] = rng.integers(18, 100, rows).astype(np.int32)
+    pq.write_table(pa.table(columns), path)
+    return columns["encounter_id"], patients
+
+
+def per_call_us(fn, ids: list, n: int) -> float:
+    start = time.perf_counter()
+    for i in range(n):
+        fn(ids[i % len(ids):i % len(ids) + 1])
+    return (time.perf_counter() - start) / n * 1e6
+
+
+def per_batch_ms(fn, ids: list, batch: int, repeats: int) -> float:
+    start = time.perf_counter()
+    for i in range(repeats):
+        fn(ids[i * batch:(i + 1) * batch])
+    return (time.perf_counter() - start) / repeats * 1e3
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--rows", type=int, default=2_000_000, help="encounters in the synthetic export")
+    parser.add_argument("--encounters-per-patient", type=int, default=20)
+    parser.add_argument("--batch", type=int, default=1000, help="IDs per batch lookup")
+    parser.add_argument("--n", type=int, default=2000, help="single-ID lookups per path")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    spec = json.loads((MODEL_DIR / SPEC_FILE).read_text())
+    work_dir = Path(tempfile.mkdtemp(prefix="feature_index_bench_"))
+    try:
+        export = work_dir / "fct_patient_features.parquet"
+        encounter_ids, patient_ids = write_export(export, spec, args.rows, args.encounters_per_patient, args.seed)
+        shutil.copy(MODEL_DIR / SPEC_FILE, work_dir / SPEC_FILE)
+        start = time.perf_counter()
+        subprocess.run([sys.executable, str(API_DIR / "ml" / "feature_index.py"), "--input", str(export),
+                        "--model-dir", str(work_dir)], check=True, capture_output=True)
+        build_s = time.perf_counter() - start
+        size_mb = sum(path.stat().st_size for path in (work_dir / "feature_index").iterdir()) / 1e6
+        print(f"{args.rows:,} encounters, {len(patient_ids):,} patients: Parquet {export.stat().st_size / 1e6:.0f} MB, "
+              f"index {size_mb:.0f} MB built in {build_s:.1f} s")
+
+        start = time.perf_counter()
+        index = load_feature_index(work_dir)
+        print(f"index load: {(time.perf_counter() - start) * 1e3:.2f} ms")
+
+        rng = np.random.default_rng(args.seed + 1)
+        lookup_ids = encounter_ids[rng.integers(0, len(encounter_ids), args.n + args.batch * 20)].tolist()
+        lookup_patients = patient_ids[rng.integers(0, len(patient_ids), args.n + args.batch * 20)].tolist()
+        # Right answers, not just fast ones
+        rows = index.encounter_rows(lookup_ids[:args.batch])
+        assert (rows >= 0).all() and index.encounter_id(rows) == lookup_ids[:args.batch]
+
+        dataset = ds.dataset(str(export), format="parquet")
+        paths = {
+            "index encounters": lambda ids: index.rows(index.encounter_rows(ids)),
+            "index patients": lambda ids: index.rows(np.concatenate(index.patient_rows_of(ids))),
+            "parquet encounters": lambda ids: dataset.to_table(filter=ds.field("encounter_id").isin(ids)),
+            "parquet patients": lambda ids: dataset.to_table(filter=ds.field("PATIENT").isin(ids)),
+        }
+        print(f"\n{'path':<22} {'us/ID (single)':>15} {f'ms/{args.batch} IDs':>14}")
+        for name, fn in paths.items():
+            ids = lookup_patients if name.endswith("patients") else lookup_ids
+            n, repeats = (args.n, 20) if name.startswith("index") else (max(args.n // 100, 5), 3)
+            print(f"{name:<22} {per_call_us(fn, ids, n):>15.1f} {per_batch_ms(fn, ids, args.batch, repeats):>14.2f}")
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
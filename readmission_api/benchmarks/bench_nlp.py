@@ -0,0 +1,63 @@
+"""
+Benchmark + parity check: sklearn Pipeline vs. the NumPy NlpScorer.
+
+Run from readmission_api/ (needs nlp_diagnosis_model.pkl and ml/models/nlp_bundle/):
+    python -m benchmarks.bench_nlp
+"""
+import time
+import joblib
+import numpy as np
+
+from api.bundle import load_nlp_bundle
+from api.model_loader import MODEL_DIR
+from api.nlp_scorer import NlpScorer
+
+COMPLAINTS = [
+    "chest pain and shortness of breath",
+    "Emergency room admission for fever",
+    "follow-up encounter for diabetes management",
+    "sore throat, cough and congestion for three days",
+    "general examination of patient",
+    "Hospital admission after a fall",
+    "urgent care clinic visit for ear pain",
+    "well child visit",
+    "the and of",  # only stop words
+    "xyzzy plugh",  # out of vocabulary
+]
+
+
+def per_text_us(fn, texts, n: int) -> float:
+    start = time.perf_counter()
+    for i in range(n):
+        fn([texts[i % len(texts)]])
+    return (time.perf_counter() - start) / n * 1e6
+
+
+def main(n: int = 2000):
+    pipeline = joblib.load(MODEL_DIR / "nlp_diagnosis_model.pkl")
+    scorer = NlpScorer(load_nlp_bundle(MODEL_DIR))
+
+    # Parity: vocabulary terms themselves exercise every feature column
+    texts = COMPLAINTS + list(scorer.vocabulary)
+    assert list(pipeline.classes_) == list(scorer.classes_)
+    max_diff = float(np.max(np.abs(pipeline.predict_proba(texts) - scorer.predict_proba(texts))))
+    print(f"parity: {len(texts)} texts, max |sklearn - numpy| = {max_diff:.2e}")
+    assert max_diff < 1e-9
+
+    batch = [COMPLAINTS[i % len(COMPLAINTS)] for i in range(1000)]
+    results = {
+        "sklearn Pipeline.predict_proba": per_text_us(pipeline.predict_proba, COMPLAINTS, n),
+        "NlpScorer.predict_proba": per_text_us(scorer.predict_proba, COMPLAINTS, n),
+    }
+    for name, fn in [("sklearn Pipeline", pipeline.predict_proba), ("NlpScorer", scorer.predict_proba)]:
+        start = time.perf_counter()
+        fn(batch)
+        results[f"{name} (batch of {len(batch)})"] = (time.perf_counter() - start) / len(batch) * 1e6
+
+    print(f"\n{'path':<40} {'us/text':>10}")
+    for name, us in results.items():
+        print(f"{name:<40} {us:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
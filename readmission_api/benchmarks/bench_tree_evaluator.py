@@ -0,0 +1,95 @@
+"""
+Benchmark + parity check: NumPy tree evaluator vs. LightGBM.
+
+Parity is checked on the held-out test split of the newest cached training
+run (ml/cache/) whose features match the model, falling back to random rows
+around the split points when there is none. predict_proba is timed as well
+when readmission_model.pkl is an LGBMClassifier (older training script).
+
+Run from readmission_api/ (needs the trained model in ml/models/):
+    python -m benchmarks.bench_tree_evaluator [--model-dir DIR] [--rows 1000]
+"""
+import argparse
+import json
+import time
+import warnings
+from pathlib import Path
+
+import joblib
+import lightgbm as lgb
+import numpy as np
+
+from api.model_loader import API_DIR, MODEL_DIR
+from api.tree_evaluator import TreeEvaluator
+
+CACHE_DIR = API_DIR / "ml" / "cache"
+
+
+def cached_test_split(feature_names: list):
+    """X of the newest cached test split with these features, or None."""
+    metas = sorted(CACHE_DIR.glob("*/meta.json"), key=lambda path: path.stat().st_mtime, reverse=True)
+    for path in metas:
+        meta = json.loads(path.read_text())
+        if meta["features"] == feature_names and meta["rows"]["test"]:
+            shape = (meta["rows"]["test"], len(meta["features"]))
+            return np.memmap(path.parent / "test_X.f32", dtype=np.float32, mode="r", shape=shape), path.parent
+    return None, None
+
+
+def per_row_us(fn, X: np.ndarray, n: int) -> float:
+    start = time.perf_counter()
+    for i in range(n):
+        fn(X[i % len(X):i % len(X) + 1])
+    return (time.perf_counter() - start) / n * 1e6
+
+
+def per_batch_ms(fn, X: np.ndarray, repeats: int) -> float:
+    start = time.perf_counter()
+    for _ in range(repeats):
+        fn(X)
+    return (time.perf_counter() - start) / repeats * 1e3
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--model-dir", type=Path, default=MODEL_DIR)
+    parser.add_argument("--rows", type=int, default=1000, help="batch size for the batch timings")
+    parser.add_argument("--n", type=int, default=2000, help="single-row calls per path")
+    args = parser.parse_args()
+
+    native = args.model_dir / "readmission_model.txt"
+    pickled = joblib.load(args.model_dir / "readmission_model.pkl") if (args.model_dir / "readmission_model.pkl").exists() else None
+    booster = lgb.Booster(model_file=str(native)) if native.exists() else getattr(pickled, "booster_", pickled)
+    start = time.perf_counter()
+    evaluator = TreeEvaluator.from_booster(booster)
+    build_ms = (time.perf_counter() - start) * 1e3
+    path = "bitmask" if evaluator.masks is not None else "level-by-level"
+    print(f"model: {booster.num_trees()} trees, max depth {evaluator.depth}, {path} path, built in {build_ms:.1f} ms")
+
+    X, cache_dir = cached_test_split(booster.feature_name())
+    if X is not None:
+        X = np.asarray(X)
+        reference = booster.predict(X, raw_score=True)
+        exact = int(np.sum(reference == evaluator.raw_score(X)))
+        print(f"parity: {exact}/{len(X)} raw scores identical on the test split in {cache_dir.name}")
+        assert exact == len(X)
+    else:
+        print("parity: no cached test split for these features, using rows around the split points")
+    evaluator.check(booster, rows=max(args.rows, 256))
+    if X is None:
+        X = evaluator.probe_rows(args.rows)
+    batch = X[:args.rows]
+
+    paths = {"Booster.predict": booster.predict, "TreeEvaluator.predict": evaluator.predict}
+    if hasattr(pickled, "predict_proba"):
+        # Fitted on a DataFrame; the warning for ndarray input is not what's being timed
+        warnings.filterwarnings("ignore", message="X does not have valid feature names")
+        paths["LGBMClassifier.predict_proba"] = lambda x: pickled.predict_proba(x)[:, 1]
+    print(f"\n{'path':<32} {'us/row (single)':>16} {f'ms/{len(batch)} rows':>14}")
+    for name, fn in paths.items():
+        fn(batch[:1])  # warm-up
+        print(f"{name:<32} {per_row_us(fn, X, args.n):>16.1f} {per_batch_ms(fn, batch, 20):>14.2f}")
+
+
+if __name__ == "__main__":
+    main()
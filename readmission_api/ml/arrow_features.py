@@ -0,0 +1,88 @@
+"""
+Arrow-native feature encoding for training.
+
+Streams the features Parquet as record batches and turns each batch into a
+float32 matrix with LightGBM native categoricals: string columns become the
+code of the value in a per-column category list (grown as new values show
+up, so codes never change), numeric columns are cast as-is. The category
+lists are saved with the model (Booster.pandas_categorical), which is how
+api/encoder.py maps request strings back to codes.
+"""
+import numpy as np
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.dataset as ds
+
+LABEL = "readmitted_within_30d"
+# Identifiers, label-derived columns and the incremental export's labeled_at
+# watermark; everything else is a feature
+EXCLUDE = ["encounter_id", "PATIENT", "patient", "days_to_next", LABEL, "labeled_at"]
+
+
+def feature_columns(schema: pa.Schema) -> list:
+    return [name for name in schema.names if name not in EXCLUDE]
+
+
+def is_text(type_: pa.DataType) -> bool:
+    if pa.types.is_dictionary(type_):
+        type_ = type_.value_type
+    return pa.types.is_string(type_) or pa.types.is_large_string(type_)
+
+
+class CategoryCodes:
+    """Append-only category -> code tables for the string feature columns."""
+
+    def __init__(self, categories: dict = None):
+        self.categories = {name: list(values) for name, values in (categories or {}).items()}
+        self._codes = {name: {v: i for i, v in enumerate(values)} for name, values in self.categories.items()}
+
+    def encode(self, name: str, column: pa.Array) -> np.ndarray:
+        codes = self._codes.setdefault(name, {})
+        values = self.categories.setdefault(name, [])
+        encoded = column.dictionary_encode() if not pa.types.is_dictionary(column.type) else column
+        lookup = []
+        for value in encoded.dictionary.to_pylist():
+            if value not in codes:
+                codes[value] = len(values)
+                values.append(value)
+            lookup.append(codes[value])
+        lookup = np.array(lookup + [np.nan], dtype=np.float32)
+        return lookup[encoded.indices.fill_null(-1).to_numpy(zero_copy_only=False)]
+
+
+class BatchEncoder:
+    def __init__(self, schema: pa.Schema, categories: dict = None):
+        self.features = feature_columns(schema)
+        self.categorical = [name for name in self.features if is_text(schema.field(name).type)]
+        self.codes = CategoryCodes(categories)
+
+    def encode(self, batch: pa.RecordBatch) -> tuple:
+        """(X float32 (n_rows, n_features), y float32)"""
+        X = np.empty((batch.num_rows, len(self.features)), dtype=np.float32)
+        for j, name in enumerate(self.features):
+            column = batch.column(name)
+            if name in self.categorical:
+                X[:, j] = self.codes.encode(name, column)
+            else:
+                X[:, j] = pc.cast(column, pa.float32()).to_numpy(zero_copy_only=False)
+        y = batch.column(LABEL).to_numpy(zero_copy_only=False).astype(np.float32)
+        return X, y
+
+    @property
+    def categories(self) -> dict:
+        """Category lists in categorical-feature order (what pandas_categorical expects)."""
+        return {name: self.codes.categories.get(name, []) for name in self.categorical}
+
+
+def complete_batches(path, batch_size: int = 65536):
+    """Record batches with incomplete rows dropped (the old df.dropna())."""
+    dataset = ds.dataset(str(path), format="parquet")
+    for batch in dataset.to_batches(batch_size=batch_size):
+        if batch.num_rows and any(column.null_count for column in batch.columns):
+            valid = None
+            for column in batch.columns:
+                mask = pc.is_valid(column)
+                valid = mask if valid is None else pc.and_(valid, mask)
+            batch = batch.filter(valid)
+        if batch.num_rows:
+            yield batch
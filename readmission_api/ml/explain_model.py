@@ -1,23 +1,40 @@
+import json
 import joblib
 import shap
-import pandas as pd
+import numpy as np
 from pathlib import Path
 
+from arrow_features import BatchEncoder, complete_batches
+from feature_spec import SPEC_FILE, spec_categories
+
 # Get paths relative to this file
 ML_DIR = Path(__file__).parent
 PROJECT_ROOT = ML_DIR.parent.parent
 MODEL_DIR = ML_DIR / "models"
 DATA_DIR = PROJECT_ROOT / "data" / "processed"
 
+# SHAP is only computed on a sample for the summary plot; the explainer itself
+# needs just the trees
+SAMPLE_ROWS = 5000
+
 model = joblib.load(MODEL_DIR / "readmission_model.pkl")
-df = pd.read_parquet(DATA_DIR / "fct_patient_features.parquet")
-X = pd.get_dummies(df.drop(columns=["encounter_id", "readmitted_within_30d", "PATIENT", "days_to_next"]))
+booster = getattr(model, "booster_", model)
 
-explainer = shap.Explainer(model)
-shap_values = explainer(X)
+explainer = shap.TreeExplainer(booster)
 
 # Save for inference use
 joblib.dump(explainer, MODEL_DIR / "shap_explainer.pkl")
 
-# Optional: SHAP summary plot (uncomment to view)
-shap.summary_plot(shap_values, X, show=False)
+# Encode a sample with the model's own category codes
+batches = complete_batches(DATA_DIR / "fct_patient_features.parquet", batch_size=SAMPLE_ROWS)
+batch = next(batches, None)
+if batch is not None:
+    spec = json.loads((MODEL_DIR / SPEC_FILE).read_text())
+    names = [column["name"] for column in spec["features"]]
+    X, _ = BatchEncoder(batch.schema, spec_categories(spec)).encode(batch)
+    # A plain matrix: Booster.predict rejects DataFrames for models saved with pandas_categorical
+    X = X.astype(np.float64)
+    shap_values = explainer.shap_values(X)
+
+    # Optional: SHAP summary plot (uncomment to view)
+    shap.summary_plot(shap_values, X, feature_names=names, show=False)
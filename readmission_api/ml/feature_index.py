@@ -0,0 +1,156 @@
+"""
+Encounter feature index written next to the model by train_model.py
+--feature-index (or by running this file against a newer export).
+
+The API scores encounters and patients by ID (/predict_by_encounter,
+/predict_by_patient) from this index instead of hand-entered demographics.
+It holds every exported encounter's features already encoded in the model's
+layout (categorical values as the feature spec's codes, NaN where a value is
+null or unknown to the model), so a request is a binary search over sorted
+keys plus a row read: no DuckDB, pandas or Parquet reader (api/feature_index.py).
+
+feature_index/ (plain .npy arrays, memory-mapped by the API):
+  encounter_ids.npy      S<w> (n,)      encounter IDs, sorted
+  features.npy           float32 (n, n_features)  encoded rows, in encounter_ids order
+  encounter_patient.npy  int32 (n,)     each row's position in patient_ids
+  patient_ids.npy        S<w> (p,)      distinct patient IDs, sorted
+  patient_offsets.npy    int64 (p + 1,) patient i's rows are patient_rows[offsets[i]:offsets[i + 1]]
+  patient_rows.npy       int64 (n,)     row numbers grouped by patient, in encounter ID order
+  config.json            feature names, feature spec version, row counts, source
+
+Run from readmission_api/:
+    python ml/feature_index.py [--input ../data/processed/fct_patient_features.parquet]
+"""
+import argparse
+import json
+import time
+from pathlib import Path
+
+import numpy as np
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.dataset as ds
+
+from feature_spec import SPEC_FILE
+
+ML_DIR = Path(__file__).parent
+MODEL_DIR = ML_DIR / "models"
+DATA_DIR = ML_DIR.parent.parent / "data" / "processed"
+
+FEATURE_INDEX_DIR = "feature_index"
+ENCOUNTER_COLUMN = "encounter_id"
+# export_features.py renames patient to PATIENT for training
+PATIENT_COLUMNS = ("PATIENT", "patient")
+
+
+def encode_batch(batch: pa.RecordBatch, spec: dict) -> np.ndarray:
+    """float32 (n_rows, n_features) in spec order, NaN for nulls and categories the model never saw."""
+    X = np.empty((batch.num_rows, len(spec["features"])), dtype=np.float32)
+    for j, feature in enumerate(spec["features"]):
+        column = batch.column(feature["name"])
+        if feature["kind"] == "categorical":
+            codes = {value: code for code, value in enumerate(feature["categories"])}
+            encoded = column if pa.types.is_dictionary(column.type) else column.dictionary_encode()
+            lookup = np.array([codes.get(value, np.nan) for value in encoded.dictionary.to_pylist()] + [np.nan],
+                              dtype=np.float32)
+            X[:, j] = lookup[encoded.indices.fill_null(-1).to_numpy(zero_copy_only=False)]
+        else:
+            X[:, j] = pc.cast(column, pa.float32()).to_numpy(zero_copy_only=False)
+    return X
+
+
+def id_array(column: pa.Array) -> np.ndarray:
+    """Fixed-width bytes (UTF-8), the key type the API binary-searches."""
+    if pa.types.is_dictionary(column.type):
+        column = column.dictionary_decode()
+    return column.cast(pa.binary()).to_numpy(zero_copy_only=False).astype(np.bytes_)
+
+
+def build_feature_index(path, spec: dict, batch_size: int = 65536) -> dict:
+    """Stream the features Parquet (file or directory) into sorted index arrays."""
+    dataset = ds.dataset(str(path), format="parquet")
+    names = dataset.schema.names
+    patient_column = next((name for name in PATIENT_COLUMNS if name in names), None)
+    features = [feature["name"] for feature in spec["features"]]
+    missing = [name for name in [ENCOUNTER_COLUMN, patient_column] + features if name not in names]
+    if missing:
+        raise ValueError(f"{path} has no column(s) {missing}")
+
+    ids, patients, blocks, dropped = [], [], [], 0
+    for batch in dataset.to_batches(columns=[ENCOUNTER_COLUMN, patient_column] + features, batch_size=batch_size):
+        valid = pc.and_(pc.is_valid(batch.column(ENCOUNTER_COLUMN)), pc.is_valid(batch.column(patient_column)))
+        if valid.false_count:
+            dropped += valid.false_count
+            batch = batch.filter(valid)
+        if not batch.num_rows:
+            continue
+        ids.append(id_array(batch.column(ENCOUNTER_COLUMN)))
+        patients.append(id_array(batch.column(patient_column)))
+        blocks.append(encode_batch(batch, spec))
+
+    if not ids:
+        raise ValueError(f"{path} has no encounters to index")
+    encounter_ids = np.concatenate(ids)
+    order = np.argsort(encounter_ids, kind="stable")
+    encounter_ids = encounter_ids[order]
+    duplicates = int(np.sum(encounter_ids[1:] == encounter_ids[:-1]))
+    if duplicates:
+        raise ValueError(f"{path}: {duplicates} duplicate encounter IDs")
+    X = np.concatenate(blocks)[order]
+
+    patient_of_row = np.concatenate(patients)[order]
+    # Stable: within a patient, rows stay in encounter ID order
+    patient_rows = np.argsort(patient_of_row, kind="stable")
+    patient_ids, encounter_patient = np.unique(patient_of_row, return_inverse=True)
+    offsets = np.concatenate([[0], np.cumsum(np.bincount(encounter_patient, minlength=len(patient_ids)))])
+
+    config = {
+        "features": features,
+        "feature_spec_version": spec["version"],
+        "encounters": len(encounter_ids),
+        "patients": len(patient_ids),
+        "dropped_rows": dropped,
+        "source": str(path),
+        "built_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+    }
+    return {
+        "encounter_ids": encounter_ids,
+        "features": X,
+        "encounter_patient": encounter_patient.astype(np.int32),
+        "patient_ids": patient_ids,
+        "patient_offsets": offsets.astype(np.int64),
+        "patient_rows": patient_rows.astype(np.int64),
+        "config": config,
+    }
+
+
+def write_feature_index(index: dict, model_dir: Path) -> Path:
+    out_dir = model_dir / FEATURE_INDEX_DIR
+    out_dir.mkdir(parents=True, exist_ok=True)
+    for name, array in index.items():
+        if name != "config":
+            np.save(out_dir / f"{name}.npy", array)
+    # Written last: the API treats a directory without it as no index
+    (out_dir / "config.json").write_text(json.dumps(index["config"], indent=2))
+    return out_dir
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build the encounter feature index for the trained model.")
+    parser.add_argument("--input", default=str(DATA_DIR / "fct_patient_features.parquet"),
+                        help="Features Parquet file or directory (export_features.py output)")
+    parser.add_argument("--model-dir", type=Path, default=MODEL_DIR, help="Directory with feature_spec.json")
+    parser.add_argument("--batch-size", type=int, default=65536)
+    args = parser.parse_args()
+
+    spec = json.loads((args.model_dir / SPEC_FILE).read_text())
+    start = time.perf_counter()
+    index = build_feature_index(args.input, spec, args.batch_size)
+    out_dir = write_feature_index(index, args.model_dir)
+    config = index["config"]
+    print(f"Feature index: {config['encounters']:,} encounters, {config['patients']:,} patients "
+          f"({config['dropped_rows']:,} rows without IDs dropped) -> {out_dir} in {time.perf_counter() - start:.2f}s")
+
+
+if __name__ == "__main__":
+    main()
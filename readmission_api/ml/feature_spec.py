@@ -0,0 +1,59 @@
+"""
+Feature spec written next to the model by train_model.py.
+
+One JSON file describes everything serving needs to rebuild the training
+feature matrix from a request: the ordered feature columns with their source
+dtypes, the category list of every categorical feature (index = the code the
+model was trained on), and how each API request field maps onto a column,
+including value normalization (gender "male" -> "M"). The API compiles it
+into its FeatureEncoder (api/encoder.py) and rejects requests it doesn't
+cover, so the layout is never rediscovered from the booster per call.
+"""
+import hashlib
+import json
+from pathlib import Path
+
+SPEC_FILE = "feature_spec.json"
+SPEC_VERSION = 1
+
+# API request field -> training column, with the value normalization the
+# request goes through before the category lookup
+INPUTS = {
+    "age": {"column": "age"},
+    "gender": {"column": "GENDER", "map": {"male": "M", "female": "F", "m": "M", "f": "F"}},
+    "race": {"column": "RACE"},
+}
+
+
+def build_feature_spec(features: list, categories: dict, dtypes: dict, label: str) -> dict:
+    """
+    Args:
+        features: Feature columns in model order
+        categories: Categorical feature -> category list (code order)
+        dtypes: Column -> source (Arrow) type name
+        label: Target column
+    """
+    columns = []
+    for name in features:
+        column = {"name": name, "dtype": dtypes.get(name)}
+        if name in categories:
+            column["kind"] = "categorical"
+            column["categories"] = list(categories[name])
+        else:
+            column["kind"] = "numeric"
+        columns.append(column)
+    inputs = {field: spec for field, spec in INPUTS.items() if spec["column"] in features}
+    spec = {"spec_version": SPEC_VERSION, "label": label, "features": columns, "inputs": inputs}
+    # Content hash: identical layouts get the same version whatever the model
+    spec["version"] = hashlib.sha1(json.dumps(spec, sort_keys=True).encode()).hexdigest()[:12]
+    return spec
+
+
+def write_feature_spec(spec: dict, model_dir: Path) -> Path:
+    path = model_dir / SPEC_FILE
+    path.write_text(json.dumps(spec, indent=2))
+    return path
+
+
+def spec_categories(spec: dict) -> dict:
+    return {column["name"]: column["categories"] for column in spec["features"] if column["kind"] == "categorical"}
@@ -0,0 +1,79 @@
+"""
+Precomputed risk lookup table written next to the model by train_model.py.
+
+The API's structured inputs (age, gender, race) span a few thousand
+combinations, so training can score all of them once: every integer age in
+a range x every category code of each categorical input. The table holds the
+risk and the top-k native SHAP contributions per cell, and the API answers
+in-grid requests from it without touching the booster (api/risk_table.py).
+
+risk_table.npz (plain arrays, loads without pickle):
+  risk           float64 (n_cells,)   P(readmitted), unrounded
+  top_index      int32 (n_cells, k)   feature columns by |contribution|, largest first
+  top_value      float64 (n_cells, k) their contributions
+  config         JSON: axes (request field, column, kind, low, size), top_k,
+                 n_features and the feature spec version it was built for
+"""
+import json
+from pathlib import Path
+
+import numpy as np
+
+RISK_TABLE_FILE = "risk_table.npz"
+
+
+def grid_axes(spec: dict, ages: tuple) -> list:
+    """One axis per request field, in spec input order: integer ages, or category codes."""
+    features = {column["name"]: (i, column) for i, column in enumerate(spec["features"])}
+    axes = []
+    for field, input_spec in spec["inputs"].items():
+        col, column = features[input_spec["column"]]
+        if column["kind"] == "categorical":
+            axes.append({"field": field, "column": col, "kind": "categorical", "low": 0,
+                         "size": len(column["categories"])})
+        elif field == "age":
+            low, high = ages
+            axes.append({"field": field, "column": col, "kind": "numeric", "low": low, "size": high - low + 1})
+        else:
+            raise ValueError(f"No grid range for numeric input {field!r}")
+    return axes
+
+
+def grid_matrix(spec: dict, axes: list) -> np.ndarray:
+    """Encoded feature rows for every grid cell, in C (ravel) order of the axes."""
+    n_features = len(spec["features"])
+    # Same row template as the API encoder: features no input fills are 0, or missing if categorical
+    blank = np.array([np.nan if column["kind"] == "categorical" else 0.0 for column in spec["features"]],
+                     dtype=np.float32)
+    shape = tuple(axis["size"] for axis in axes)
+    X = np.tile(blank, (int(np.prod(shape)), 1)).reshape(-1, n_features)
+    for axis, values in zip(axes, np.indices(shape).reshape(len(axes), -1)):
+        X[:, axis["column"]] = values + axis["low"]
+    return X
+
+
+def build_risk_table(booster, spec: dict, ages: tuple = (0, 120), top_k: int = 5) -> dict:
+    axes = grid_axes(spec, ages)
+    X = grid_matrix(spec, axes)
+    k = min(top_k, X.shape[1])
+    risk = booster.predict(X)
+    contribs = booster.predict(X, pred_contrib=True)[:, :-1]
+    # Same selection as api/explainer.py top_indices
+    magnitude = np.abs(contribs)
+    top = np.argpartition(-magnitude, k - 1, axis=1)[:, :k]
+    order = np.argsort(-np.take_along_axis(magnitude, top, axis=1), axis=1, kind="stable")
+    top = np.take_along_axis(top, order, axis=1)
+    config = {"axes": axes, "top_k": k, "n_features": X.shape[1], "feature_spec_version": spec["version"]}
+    return {
+        "risk": risk.astype(np.float64),
+        "top_index": top.astype(np.int32),
+        "top_value": np.take_along_axis(contribs, top, axis=1).astype(np.float64),
+        "config": config,
+    }
+
+
+def write_risk_table(table: dict, model_dir: Path) -> Path:
+    path = model_dir / RISK_TABLE_FILE
+    np.savez(path, risk=table["risk"], top_index=table["top_index"], top_value=table["top_value"],
+             config=np.array(json.dumps(table["config"])))
+    return path
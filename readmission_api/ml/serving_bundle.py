@@ -0,0 +1,56 @@
+"""
+Export compact serving artifacts next to the pickles.
+
+The API can load these without sklearn, shap or joblib (see api/bundle.py):
+  - readmission_model.txt: LightGBM native text model
+  - nlp_bundle/: TF-IDF vocabulary, IDF weights and Naive Bayes
+    log-probabilities as .npy arrays (memory-mappable), plus the
+    vectorizer settings in config.json
+"""
+import json
+import numpy as np
+from pathlib import Path
+
+BOOSTER_FILE = "readmission_model.txt"
+NLP_BUNDLE_DIR = "nlp_bundle"
+
+
+def export_lightgbm_bundle(model, model_dir: Path) -> Path:
+    """`model` is an LGBMClassifier or a Booster."""
+    path = model_dir / BOOSTER_FILE
+    getattr(model, "booster_", model).save_model(str(path))
+    return path
+
+
+def export_nlp_bundle(pipeline, model_dir: Path) -> Path:
+    tfidf = pipeline.named_steps['tfidf']
+    clf = pipeline.named_steps['clf']
+    out_dir = model_dir / NLP_BUNDLE_DIR
+    out_dir.mkdir(parents=True, exist_ok=True)
+
+    # Vocabulary as an array of terms ordered by feature index
+    vocabulary = np.empty(len(tfidf.vocabulary_), dtype=object)
+    for term, idx in tfidf.vocabulary_.items():
+        vocabulary[idx] = term
+
+    np.save(out_dir / "vocabulary.npy", vocabulary.astype(str))
+    # Without use_idf the vectorizer has no idf_; the scorer skips it then
+    idf = tfidf.idf_ if tfidf.use_idf else np.ones(len(vocabulary))
+    np.save(out_dir / "idf.npy", idf.astype(np.float64))
+    np.save(out_dir / "feature_log_prob.npy", clf.feature_log_prob_.astype(np.float64))
+    np.save(out_dir / "class_log_prior.npy", clf.class_log_prior_.astype(np.float64))
+    np.save(out_dir / "classes.npy", clf.classes_.astype(str))
+
+    stop_words = tfidf.get_stop_words()
+    config = {
+        "lowercase": tfidf.lowercase,
+        "token_pattern": tfidf.token_pattern,
+        "ngram_range": list(tfidf.ngram_range),
+        "stop_words": sorted(stop_words) if stop_words else [],
+        "norm": tfidf.norm,
+        "use_idf": tfidf.use_idf,
+        "sublinear_tf": tfidf.sublinear_tf,
+    }
+    with open(out_dir / "config.json", "w") as f:
+        json.dump(config, f)
+    return out_dir
@@ -0,0 +1,53 @@
+"""
+Per-stage wall-clock time and peak RSS for the training scripts.
+
+Standard library only: train_nlp_diagnosis.py's spawn workers import this
+module, and must not pull in LightGBM or MLflow on the way.
+"""
+import resource
+import sys
+import time
+from contextlib import contextmanager
+
+
+class StageLog:
+    """Wall-clock time and peak RSS per pipeline stage."""
+
+    def __init__(self):
+        self.stages = {}
+
+    @contextmanager
+    def stage(self, name: str):
+        reset_peak_rss()
+        start = time.perf_counter()
+        yield
+        self.stages[name] = {"seconds": time.perf_counter() - start, "peak_rss_mb": peak_rss_mb()}
+        print(f"[{name}] {self.stages[name]['seconds']:.2f}s, peak RSS {self.stages[name]['peak_rss_mb']:.0f} MB")
+
+    def log_to_mlflow(self):
+        import mlflow
+        for name, stats in self.stages.items():
+            mlflow.log_metric(f"{name}_seconds", stats["seconds"])
+            mlflow.log_metric(f"{name}_peak_rss_mb", stats["peak_rss_mb"])
+
+
+def reset_peak_rss():
+    # Linux: writing 5 to clear_refs resets VmHWM, giving per-stage peaks
+    try:
+        with open("/proc/self/clear_refs", "w") as f:
+            f.write("5")
+    except OSError:
+        pass
+
+
+def peak_rss_mb() -> float:
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    # Whole-process peak elsewhere (KB on Linux, bytes on macOS)
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
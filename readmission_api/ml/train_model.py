@@ -1,56 +1,335 @@
-import pandas as pd
-import lightgbm as lgb
+"""
+Train the readmission model out of core.
+
+The features Parquet is streamed as Arrow record batches, encoded with
+native categorical features (ml/arrow_features.py) and spilled to on-disk
+float32 matrices per split (train / validation / test). LightGBM builds its
+binned Dataset from those through lgb.Sequence, a batch at a time, and the
+binary Datasets are cached under ml/cache/ keyed on the input files and
+binning settings, so a re-run with unchanged data skips straight to training.
+Training uses every core and stops early on the validation AUC. Wall-clock
+time and peak RSS of each stage are logged to MLflow. Next to the model it
+writes feature_spec.json (ml/feature_spec.py), which the API compiles its
+request encoder from.
+
+Run from readmission_api/:
+    python ml/train_model.py
+    python ml/train_model.py --num-boost-round 2000 --early-stopping 100 --shap-sample 5000
+"""
+import argparse
+import hashlib
+import json
+import os
+import shutil
+from pathlib import Path
+
 import joblib
+import lightgbm as lgb
 import mlflow
-import mlflow.sklearn
-from sklearn.model_selection import train_test_split
+import mlflow.lightgbm
+import numpy as np
+import pyarrow.dataset as ds
 from sklearn.metrics import roc_auc_score, classification_report
-from pathlib import Path
+
+from arrow_features import LABEL, BatchEncoder, complete_batches
+from feature_index import build_feature_index, write_feature_index
+from feature_spec import build_feature_spec, write_feature_spec
+from risk_table import build_risk_table, write_risk_table
+from serving_bundle import export_lightgbm_bundle
+from stage_log import StageLog
 
 # Get paths relative to this file
 ML_DIR = Path(__file__).parent
 PROJECT_ROOT = ML_DIR.parent.parent
 MODEL_DIR = ML_DIR / "models"
+CACHE_DIR = ML_DIR / "cache"
 DATA_DIR = PROJECT_ROOT / "data" / "processed"
 
-# Load data
-df = pd.read_parquet(DATA_DIR / "fct_patient_features.parquet")
-df = df.dropna()  # drop incomplete rows for simplicity
+SPLITS = ("train", "valid", "test")
+
+
+class MatrixSequence(lgb.Sequence):
+    """Row-batch view over an on-disk matrix, so LightGBM bins it without loading it whole."""
+
+    def __init__(self, matrix: np.ndarray, batch_size: int):
+        self.matrix = matrix
+        self.batch_size = batch_size
+
+    def __getitem__(self, idx):
+        # Dataset construction from Sequences takes float64
+        return np.asarray(self.matrix[idx], dtype=np.float64)
+
+    def __len__(self):
+        return len(self.matrix)
+
+
+def input_fingerprint(path: Path) -> list:
+    files = sorted(path.rglob("*.parquet")) if path.is_dir() else [path]
+    return [(str(f), f.stat().st_size, f.stat().st_mtime_ns) for f in files]
+
+
+def dataset_params(args) -> dict:
+    # No pre-filtering on min_data_in_leaf, so a cached Dataset serves any leaf size (tune_model.py)
+    return {"max_bin": args.max_bin, "feature_pre_filter": False, "verbose": -1, "num_threads": args.num_threads}
+
+
+def cache_key(args) -> str:
+    key = {
+        "input": input_fingerprint(Path(args.input)),
+        "test_fraction": args.test_fraction,
+        "valid_fraction": args.valid_fraction,
+        "seed": args.seed,
+        "dataset_params": {k: v for k, v in dataset_params(args).items() if k != "num_threads"},
+    }
+    return hashlib.sha1(json.dumps(key).encode()).hexdigest()[:16]
+
+
+def spill_splits(args, work_dir: Path) -> dict:
+    """
+    Stream the input once: encode each batch, assign rows to splits and append
+    them to per-split raw float32 files. Returns the metadata needed to reopen them.
+    """
+    schema = ds.dataset(args.input, format="parquet").schema
+    encoder = BatchEncoder(schema)
+    rng = np.random.default_rng(args.seed)
+    files = {split: open(work_dir / f"{split}_X.f32", "wb") for split in SPLITS}
+    labels = {split: [] for split in SPLITS}
+    try:
+        for batch in complete_batches(args.input, args.batch_size):
+            X, y = encoder.encode(batch)
+            u = rng.random(len(y))
+            assignment = {
+                "test": u < args.test_fraction,
+                "valid": (u >= args.test_fraction) & (u < args.test_fraction + args.valid_fraction),
+                "train": u >= args.test_fraction + args.valid_fraction,
+            }
+            for split, mask in assignment.items():
+                files[split].write(np.ascontiguousarray(X[mask]).tobytes())
+                labels[split].append(y[mask])
+    finally:
+        for f in files.values():
+            f.close()
+
+    meta = {"features": encoder.features, "categories": encoder.categories, "rows": {}}
+    for split in SPLITS:
+        y = np.concatenate(labels[split]) if labels[split] else np.empty(0, dtype=np.float32)
+        np.save(work_dir / f"{split}_y.npy", y)
+        meta["rows"][split] = len(y)
+    return meta
+
+
+def open_matrix(work_dir: Path, split: str, meta: dict) -> np.ndarray:
+    shape = (meta["rows"][split], len(meta["features"]))
+    if not shape[0]:
+        return np.empty(shape, dtype=np.float32)
+    return np.memmap(work_dir / f"{split}_X.f32", dtype=np.float32, mode="r", shape=shape)
+
 
-X = df.drop(columns=["encounter_id", "readmitted_within_30d", "PATIENT", "days_to_next"])
-y = df["readmitted_within_30d"]
+def load_datasets(cache_dir: Path, params: dict) -> tuple:
+    """The cached binary train/valid Datasets (bins already computed, loads in a fraction of a second)."""
+    train_set = lgb.Dataset(str(cache_dir / "train.bin"), params=params)
+    valid_set = lgb.Dataset(str(cache_dir / "valid.bin"), reference=train_set, params=params)
+    train_set.construct()
+    valid_set.construct()
+    return train_set, valid_set
 
-# Encode categorical
-X = pd.get_dummies(X)
 
-# Train/test split
-X_train, X_test, y_train, y_test = train_test_split(
-    X, y, test_size=0.2, stratify=y, random_state=42
-)
+def build_datasets(args, cache_dir: Path, log: StageLog) -> tuple:
+    """Binary train/valid Datasets plus the held-out test split, from cache when possible."""
+    meta_path = cache_dir / "meta.json"
+    if meta_path.exists() and not args.no_cache:
+        print(f"Using cached Datasets in {cache_dir}")
+        mlflow.log_param("dataset_cache", "hit")
+        with log.stage("load_cache"):
+            meta = json.loads(meta_path.read_text())
+            train_set, valid_set = load_datasets(cache_dir, dataset_params(args))
+        return train_set, valid_set, meta
 
-# MLflow logging
-mlflow.set_tracking_uri(f"file:{ML_DIR / 'mlflow_logs'}")
-mlflow.set_experiment("Readmission Risk")
+    mlflow.log_param("dataset_cache", "miss")
+    shutil.rmtree(cache_dir, ignore_errors=True)
+    cache_dir.mkdir(parents=True)
 
-with mlflow.start_run():
-    model = lgb.LGBMClassifier(
-        objective="binary",
-        class_weight="balanced",
-        n_estimators=100,
-        random_state=42
-    )
-    model.fit(X_train, y_train)
+    with log.stage("scan_encode"):
+        meta = spill_splits(args, cache_dir)
+    print(f"Rows: {meta['rows']}")
 
-    y_pred = model.predict(X_test)
-    y_proba = model.predict_proba(X_test)[:, 1]
+    with log.stage("construct_dataset"):
+        categorical = list(meta["categories"])
+        y_train = np.load(cache_dir / "train_y.npy")
+        meta["positives"] = int(y_train.sum())
+        meta["negatives"] = int(len(y_train) - meta["positives"])
+        train_set = lgb.Dataset(
+            MatrixSequence(open_matrix(cache_dir, "train", meta), args.batch_size),
+            label=y_train,
+            feature_name=meta["features"],
+            categorical_feature=categorical,
+            params=dataset_params(args),
+            free_raw_data=True,
+        ).construct()
+        valid_set = lgb.Dataset(
+            MatrixSequence(open_matrix(cache_dir, "valid", meta), args.batch_size),
+            label=np.load(cache_dir / "valid_y.npy"),
+            feature_name=meta["features"],
+            categorical_feature=categorical,
+            reference=train_set,
+            params=dataset_params(args),
+            free_raw_data=True,
+        ).construct()
+
+    with log.stage("save_cache"):
+        train_set.save_binary(str(cache_dir / "train.bin"))
+        valid_set.save_binary(str(cache_dir / "valid.bin"))
+        # The test split stays a raw matrix for predict(); the others live on in the .bin files
+        for split in ("train", "valid"):
+            (cache_dir / f"{split}_X.f32").unlink()
+        meta_path.write_text(json.dumps(meta))
+    return train_set, valid_set, meta
+
+
+def train_params(args, meta: dict) -> dict:
+    return {
+        "objective": "binary",
+        "metric": "auc",
+        "learning_rate": args.learning_rate,
+        "num_leaves": args.num_leaves,
+        "num_threads": args.num_threads,
+        # Same positive:negative weighting as LGBMClassifier(class_weight="balanced").
+        # (Per-row weights are avoided: Sequence Datasets built by reference to a
+        # weighted one get a zero weight vector that all-ones weights can't override.)
+        "scale_pos_weight": meta["negatives"] / max(meta["positives"], 1),
+        "seed": args.seed,
+        "verbose": -1,
+    }
+
+
+def predict_in_chunks(booster: lgb.Booster, X: np.ndarray, chunk: int = 500_000, **kwargs) -> np.ndarray:
+    """Score an on-disk matrix a slice at a time."""
+    out = np.empty(len(X))
+    for start in range(0, len(X), chunk):
+        out[start:start + chunk] = booster.predict(X[start:start + chunk], **kwargs)
+    return out
+
+
+def evaluate(booster: lgb.Booster, cache_dir: Path, meta: dict) -> float:
+    """Test-split ROC AUC (logged to the active run) plus the classification report."""
+    X_test = open_matrix(cache_dir, "test", meta)
+    y_test = np.load(cache_dir / "test_y.npy")
+    y_proba = predict_in_chunks(booster, X_test, num_iteration=booster.best_iteration)
+    y_pred = (y_proba > 0.5).astype(int)
     auc = roc_auc_score(y_test, y_proba)
 
     mlflow.log_metric("roc_auc", auc)
-    mlflow.sklearn.log_model(model, "model")
-
     print(f"ROC AUC: {auc:.4f}")
     print(classification_report(y_test, y_pred))
+    return auc
+
 
-    # Save model locally
+def save_model(booster: lgb.Booster, meta: dict, args):
+    """
+    Best-iteration model as readmission_model.pkl + serving bundle + feature spec
+    (and, with --risk-table-ages / --feature-index, the precomputed risk table and
+    the encounter feature index), logged to MLflow.
+    """
+    # Saved into the model file; the API's encoder maps request strings with it
+    booster.pandas_categorical = list(meta["categories"].values())
+    # Drop the trees grown after the best validation score
+    booster = lgb.Booster(model_str=booster.model_to_string(num_iteration=booster.best_iteration or None))
     MODEL_DIR.mkdir(parents=True, exist_ok=True)
-    joblib.dump(model, MODEL_DIR / "readmission_model.pkl")
+    joblib.dump(booster, MODEL_DIR / "readmission_model.pkl")
+    # Compact serving format: native LightGBM model, loads without sklearn/joblib
+    export_lightgbm_bundle(booster, MODEL_DIR)
+    # Column layout, categories and request mapping the API compiles its encoder from
+    schema = ds.dataset(args.input, format="parquet").schema
+    spec = build_feature_spec(meta["features"], meta["categories"],
+                              {name: str(schema.field(name).type) for name in meta["features"]}, LABEL)
+    mlflow.log_artifact(str(write_feature_spec(spec, MODEL_DIR)))
+    mlflow.log_param("feature_spec_version", spec["version"])
+    if args.risk_table_ages:
+        # Every in-range request answered without running the ensemble (api/risk_table.py)
+        table = build_risk_table(booster, spec, tuple(args.risk_table_ages), args.risk_table_top_k)
+        mlflow.log_artifact(str(write_risk_table(table, MODEL_DIR)))
+        mlflow.log_metric("risk_table_cells", len(table["risk"]))
+    if args.feature_index:
+        # Encounters of the training export, scorable by ID (api/feature_index.py)
+        index = build_feature_index(args.input, spec, args.batch_size)
+        write_feature_index(index, MODEL_DIR)
+        mlflow.log_metric("feature_index_encounters", index["config"]["encounters"])
+    mlflow.lightgbm.log_model(booster, "model")
+
+
+def add_data_args(parser: argparse.ArgumentParser):
+    """Input, split and binning flags (everything the Dataset cache is keyed on)."""
+    parser.add_argument("--input", default=str(DATA_DIR / "fct_patient_features.parquet"),
+                        help="Features Parquet file or directory")
+    parser.add_argument("--batch-size", type=int, default=65536)
+    parser.add_argument("--test-fraction", type=float, default=0.2)
+    parser.add_argument("--valid-fraction", type=float, default=0.1)
+    parser.add_argument("--num-boost-round", type=int, default=1000)
+    parser.add_argument("--early-stopping", type=int, default=50, help="Rounds without validation AUC gain")
+    parser.add_argument("--max-bin", type=int, default=255)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--no-cache", action="store_true", help="Rebuild the Dataset cache")
+
+
+def add_output_args(parser: argparse.ArgumentParser):
+    """Flags for the artifacts save_model writes besides the model."""
+    parser.add_argument("--risk-table-ages", type=int, nargs=2, metavar=("LOW", "HIGH"), default=None,
+                        help="Also write risk_table.npz covering these ages x every gender/race (e.g. 0 120)")
+    parser.add_argument("--risk-table-top-k", type=int, default=5, help="SHAP contributions kept per table cell")
+    parser.add_argument("--feature-index", action="store_true",
+                        help="Also write feature_index/ over --input's encounters (/predict_by_encounter)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Train the readmission LightGBM model from Parquet batches.")
+    add_data_args(parser)
+    add_output_args(parser)
+    parser.add_argument("--learning-rate", type=float, default=0.1)
+    parser.add_argument("--num-leaves", type=int, default=31)
+    parser.add_argument("--num-threads", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--shap-sample", type=int, default=0,
+                        help="Log mean |SHAP| per feature over this many test rows (0 skips)")
+    args = parser.parse_args()
+
+    # MLflow logging
+    mlflow.set_tracking_uri(f"file:{ML_DIR / 'mlflow_logs'}")
+    mlflow.set_experiment("Readmission Risk")
+    log = StageLog()
+
+    with mlflow.start_run():
+        mlflow.log_params({k: v for k, v in vars(args).items() if k != "no_cache"})
+        cache_dir = CACHE_DIR / cache_key(args)
+        train_set, valid_set, meta = build_datasets(args, cache_dir, log)
+
+        with log.stage("train"):
+            booster = lgb.train(
+                train_params(args, meta),
+                train_set,
+                num_boost_round=args.num_boost_round,
+                valid_sets=[valid_set],
+                valid_names=["valid"],
+                callbacks=[lgb.early_stopping(args.early_stopping), lgb.log_evaluation(50)],
+            )
+        mlflow.log_metric("best_iteration", booster.best_iteration)
+        mlflow.log_metric("valid_auc", booster.best_score["valid"]["auc"])
+
+        with log.stage("evaluate"):
+            evaluate(booster, cache_dir, meta)
+
+        if args.shap_sample:
+            with log.stage("shap"):
+                X_test = open_matrix(cache_dir, "test", meta)
+                rows = np.random.default_rng(args.seed).choice(
+                    len(X_test), min(args.shap_sample, len(X_test)), replace=False)
+                contribs = booster.predict(X_test[np.sort(rows)], pred_contrib=True)[:, :-1]
+                for name, value in zip(meta["features"], np.abs(contribs).mean(axis=0)):
+                    mlflow.log_metric(f"shap_mean_abs_{name}", float(value))
+
+        with log.stage("save"):
+            save_model(booster, meta, args)
+
+        log.log_to_mlflow()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,15 +1,45 @@
 """
 Train NLP model for diagnosis prediction from chief complaint text.
 Uses Synthea's reasonDescription as training data.
+
+The default mode loads encounters.parquet into pandas and fits TF-IDF +
+Multinomial Naive Bayes in memory. --streaming trains out of core instead:
+only DESCRIPTION / REASONDESCRIPTION are read, as Arrow record batches, in
+four passes (label counts, vocabulary, training, evaluation). The vocabulary
+is pruned by frequency (--min-df, --max-features) from term counts gathered
+in the vocabulary pass, so the result is the same TfidfVectorizer +
+MultinomialNB pipeline and serving bundle as the in-memory mode. Each batch is
+reduced to its distinct (text, label) pairs and vectorized on --workers
+processes; Naive Bayes is trained with partial_fit, weighted by the pair
+counts. Memory grows with the number of distinct n-grams (vocabulary pass)
+and --batch-size, not with the number of rows. Time, rows/s and peak RSS
+(main process and workers) are reported per pass.
+
+Run from readmission_api/:
+    python ml/train_nlp_diagnosis.py
+    python ml/train_nlp_diagnosis.py --streaming --workers 4 --top-n 50 --max-features 5000
 """
-import pandas as pd
-import joblib
+import argparse
+import multiprocessing
+import os
+from collections import Counter, deque
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
-from sklearn.model_selection import train_test_split
+
+import joblib
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.dataset as ds
 from sklearn.feature_extraction.text import TfidfVectorizer
+from sklearn.metrics import accuracy_score, classification_report
+from sklearn.model_selection import train_test_split
 from sklearn.naive_bayes import MultinomialNB
 from sklearn.pipeline import Pipeline
-from sklearn.metrics import classification_report, accuracy_score
+
+from serving_bundle import export_nlp_bundle
+from stage_log import StageLog, peak_rss_mb
 
 # Get paths relative to this file
 ML_DIR = Path(__file__).parent
@@ -17,62 +47,311 @@ PROJECT_ROOT = ML_DIR.parent.parent
 MODEL_DIR = ML_DIR / "models"
 DATA_DIR = PROJECT_ROOT / "data" / "processed"
 
-# Load Synthea encounters with reason descriptions
-encounters = pd.read_parquet(DATA_DIR / "synthea" / "encounters.parquet")
-
-# Filter to rows with valid reason descriptions
-df = encounters[['REASONDESCRIPTION', 'DESCRIPTION']].dropna()
-df = df[df['REASONDESCRIPTION'].str.len() > 5]  # Remove very short text
-
-print(f"Total training samples: {len(df)}")
-print(f"Unique diagnoses: {df['REASONDESCRIPTION'].nunique()}")
-
-# Use top N most common diagnoses for classification
-top_n = 20
-top_diagnoses = df['REASONDESCRIPTION'].value_counts().head(top_n).index.tolist()
-df_filtered = df[df['REASONDESCRIPTION'].isin(top_diagnoses)]
-
-print(f"\nFiltered to top {top_n} diagnoses: {len(df_filtered)} samples")
-print("\nTop diagnoses:")
-for i, diag in enumerate(top_diagnoses[:10], 1):
-    count = (df_filtered['REASONDESCRIPTION'] == diag).sum()
-    print(f"  {i}. {diag}: {count} samples")
-
-# Prepare data
-X = df_filtered['DESCRIPTION'].values  # Encounter description as input
-y = df_filtered['REASONDESCRIPTION'].values  # Reason as target
-
-# Train/test split
-X_train, X_test, y_train, y_test = train_test_split(
-    X, y, test_size=0.2, stratify=y, random_state=42
-)
-
-# Build pipeline: TF-IDF + Naive Bayes
-pipeline = Pipeline([
-    ('tfidf', TfidfVectorizer(
-        max_features=1000,
-        ngram_range=(1, 2),
-        stop_words='english'
-    )),
-    ('clf', MultinomialNB(alpha=0.1))
-])
-
-print("\nTraining NLP diagnosis model...")
-pipeline.fit(X_train, y_train)
-
-# Evaluate
-y_pred = pipeline.predict(X_test)
-accuracy = accuracy_score(y_test, y_pred)
-
-print(f"\nTest Accuracy: {accuracy:.4f}")
-print("\nClassification Report:")
-print(classification_report(y_test, y_pred, zero_division=0))
-
-# Save model
-MODEL_DIR.mkdir(parents=True, exist_ok=True)
-joblib.dump(pipeline, MODEL_DIR / "nlp_diagnosis_model.pkl")
-joblib.dump(top_diagnoses, MODEL_DIR / "diagnosis_labels.pkl")
-
-print(f"\n✅ NLP diagnosis model saved to {MODEL_DIR / 'nlp_diagnosis_model.pkl'}")
-print(f"✅ Diagnosis labels saved to {MODEL_DIR / 'diagnosis_labels.pkl'}")
+TEXT = "DESCRIPTION"  # Encounter description as input
+LABEL = "REASONDESCRIPTION"  # Reason as target
+MIN_LABEL_LENGTH = 6  # Remove very short text
+
+
+def make_pipeline(args, vocabulary=None) -> Pipeline:
+    # TF-IDF + Naive Bayes; a fixed vocabulary (streaming mode) overrides max_features
+    return Pipeline([
+        ('tfidf', TfidfVectorizer(
+            max_features=args.max_features,
+            ngram_range=(1, 2),
+            stop_words='english',
+            vocabulary=vocabulary,
+        )),
+        ('clf', MultinomialNB(alpha=args.alpha))
+    ])
+
+
+def print_top_diagnoses(top_diagnoses: list, counts) -> None:
+    print("\nTop diagnoses:")
+    for i, diag in enumerate(top_diagnoses[:10], 1):
+        print(f"  {i}. {diag}: {counts[diag]} samples")
+
+
+def print_rate(log: StageLog, stage: str, rows: int) -> None:
+    print(f"  {rows} rows, {rows / max(log.stages[stage]['seconds'], 1e-9):,.0f} rows/s")
+
+
+def report(log: StageLog, stage: str, stats: dict, pool) -> None:
+    print_rate(log, stage, stats[stage]["rows"])
+    if pool is not None:
+        print(f"  worker peak RSS {stats[stage]['worker_peak_rss_mb']:.0f} MB")
+
+
+def train_in_memory(args, log: StageLog):
+    with log.stage("load"):
+        # Load Synthea encounters with reason descriptions
+        encounters = pd.read_parquet(args.input)
+
+        # Filter to rows with valid reason descriptions
+        df = encounters[[LABEL, TEXT]].dropna()
+        df = df[df[LABEL].str.len() >= MIN_LABEL_LENGTH]
+    print_rate(log, "load", len(encounters))
+
+    print(f"Total training samples: {len(df)}")
+    print(f"Unique diagnoses: {df[LABEL].nunique()}")
+
+    # Use top N most common diagnoses for classification
+    top_diagnoses = df[LABEL].value_counts().head(args.top_n).index.tolist()
+    df_filtered = df[df[LABEL].isin(top_diagnoses)]
+
+    print(f"\nFiltered to top {args.top_n} diagnoses: {len(df_filtered)} samples")
+    print_top_diagnoses(top_diagnoses, df_filtered[LABEL].value_counts())
+
+    # Prepare data
+    X = df_filtered[TEXT].values
+    y = df_filtered[LABEL].values
+
+    # Train/test split
+    X_train, X_test, y_train, y_test = train_test_split(
+        X, y, test_size=args.test_fraction, stratify=y, random_state=args.seed
+    )
+
+    pipeline = make_pipeline(args)
+
+    print("\nTraining NLP diagnosis model...")
+    with log.stage("train"):
+        pipeline.fit(X_train, y_train)
+    print_rate(log, "train", len(X_train))
+
+    # Evaluate
+    with log.stage("evaluate"):
+        y_pred = pipeline.predict(X_test)
+    print_rate(log, "evaluate", len(X_test))
+    accuracy = accuracy_score(y_test, y_pred)
+
+    print(f"\nTest Accuracy: {accuracy:.4f}")
+    print("\nClassification Report:")
+    print(classification_report(y_test, y_pred, zero_division=0))
+    return pipeline, top_diagnoses
+
+
+# Per-worker state for --streaming, set once by init_worker
+_settings = None
+
+
+def init_worker(settings: dict):
+    global _settings
+    _settings = settings
+
+
+def decode_text(batch: pa.RecordBatch) -> pa.RecordBatch:
+    """
+    The batch with plain string columns. data_ingestion/ingest.py writes both
+    text columns dictionary-encoded, and utf8_length / index_in have no
+    dictionary kernels; batches travel to the workers encoded and are decoded
+    here, first thing.
+    """
+    columns = [column.dictionary_decode() if pa.types.is_dictionary(column.type) else column
+               for column in batch.columns]
+    return pa.RecordBatch.from_arrays(columns, names=batch.schema.names)
+
+
+def split_batch(batch: pa.RecordBatch, index: int, labels: list, split: str) -> pa.Table:
+    """
+    The batch's rows with a top label and a description, in `split`. Rows are
+    assigned by a generator seeded with (seed, batch index), so the split
+    doesn't depend on which worker gets the batch.
+    """
+    batch = decode_text(batch)
+    codes = pc.index_in(batch.column(LABEL), value_set=pa.array(labels, pa.string()))
+    batch = batch.append_column("label", codes).filter(pc.and_(pc.is_valid(codes), pc.is_valid(batch.column(TEXT))))
+    in_test = np.random.default_rng([_settings["seed"], index]).random(batch.num_rows) < _settings["test_fraction"]
+    return pa.Table.from_batches([batch.filter(pa.array(in_test if split == "test" else ~in_test))])
+
+
+def distinct_pairs(table: pa.Table) -> pa.Table:
+    """(text, label code, rows) per distinct pair; descriptions repeat heavily, so this is the batch's real size."""
+    return table.group_by([TEXT, "label"]).aggregate([([], "count_all")])
+
+
+def count_labels(batch: pa.RecordBatch, index: int) -> dict:
+    batch = decode_text(batch)
+    labels = batch.column(LABEL)
+    valid = pc.and_(pc.is_valid(batch.column(TEXT)), pc.greater_equal(pc.utf8_length(labels), MIN_LABEL_LENGTH))
+    counts = pc.value_counts(labels.filter(valid))
+    return {"rows": batch.num_rows, "peak_rss_mb": peak_rss_mb(),
+            "counts": dict(zip(counts.field("values").to_pylist(), counts.field("counts").to_pylist()))}
+
+
+def count_terms(batch: pa.RecordBatch, index: int, labels: list) -> dict:
+    """Term frequency and document frequency of the batch's training rows, per n-gram."""
+    analyze = make_pipeline(_settings["args"]).named_steps['tfidf'].build_analyzer()
+    pairs = split_batch(batch, index, labels, "train").group_by([TEXT]).aggregate([([], "count_all")])
+    tf, df = Counter(), Counter()
+    for text, rows in zip(pairs.column(TEXT).to_pylist(), pairs.column("count_all").to_pylist()):
+        terms = Counter(analyze(text))
+        for term, count in terms.items():
+            tf[term] += count * rows
+            df[term] += rows
+    return {"rows": batch.num_rows, "peak_rss_mb": peak_rss_mb(), "documents": sum(pairs.column("count_all").to_pylist()),
+            "tf": tf, "df": df}
+
+
+def vectorize(batch: pa.RecordBatch, index: int, labels: list, split: str, vectorizer: TfidfVectorizer) -> dict:
+    """TF-IDF rows for the batch's distinct (text, label) pairs in `split`, weighted by how often each occurs."""
+    pairs = distinct_pairs(split_batch(batch, index, labels, split))
+    return {"rows": batch.num_rows, "peak_rss_mb": peak_rss_mb(),
+            "X": vectorizer.transform(pairs.column(TEXT).to_pylist()),
+            "y": pairs.column("label").to_numpy(),
+            "weights": pairs.column("count_all").to_numpy().astype(np.float64)}
+
+
+def map_batches(args, pool, stats: dict, task, *task_args):
+    """
+    Yield task(batch, index, *task_args) for every batch of the two text
+    columns, in batch order, adding up rows read and the workers' peak RSS in
+    `stats`. On a pool, at most two batches per worker are in flight, so
+    memory stays bounded however large the input is.
+    """
+    stats.update(rows=0, worker_peak_rss_mb=0.0)
+    batches = ds.dataset(args.input, format="parquet").to_batches(columns=[TEXT, LABEL], batch_size=args.batch_size)
+    if pool is None:
+        results = (task(batch, index, *task_args) for index, batch in enumerate(batches))
+    else:
+        results = _in_order(pool, args.workers, task, batches, task_args)
+    for result in results:
+        stats["rows"] += result["rows"]
+        stats["worker_peak_rss_mb"] = max(stats["worker_peak_rss_mb"], result["peak_rss_mb"])
+        yield result
+
+
+def _in_order(pool, workers: int, task, batches, task_args):
+    pending = deque()
+    for index, batch in enumerate(batches):
+        pending.append(pool.submit(task, batch, index, *task_args))
+        if len(pending) >= 2 * workers:
+            yield pending.popleft().result()
+    while pending:
+        yield pending.popleft().result()
+
+
+def prune_vocabulary(tf: Counter, df: Counter, args) -> list:
+    """Terms in at least --min-df documents, the --max-features most frequent of them (ties by term), sorted."""
+    terms = [term for term, count in df.items() if count >= args.min_df]
+    terms.sort(key=lambda term: (-tf[term], term))
+    return sorted(terms[:args.max_features])
+
+
+def train_streaming(args, log: StageLog):
+    settings = {"args": args, "seed": args.seed, "test_fraction": args.test_fraction}
+    pool = None
+    if args.workers > 1:
+        pool = ProcessPoolExecutor(max_workers=args.workers, mp_context=multiprocessing.get_context("spawn"),
+                                   initializer=init_worker, initargs=(settings,))
+    else:
+        init_worker(settings)
+    stats = {}  # stage -> rows and worker peak RSS, filled by map_batches
+
+    try:
+        if pool is not None:
+            # Spawn and import in every worker now, so the first pass's rate doesn't include it
+            with log.stage("workers"):
+                for future in [pool.submit(peak_rss_mb) for _ in range(args.workers)]:
+                    future.result()
+        with log.stage("labels"):
+            label_counts = Counter()
+            for result in map_batches(args, pool, stats.setdefault("labels", {}), count_labels):
+                label_counts.update(result["counts"])
+        report(log, "labels", stats, pool)
+        print(f"Total training samples: {sum(label_counts.values())}")
+        print(f"Unique diagnoses: {len(label_counts)}")
+
+        # Use top N most common diagnoses for classification
+        top_diagnoses = [label for label, _ in sorted(label_counts.items(), key=lambda item: (-item[1], item[0]))][:args.top_n]
+        print(f"\nFiltered to top {args.top_n} diagnoses: {sum(label_counts[label] for label in top_diagnoses)} samples")
+        print_top_diagnoses(top_diagnoses, label_counts)
+
+        with log.stage("vocabulary"):
+            tf, df = Counter(), Counter()
+            documents = 0
+            for result in map_batches(args, pool, stats.setdefault("vocabulary", {}), count_terms, top_diagnoses):
+                tf.update(result["tf"])
+                df.update(result["df"])
+                documents += result["documents"]
+            vocabulary = prune_vocabulary(tf, df, args)
+            # TfidfVectorizer's smoothed idf, from the training rows' document frequencies
+            idf = np.log((1 + documents) / (1 + np.array([df[term] for term in vocabulary], dtype=np.float64))) + 1
+        report(log, "vocabulary", stats, pool)
+        print(f"Vocabulary: {len(vocabulary)} of {len(tf)} n-grams, {documents} training documents")
+
+        pipeline = make_pipeline(args, vocabulary)
+        vectorizer = pipeline.named_steps['tfidf']
+        vectorizer.idf_ = idf
+        clf = pipeline.named_steps['clf']
+        classes = np.array(top_diagnoses, dtype=object)
+
+        print("\nTraining NLP diagnosis model...")
+        with log.stage("train"):
+            for result in map_batches(args, pool, stats.setdefault("train", {}),
+                                      vectorize, top_diagnoses, "train", vectorizer):
+                if result["X"].shape[0]:
+                    clf.partial_fit(result["X"], classes[result["y"]], classes=classes, sample_weight=result["weights"])
+        report(log, "train", stats, pool)
+
+        # Evaluate: predictions for each distinct test pair, weighted by its row count
+        with log.stage("evaluate"):
+            y_test, y_pred, weights = [], [], []
+            for result in map_batches(args, pool, stats.setdefault("evaluate", {}),
+                                      vectorize, top_diagnoses, "test", vectorizer):
+                if result["X"].shape[0]:
+                    y_test.append(classes[result["y"]])
+                    y_pred.append(clf.predict(result["X"]))
+                    weights.append(result["weights"])
+        report(log, "evaluate", stats, pool)
+    finally:
+        if pool is not None:
+            pool.shutdown()
+
+    y_test, y_pred, weights = np.concatenate(y_test), np.concatenate(y_pred), np.concatenate(weights)
+    accuracy = accuracy_score(y_test, y_pred, sample_weight=weights)
+
+    print(f"\nTest Accuracy: {accuracy:.4f} ({int(weights.sum())} test rows)")
+    print("\nClassification Report:")
+    print(classification_report(y_test, y_pred, sample_weight=weights, zero_division=0))
+    return pipeline, top_diagnoses
+
+
+
+def save_model(pipeline: Pipeline, top_diagnoses: list) -> None:
+    MODEL_DIR.mkdir(parents=True, exist_ok=True)
+    joblib.dump(pipeline, MODEL_DIR / "nlp_diagnosis_model.pkl")
+    joblib.dump(top_diagnoses, MODEL_DIR / "diagnosis_labels.pkl")
+
+    # Compact serving format: mmap-able arrays, loads without sklearn/joblib
+    bundle_dir = export_nlp_bundle(pipeline, MODEL_DIR)
+
+    print(f"\n✅ NLP diagnosis model saved to {MODEL_DIR / 'nlp_diagnosis_model.pkl'}")
+    print(f"✅ Diagnosis labels saved to {MODEL_DIR / 'diagnosis_labels.pkl'}")
+    print(f"✅ NLP serving bundle saved to {bundle_dir}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Train the TF-IDF + Naive Bayes diagnosis model.")
+    parser.add_argument("--input", default=str(DATA_DIR / "synthea" / "encounters.parquet"),
+                        help="Encounters Parquet file or directory")
+    parser.add_argument("--top-n", type=int, default=20, help="Most common diagnoses kept as classes")
+    parser.add_argument("--max-features", type=int, default=1000)
+    parser.add_argument("--alpha", type=float, default=0.1, help="Naive Bayes smoothing")
+    parser.add_argument("--test-fraction", type=float, default=0.2)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--streaming", action="store_true", help="Train out of core from Arrow batches")
+    parser.add_argument("--batch-size", type=int, default=65536, help="Rows per Arrow batch (--streaming)")
+    parser.add_argument("--min-df", type=int, default=1, help="Drop n-grams in fewer training rows (--streaming)")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1,
+                        help="Processes vectorizing batches (--streaming; 1 runs in-process)")
+    args = parser.parse_args()
+
+    log = StageLog()
+    if args.streaming:
+        pipeline, top_diagnoses = train_streaming(args, log)
+    else:
+        pipeline, top_diagnoses = train_in_memory(args, log)
+    save_model(pipeline, top_diagnoses)
+
 
+if __name__ == "__main__":
+    main()
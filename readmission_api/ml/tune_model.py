@@ -0,0 +1,205 @@
+"""
+Hyperparameter search for the readmission model.
+
+The features are scanned, encoded and binned once, into the same ml/cache/
+Datasets train_model.py uses. Each worker process loads those binary
+Datasets (no Parquet re-read, no re-binning) and trains trials with
+--threads-per-trial threads, --parallel trials at a time. Trial parameters
+are sampled at random from SEARCH_SPACE.
+
+Poor trials are pruned: every --prune-interval rounds a trial reports its
+validation AUC, and once --prune-min-trials other trials have reported at
+that round, a trial below their median stops (after --prune-warmup rounds).
+Every trial is a nested MLflow run under the search run; the best completed
+trial is evaluated on the test split and saved exactly like train_model.py
+saves its model.
+
+Run from readmission_api/:
+    python ml/tune_model.py --trials 40 --parallel 4 --threads-per-trial 2
+"""
+import argparse
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import lightgbm as lgb
+import mlflow
+import numpy as np
+
+from stage_log import StageLog
+from train_model import (CACHE_DIR, ML_DIR, add_data_args, add_output_args, build_datasets, cache_key,
+                         dataset_params, evaluate, load_datasets, save_model, train_params)
+
+# name -> (scale, low, high); "log" samples uniformly in log space
+SEARCH_SPACE = {
+    "learning_rate": ("log", 0.01, 0.3),
+    "num_leaves": ("int", 8, 256),
+    "min_data_in_leaf": ("int", 10, 500),
+    "feature_fraction": ("float", 0.5, 1.0),
+    "bagging_fraction": ("float", 0.5, 1.0),
+    "lambda_l2": ("log", 1e-3, 10.0),
+}
+
+# Per-worker state, set once by init_worker
+_datasets = None
+_reports = None
+
+
+class TrialPruned(Exception):
+    pass
+
+
+def sample_params(rng: np.random.Generator) -> dict:
+    params = {}
+    for name, (scale, low, high) in SEARCH_SPACE.items():
+        if scale == "log":
+            params[name] = float(np.exp(rng.uniform(np.log(low), np.log(high))))
+        elif scale == "int":
+            params[name] = int(rng.integers(low, high + 1))
+        else:
+            params[name] = float(rng.uniform(low, high))
+    if params["bagging_fraction"] < 1.0:
+        params["bagging_freq"] = 1
+    return params
+
+
+def init_worker(cache_dir, params: dict, reports, tracking_uri: str):
+    global _datasets, _reports
+    _datasets = load_datasets(cache_dir, params)
+    _reports = reports
+    mlflow.set_tracking_uri(tracking_uri)
+
+
+def median_pruner(trial: int, interval: int, warmup: int, min_trials: int):
+    """lgb callback: report the validation AUC every `interval` rounds, stop below the median."""
+    def _callback(env):
+        iteration = env.iteration + 1
+        if iteration % interval:
+            return
+        auc = env.evaluation_result_list[0][2]
+        _reports[(trial, iteration)] = auc
+        mlflow.log_metric("valid_auc", auc, step=iteration)
+        if iteration < warmup:
+            return
+        others = [value for (other, step), value in _reports.items() if step == iteration and other != trial]
+        if len(others) >= min_trials and auc < np.median(others):
+            raise TrialPruned(iteration)
+    return _callback
+
+
+def run_trial(trial: int, params: dict, settings: dict) -> dict:
+    train_set, valid_set = _datasets
+    result = {"trial": trial, "params": params["sampled"], "model": None}
+    start = time.perf_counter()
+    with mlflow.start_run(run_name=f"trial-{trial}", nested=True, parent_run_id=settings["parent_run_id"]):
+        mlflow.log_params(params["sampled"])
+        try:
+            booster = lgb.train(
+                params["train"],
+                train_set,
+                num_boost_round=settings["num_boost_round"],
+                valid_sets=[valid_set],
+                valid_names=["valid"],
+                callbacks=[
+                    lgb.early_stopping(settings["early_stopping"], verbose=False),
+                    median_pruner(trial, settings["prune_interval"], settings["prune_warmup"],
+                                  settings["prune_min_trials"]),
+                ],
+            )
+        except TrialPruned as pruned:
+            result.update(status="pruned", iterations=pruned.args[0], valid_auc=None)
+        else:
+            result.update(status="complete", iterations=booster.best_iteration,
+                          valid_auc=booster.best_score["valid"]["auc"],
+                          model=booster.model_to_string(num_iteration=booster.best_iteration))
+            mlflow.log_metric("best_iteration", booster.best_iteration)
+            mlflow.log_metric("best_valid_auc", result["valid_auc"])
+        result["seconds"] = time.perf_counter() - start
+        mlflow.set_tag("status", result["status"])
+        mlflow.log_metric("seconds", result["seconds"])
+    return result
+
+
+def main():
+    cpus = os.cpu_count() or 1
+    parser = argparse.ArgumentParser(description="Parallel hyperparameter search for the readmission model.")
+    add_data_args(parser)
+    add_output_args(parser)
+    parser.add_argument("--trials", type=int, default=20)
+    parser.add_argument("--parallel", type=int, default=max(1, cpus // 2), help="Trials running at once")
+    parser.add_argument("--threads-per-trial", type=int, default=None,
+                        help="LightGBM threads per trial (default: CPUs / --parallel)")
+    parser.add_argument("--prune-interval", type=int, default=10, help="Rounds between validation reports")
+    parser.add_argument("--prune-warmup", type=int, default=30, help="Rounds before a trial can be pruned")
+    parser.add_argument("--prune-min-trials", type=int, default=3,
+                        help="Reports needed at a round before pruning against their median")
+    # Dataset construction uses every core; the trials share them out
+    parser.set_defaults(num_threads=cpus, learning_rate=0.1, num_leaves=31)
+    args = parser.parse_args()
+    threads = args.threads_per_trial or max(1, cpus // args.parallel)
+
+    # MLflow logging
+    tracking_uri = f"file:{ML_DIR / 'mlflow_logs'}"
+    mlflow.set_tracking_uri(tracking_uri)
+    mlflow.set_experiment("Readmission Risk")
+    log = StageLog()
+
+    with mlflow.start_run(run_name="tune") as parent:
+        mlflow.log_params({k: v for k, v in vars(args).items() if k != "no_cache"})
+        mlflow.log_param("threads_per_trial", threads)
+        cache_dir = CACHE_DIR / cache_key(args)
+        # Built (or found) once here; workers only load the binary files
+        _, _, meta = build_datasets(args, cache_dir, log)
+
+        rng = np.random.default_rng(args.seed)
+        base = {**train_params(args, meta), "num_threads": threads}
+        trials = []
+        for trial in range(args.trials):
+            sampled = sample_params(rng)
+            trials.append({"sampled": sampled, "train": {**base, **sampled, "seed": args.seed + trial}})
+        settings = {
+            "parent_run_id": parent.info.run_id,
+            "num_boost_round": args.num_boost_round,
+            "early_stopping": args.early_stopping,
+            "prune_interval": args.prune_interval,
+            "prune_warmup": args.prune_warmup,
+            "prune_min_trials": args.prune_min_trials,
+        }
+
+        # spawn: forked children of a process that already ran OpenMP (Dataset construction) can hang
+        context = multiprocessing.get_context("spawn")
+        best = None
+        counts = {"complete": 0, "pruned": 0}
+        with log.stage("search"), context.Manager() as manager:
+            reports = manager.dict()
+            with ProcessPoolExecutor(max_workers=args.parallel, mp_context=context, initializer=init_worker,
+                                     initargs=(cache_dir, dataset_params(args), reports, tracking_uri)) as pool:
+                futures = [pool.submit(run_trial, trial, params, settings) for trial, params in enumerate(trials)]
+                for future in as_completed(futures):
+                    result = future.result()
+                    counts[result["status"]] += 1
+                    auc = f"valid AUC {result['valid_auc']:.4f}" if result["valid_auc"] is not None else "pruned"
+                    print(f"trial {result['trial']:>3}: {auc} after {result['iterations']} rounds "
+                          f"({result['seconds']:.1f}s) {result['params']}")
+                    if result["status"] == "complete" and (best is None or result["valid_auc"] > best["valid_auc"]):
+                        best = result
+
+        mlflow.log_metric("trials_complete", counts["complete"])
+        mlflow.log_metric("trials_pruned", counts["pruned"])
+        if best is None:
+            raise SystemExit("Every trial was pruned; nothing to save")
+
+        print(f"\nBest: trial {best['trial']}, valid AUC {best['valid_auc']:.4f}, {best['params']}")
+        mlflow.log_params({f"best_{name}": value for name, value in best["params"].items()})
+        mlflow.log_metric("valid_auc", best["valid_auc"])
+        booster = lgb.Booster(model_str=best["model"])
+        with log.stage("evaluate"):
+            evaluate(booster, cache_dir, meta)
+        with log.stage("save"):
+            save_model(booster, meta, args)
+        log.log_to_mlflow()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,202 @@
+"""
+Offline bulk scoring over Parquet/CSV with streaming record batches.
+
+Reads fct_patient_features.parquet (or any Parquet/CSV with the same columns)
+batch by batch, encodes each batch into the serving feature layout, scores it
+with LightGBM (plus optional native SHAP top-k and NLP diagnoses) and streams
+the results to an output Parquet file, so memory stays flat as input grows.
+
+Run from readmission_api/:
+    python score_batch.py --input ../data/processed/fct_patient_features.parquet \\
+        --output ../data/processed/readmission_scores.parquet --shap --workers 4
+"""
+import argparse
+import multiprocessing as mp
+import os
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import numpy as np
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+
+DEFAULT_ID_COLUMNS = ["encounter_id", "PATIENT", "patient"]
+
+
+class BatchScorer:
+    """Loads the serving artifacts once and scores whole record batches."""
+
+    def __init__(self, shap_top_k: int = 0, text_column: str = None, nlp_top_k: int = 3,
+                 id_columns=(), num_threads: int = 0):
+        from api.registry import registry
+        models = registry.current()
+        self.booster = models.booster
+        self.encoder = models.encoder
+        self.shap_top_k = shap_top_k
+        self.text_column = text_column
+        self.nlp_top_k = nlp_top_k
+        self.id_columns = list(id_columns)
+        self.num_threads = num_threads
+        self.nlp_model = None
+        if text_column:
+            self.nlp_model = models.nlp_model
+
+    def encode(self, batch: pa.RecordBatch) -> np.ndarray:
+        numeric, categorical = {}, {}
+        for name, column in zip(batch.schema.names, batch.columns):
+            if name in self.id_columns or name == self.text_column or not self.encoder.uses_column(name):
+                continue
+            if pa.types.is_string(column.type) or pa.types.is_large_string(column.type):
+                encoded = column.dictionary_encode()
+                categorical[name] = (
+                    encoded.dictionary.to_pylist(),
+                    encoded.indices.fill_null(-1).to_numpy(zero_copy_only=False),
+                )
+            elif pa.types.is_dictionary(column.type):
+                categorical[name] = (
+                    column.dictionary.cast(pa.string()).to_pylist(),
+                    column.indices.fill_null(-1).to_numpy(zero_copy_only=False),
+                )
+            else:
+                # Nulls become NaN, which LightGBM treats as missing
+                numeric[name] = pc.cast(column, pa.float64()).to_numpy(zero_copy_only=False)
+        return self.encoder.encode_columns(batch.num_rows, numeric, categorical)
+
+    def score(self, batch: pa.RecordBatch) -> pa.RecordBatch:
+        X = self.encode(batch)
+        params = {"num_threads": self.num_threads} if self.num_threads else {}
+
+        arrays = [batch.column(name) for name in self.id_columns]
+        names = list(self.id_columns)
+        arrays.append(pa.array(self.booster.predict(X, **params), pa.float64()))
+        names.append("readmission_risk")
+
+        if self.shap_top_k:
+            from api.explainer import top_indices
+            contribs = self.booster.predict(X, pred_contrib=True, **params)[:, :-1]
+            top = top_indices(contribs, self.shap_top_k)
+            if self.encoder.categories:
+                labels = self.encoder.top_labels(X, top)
+            else:
+                labels = np.array(self.encoder.feature_names, dtype=object)[top]
+            arrays.append(pa.array(labels.tolist(), pa.list_(pa.string())))
+            arrays.append(pa.array(np.take_along_axis(contribs, top, axis=1).tolist(), pa.list_(pa.float64())))
+            names += ["shap_top_features", "shap_top_values"]
+
+        if self.nlp_model is not None:
+            diagnoses, probabilities = self.diagnose(batch.column(self.text_column).to_pylist())
+            arrays.append(pa.array(diagnoses, pa.list_(pa.string())))
+            arrays.append(pa.array(probabilities, pa.list_(pa.float64())))
+            names += ["predicted_diagnoses", "diagnosis_probabilities"]
+
+        return pa.RecordBatch.from_arrays(arrays, names=names)
+
+    def diagnose(self, texts):
+        """Top-k diagnoses per text, same thresholds as api/nlp_predictor.py."""
+        diagnoses = [[] for _ in texts]
+        probabilities = [[] for _ in texts]
+        valid = [i for i, text in enumerate(texts) if text and len(text.strip()) >= 3]
+        if valid:
+            probas = self.nlp_model.predict_proba([texts[i] for i in valid])
+            classes = self.nlp_model.classes_
+            top = np.argsort(probas, axis=1)[:, ::-1][:, :self.nlp_top_k]
+            for i, proba, cols in zip(valid, probas, top):
+                keep = [c for c in cols if proba[c] > 0.05]
+                diagnoses[i] = [str(classes[c]) for c in keep]
+                probabilities[i] = [float(proba[c]) for c in keep]
+        return diagnoses, probabilities
+
+
+# Per-process scorer for --workers mode
+_worker_scorer = None
+
+
+def _init_worker(kwargs):
+    global _worker_scorer
+    _worker_scorer = BatchScorer(**kwargs)
+
+
+def _score_in_worker(batch: pa.RecordBatch) -> pa.RecordBatch:
+    return _worker_scorer.score(batch)
+
+
+def open_dataset(path: str) -> ds.Dataset:
+    fmt = "csv" if Path(path).suffix.lower() == ".csv" else "parquet"
+    return ds.dataset(path, format=fmt)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Bulk-score historical encounters from Parquet/CSV.")
+    parser.add_argument("--input", required=True, help="Parquet/CSV file or directory")
+    parser.add_argument("--output", required=True, help="Output Parquet file")
+    parser.add_argument("--batch-size", type=int, default=65536)
+    parser.add_argument("--shap", type=int, nargs="?", const=5, default=0, metavar="K",
+                        help="Add top-K native SHAP contributions (default K=5)")
+    parser.add_argument("--text-column", default="encounter_description",
+                        help="Column fed to the NLP diagnosis model (skipped if absent)")
+    parser.add_argument("--no-nlp", action="store_true")
+    parser.add_argument("--workers", type=int, default=1, help="Score batches in N processes")
+    args = parser.parse_args()
+    # One-off job: no need for the API's hot-reload watcher thread
+    os.environ.setdefault("MODEL_POLL_INTERVAL_S", "0")
+
+    dataset = open_dataset(args.input)
+    schema_names = dataset.schema.names
+    id_columns = [c for c in DEFAULT_ID_COLUMNS if c in schema_names]
+    text_column = None if args.no_nlp or args.text_column not in schema_names else args.text_column
+
+    from api.registry import registry
+    encoder = registry.current().encoder
+    # Project only what scoring needs; ids and labels pass through untouched
+    columns = [c for c in schema_names if c in id_columns or c == text_column or encoder.uses_column(c)]
+
+    scorer_kwargs = {
+        "shap_top_k": args.shap,
+        "text_column": text_column,
+        "id_columns": id_columns,
+        # Split the cores between workers instead of every process using all of them
+        "num_threads": max(1, (os.cpu_count() or 1) // args.workers) if args.workers > 1 else 0,
+    }
+
+    start = time.perf_counter()
+    rows = 0
+    writer = None
+    batches = dataset.to_batches(columns=columns, batch_size=args.batch_size)
+
+    def write(result: pa.RecordBatch):
+        nonlocal writer, rows
+        if writer is None:
+            writer = pq.ParquetWriter(args.output, result.schema, compression="zstd")
+        writer.write_batch(result)
+        rows += result.num_rows
+
+    try:
+        if args.workers > 1:
+            with ProcessPoolExecutor(max_workers=args.workers, mp_context=mp.get_context("spawn"),
+                                     initializer=_init_worker, initargs=(scorer_kwargs,)) as pool:
+                # Bounded number of batches in flight keeps memory flat
+                pending = deque()
+                for batch in batches:
+                    pending.append(pool.submit(_score_in_worker, batch))
+                    if len(pending) >= 2 * args.workers:
+                        write(pending.popleft().result())
+                while pending:
+                    write(pending.popleft().result())
+        else:
+            scorer = BatchScorer(**scorer_kwargs)
+            for batch in batches:
+                write(scorer.score(batch))
+    finally:
+        if writer is not None:
+            writer.close()
+
+    elapsed = time.perf_counter() - start
+    print(f"Scored {rows:,} rows in {elapsed:.2f}s ({rows / elapsed:,.0f} rows/s) -> {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,169 @@
+"""
+Shared fixtures: small LightGBM models trained on synthetic rows in seconds,
+saved the way ml/train_model.py saves them, and the API loaded on top.
+"""
+import sys
+from pathlib import Path
+
+import lightgbm as lgb
+import numpy as np
+import pytest
+
+API_DIR = Path(__file__).parent.parent
+# api/ is imported as a package from readmission_api/, ml/ scripts import their siblings
+for path in (API_DIR, API_DIR / "ml"):
+    if str(path) not in sys.path:
+        sys.path.insert(0, str(path))
+
+GENDERS = ["M", "F"]
+RACES = ["white", "black", "asian", "hispanic", "native", "other"]
+FEATURES = ["GENDER", "RACE", "age"]
+CLASSES = ["ambulatory", "emergency", "inpatient"]
+ENCOUNTER_FEATURES = ["GENDER", "RACE", "age", "encounterclass", "total_cost"]
+
+
+def synthetic_rows(n: int, seed: int = 0):
+    """(X, y) laid out like the training matrix: GENDER / RACE category codes, age."""
+    rng = np.random.default_rng(seed)
+    X = np.column_stack([
+        rng.integers(0, len(GENDERS), n),
+        rng.integers(0, len(RACES), n),
+        rng.integers(18, 101, n),
+    ]).astype(np.float64)
+    logit = -2.5 + 0.03 * (X[:, 2] - 60) + 0.4 * (X[:, 1] == 1) - 0.3 * X[:, 0]
+    y = (rng.random(n) < 1 / (1 + np.exp(-logit))).astype(np.float64)
+    return X, y
+
+
+def encounter_table(n: int, seed: int = 0):
+    """
+    A features export (ids, demographics, encounter features, label) as a
+    pyarrow Table, five encounters per patient; total_cost drives the label.
+    """
+    import pyarrow as pa
+
+    rng = np.random.default_rng(seed)
+    patient = np.arange(n) // 5
+    genders = rng.integers(0, len(GENDERS), n // 5 + 1)[patient]
+    races = rng.integers(0, len(RACES), n // 5 + 1)[patient]
+    ages = rng.integers(18, 101, n // 5 + 1)[patient]
+    classes = rng.integers(0, len(CLASSES), n)
+    cost = rng.gamma(2.0, 500.0, n)
+    logit = -2.0 + 0.02 * (ages - 60) + 1.5 * (classes == 2) + 2.5 * (cost > 1500) - 0.3 * genders
+    y = (rng.random(n) < 1 / (1 + np.exp(-logit))).astype(np.int32)
+    return pa.table({
+        "encounter_id": [f"e{i:05d}" for i in range(n)],
+        "PATIENT": [f"p{i:04d}" for i in patient],
+        "GENDER": [GENDERS[i] for i in genders],
+        "RACE": [RACES[i] for i in races],
+        "age": pa.array(ages, pa.int32()),
+        "encounterclass": [CLASSES[i] for i in classes],
+        "total_cost": cost,
+        "readmitted_within_30d": y,
+    })
+
+
+def train_booster(X: np.ndarray, y: np.ndarray, feature_names: list, categorical: list = (),
+                  rounds: int = 30, **params) -> lgb.Booster:
+    params = {"objective": "binary", "verbose": -1, "num_threads": 1, "seed": 0,
+              "min_data_in_leaf": 5, "min_data_per_group": 5, "cat_smooth": 1, **params}
+    dataset = lgb.Dataset(X, y, feature_name=feature_names, categorical_feature=list(categorical),
+                          free_raw_data=False)
+    return lgb.train(params, dataset, num_boost_round=rounds)
+
+
+@pytest.fixture(scope="session")
+def trainer():
+    """train_booster, for tests that fit their own models."""
+    return train_booster
+
+
+@pytest.fixture(scope="session")
+def small_model_dir(tmp_path_factory) -> Path:
+    """A model directory as train_model.py writes it: native booster, pickle and feature spec."""
+    import joblib
+    from feature_spec import build_feature_spec, write_feature_spec
+    from serving_bundle import export_lightgbm_bundle
+
+    X, y = synthetic_rows(4000)
+    booster = train_booster(X, y, FEATURES, categorical=["GENDER", "RACE"], num_leaves=15)
+    categories = {"GENDER": GENDERS, "RACE": RACES}
+    booster.pandas_categorical = list(categories.values())
+    booster = lgb.Booster(model_str=booster.model_to_string())
+
+    model_dir = tmp_path_factory.mktemp("model")
+    joblib.dump(booster, model_dir / "readmission_model.pkl")
+    export_lightgbm_bundle(booster, model_dir)
+    spec = build_feature_spec(FEATURES, categories, {"GENDER": "string", "RACE": "string", "age": "int32"},
+                              "readmitted_within_30d")
+    write_feature_spec(spec, model_dir)
+    return model_dir
+
+
+@pytest.fixture(scope="session")
+def small_models(small_model_dir):
+    """The ModelSet the API builds from small_model_dir."""
+    from api.model_loader import load_model_set
+    return load_model_set(small_model_dir, "test")
+
+
+@pytest.fixture(scope="session")
+def encounter_model_dir(tmp_path_factory) -> Path:
+    """
+    A model trained on demographics plus encounter features (encounterclass,
+    total_cost), saved as train_model.py --risk-table-ages 18 100 --feature-index
+    saves it. Its features export is features.parquet alongside.
+    """
+    import pyarrow.parquet as pq
+    from feature_index import build_feature_index, write_feature_index
+    from feature_spec import build_feature_spec, write_feature_spec
+    from risk_table import build_risk_table, write_risk_table
+    from serving_bundle import export_lightgbm_bundle
+
+    table = encounter_table(4000)
+    categories = {"GENDER": GENDERS, "RACE": RACES, "encounterclass": CLASSES}
+    X = np.column_stack([
+        [categories[name].index(value) for value in table.column(name).to_pylist()] if name in categories
+        else table.column(name).to_numpy() for name in ENCOUNTER_FEATURES
+    ]).astype(np.float64)
+    booster = train_booster(X, table.column("readmitted_within_30d").to_numpy().astype(np.float64),
+                            ENCOUNTER_FEATURES, categorical=list(categories), num_leaves=15)
+    booster.pandas_categorical = list(categories.values())
+    booster = lgb.Booster(model_str=booster.model_to_string())
+
+    root = tmp_path_factory.mktemp("encounter_model")
+    pq.write_table(table, root / "features.parquet")
+    model_dir = root / "model"
+    model_dir.mkdir()
+    export_lightgbm_bundle(booster, model_dir)
+    spec = build_feature_spec(ENCOUNTER_FEATURES, categories, {name: str(table.schema.field(name).type)
+                                                               for name in ENCOUNTER_FEATURES},
+                              "readmitted_within_30d")
+    write_feature_spec(spec, model_dir)
+    write_risk_table(build_risk_table(booster, spec, (18, 100)), model_dir)
+    write_feature_index(build_feature_index(root / "features.parquet", spec, batch_size=1000), model_dir)
+    return model_dir
+
+
+@pytest.fixture(scope="session")
+def encounter_models(encounter_model_dir):
+    """The ModelSet the API builds from encounter_model_dir."""
+    from api.model_loader import load_model_set
+    return load_model_set(encounter_model_dir, "encounters")
+
+
+@pytest.fixture
+def serve(monkeypatch):
+    """serve(models): a TestClient for the API with `models` as the registry's active set."""
+    from fastapi.testclient import TestClient
+    from api.cache import result_cache
+    from api.main import app
+    from api.registry import registry
+
+    def start(models) -> TestClient:
+        monkeypatch.setattr(registry, "_current", models)
+        monkeypatch.setattr(registry, "poll_interval", 0)
+        result_cache.set_version(models.version)
+        return TestClient(app)
+
+    return start
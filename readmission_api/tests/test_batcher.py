@@ -0,0 +1,89 @@
+"""Micro-batching of concurrent /predict calls (api/batcher.py) and /predict_batch."""
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from api import config
+from api.batcher import MicroBatcher
+from api.predictor import predict_risk_batch
+
+
+def run_concurrently(func, items: list) -> list:
+    """func(item) for every item, all started together; results in item order."""
+    barrier = threading.Barrier(len(items))
+
+    def call(item):
+        barrier.wait()
+        return func(item)
+
+    with ThreadPoolExecutor(max_workers=len(items)) as pool:
+        return list(pool.map(call, items))
+
+
+def test_concurrent_submits_are_scored_together_in_order():
+    batches = []
+
+    def double(items):
+        batches.append(list(items))
+        return [item * 2 for item in items]
+
+    batcher = MicroBatcher(double, max_wait_ms=200, max_batch_size=64)
+    assert run_concurrently(batcher.submit, list(range(16))) == [item * 2 for item in range(16)]
+    assert len(batches) < 16 and sorted(sum(batches, [])) == list(range(16))
+
+
+def test_batches_stop_at_max_batch_size():
+    batches = []
+    batcher = MicroBatcher(lambda items: batches.append(len(items)) or list(items), max_wait_ms=200,
+                           max_batch_size=4)
+    assert run_concurrently(batcher.submit, list(range(12))) == list(range(12))
+    assert max(batches) <= 4 and sum(batches) == 12
+
+
+def test_batch_error_reaches_every_caller():
+    def fail(items):
+        raise RuntimeError(f"{len(items)} items")
+
+    batcher = MicroBatcher(fail, max_wait_ms=200)
+    results = run_concurrently(lambda item: pytest.raises(RuntimeError, batcher.submit, item), list(range(4)))
+    assert all("items" in str(error.value) for error in results)
+    # The worker survives a failed batch
+    batcher.batch_func = lambda items: items
+    assert batcher.submit(7) == 7
+
+
+def test_predict_batch_keeps_request_order(serve, small_models):
+    patients = [{"age": age, "gender": gender, "race": race}
+                for age, gender, race in [(80, "male", "black"), (20, "female", "white"), (55, "male", "asian"),
+                                          (80, "male", "black"), (33, "female", "other")]]
+    response = serve(small_models).post("/predict_batch", json={"patients": patients})
+    assert response.status_code == 200
+    body = response.json()
+    assert body["model_version"] == small_models.version
+    assert [r["readmission_risk"] for r in body["results"]] == predict_risk_batch(patients, small_models)
+    assert [r["readmission_risk"] for r in body["results"]] == \
+        [round(float(risk), 4) for risk in small_models.booster.predict(small_models.encoder.encode(patients))]
+    assert all(r["risk_factors"] and r["predicted_diagnoses"] == [] for r in body["results"])
+    assert serve(small_models).post("/predict_batch", json={"patients": []}).json()["results"] == []
+
+
+def test_predict_is_micro_batched(serve, small_models, monkeypatch):
+    import api.main as main
+
+    monkeypatch.setattr(config, "MICROBATCH_WAIT_MS", 100)
+    monkeypatch.setattr(main, "_risk_batcher", None)
+    batches = []
+    score = main.score_batch_with_version
+    monkeypatch.setattr(main, "score_batch_with_version", lambda items: batches.append(len(items)) or score(items))
+
+    client = serve(small_models)
+    patients = [{"age": 20 + 5 * i, "gender": "female" if i % 2 else "male", "race": "white"} for i in range(8)]
+    # A bad row is rejected before it joins a batch, so it can't fail the others
+    patients.append({"age": 40, "gender": "female", "race": "martian"})
+    responses = run_concurrently(lambda patient: client.post("/predict", json=patient), patients)
+
+    assert [r.status_code for r in responses] == [200] * 8 + [422]
+    assert [r.json()["readmission_risk"] for r in responses[:8]] == predict_risk_batch(patients[:8], small_models)
+    assert all(r.json()["model_version"] == small_models.version for r in responses[:8])
+    assert sum(batches) == 8 and len(batches) < 8
@@ -0,0 +1,97 @@
+"""The LRU + TTL result cache (api/cache.py)."""
+import pytest
+
+from api import cache
+from api.cache import ResultCache
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(cache.time, "monotonic", clock)
+    return clock
+
+
+def lookup(result_cache: ResultCache, keys: list, version: str = None) -> tuple:
+    """(results, positions computed): values are key * 10."""
+    computed = []
+
+    def compute(missing):
+        computed.extend(missing)
+        return [keys[pos] * 10 for pos in missing]
+
+    return result_cache.get_or_compute("risk", keys, compute, version), computed
+
+
+def test_only_misses_are_computed(clock):
+    result_cache = ResultCache(max_entries=100, ttl_seconds=60)
+    assert lookup(result_cache, [1, 2]) == ([10, 20], [0, 1])
+    assert lookup(result_cache, [3, 2, 1, 4]) == ([30, 20, 10, 40], [0, 3])
+    assert result_cache.stats()["namespaces"]["risk"] == {"hits": 2, "misses": 4}
+    # Namespaces don't share entries
+    assert result_cache.get_or_compute("shap", [1], lambda missing: ["top-k"]) == ["top-k"]
+
+
+def test_entries_expire_after_the_ttl(clock):
+    result_cache = ResultCache(max_entries=100, ttl_seconds=60)
+    lookup(result_cache, [1])
+    clock.now += 59
+    lookup(result_cache, [2])
+    assert lookup(result_cache, [1, 2])[1] == []
+    clock.now += 2
+    # 1 is 61 s old, 2 only 2 s
+    assert lookup(result_cache, [1, 2])[1] == [0]
+
+
+def test_least_recently_used_entries_are_evicted(clock):
+    result_cache = ResultCache(max_entries=3, ttl_seconds=60)
+    lookup(result_cache, [1, 2, 3])
+    lookup(result_cache, [1])  # 2 is now the least recently used
+    lookup(result_cache, [4])
+    assert result_cache.stats()["evictions"] == 1 and result_cache.stats()["entries"] == 3
+    assert lookup(result_cache, [1, 3, 4])[1] == []
+    assert lookup(result_cache, [2])[1] == [0]
+
+
+def test_new_model_version_invalidates_every_entry(clock):
+    result_cache = ResultCache(max_entries=100, ttl_seconds=60)
+    result_cache.set_version("v1")
+    lookup(result_cache, [1, 2])
+    result_cache.set_version("v1")
+    assert lookup(result_cache, [1, 2])[1] == []
+
+    result_cache.set_version("v2")
+    assert result_cache.stats()["entries"] == 0 and result_cache.stats()["invalidations"] == 1
+    assert lookup(result_cache, [1])[1] == [0]
+    # A request still scoring with v1 stores under v1: those entries can't answer v2 lookups
+    lookup(result_cache, [5], version="v1")
+    assert lookup(result_cache, [5])[1] == [0]
+
+
+def test_disabled_cache_always_computes(clock):
+    result_cache = ResultCache(max_entries=100, ttl_seconds=60, enabled=False)
+    lookup(result_cache, [1])
+    assert lookup(result_cache, [1]) == ([10], [0])
+    assert result_cache.stats()["entries"] == 0
+
+
+def test_registry_swap_clears_cached_risks(serve, small_models, encounter_models):
+    from api.cache import result_cache
+
+    client = serve(small_models)
+    patient = {"age": 64, "gender": "female", "race": "black"}
+    client.post("/predict", json=patient)
+    hits = result_cache.stats()["namespaces"]["risk"]["hits"]
+    client.post("/predict", json=patient)
+    assert result_cache.stats()["namespaces"]["risk"]["hits"] == hits + 1
+
+    serve(encounter_models)
+    assert result_cache.version == "encounters" and result_cache.stats()["entries"] == 0
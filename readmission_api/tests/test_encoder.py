@@ -0,0 +1,67 @@
+"""Request validation against the feature spec (api/encoder.py) and the 422s the API answers with."""
+import numpy as np
+import pytest
+
+from api.feature_spec import FeatureSpecError
+
+PATIENT = {"age": 64, "gender": "female", "race": "black"}
+
+
+def test_inputs_are_encoded_as_the_spec_says(small_models):
+    encoder = small_models.encoder
+    # Numbers are taken as given (ages outside the training range are still scored)
+    X = encoder.encode([PATIENT, {"age": 30, "gender": "male", "race": "white"},
+                        {"age": 150.0, "gender": "m", "race": "asian"}])
+    np.testing.assert_array_equal(X, [[1, 1, 64], [0, 0, 30], [0, 2, 150]])
+    with pytest.raises(FeatureSpecError, match="gender: unknown value 'M'"):
+        encoder.encode({**PATIENT, "gender": "M"})
+
+
+def test_unknown_category_is_rejected(small_models):
+    with pytest.raises(FeatureSpecError) as error:
+        small_models.encoder.encode({**PATIENT, "race": "martian"})
+    assert error.value.version == small_models.encoder.version
+    [detail] = error.value.errors
+    assert (detail["row"], detail["field"]) == (0, "race")
+    assert "unknown value 'martian'" in detail["msg"] and "'white'" in detail["msg"]
+
+    with pytest.raises(FeatureSpecError, match="gender: unknown value 'x'"):
+        small_models.encoder.encode({**PATIENT, "gender": "x"})
+
+
+@pytest.mark.parametrize("age, msg", [(None, "field required"), ("64", "expected a number, got '64'"),
+                                      (True, "expected a number, got True")])
+def test_missing_or_non_numeric_number_is_rejected(small_models, age, msg):
+    with pytest.raises(FeatureSpecError) as error:
+        small_models.encoder.encode({**PATIENT, "age": age})
+    assert error.value.errors == [{"row": 0, "field": "age", "msg": msg}]
+
+
+def test_every_bad_row_is_reported(small_models):
+    rows = [PATIENT, {**PATIENT, "race": "martian"}, PATIENT, {"gender": "female", "race": "other"}]
+    with pytest.raises(FeatureSpecError) as error:
+        small_models.encoder.validate(rows)
+    assert [(e["row"], e["field"]) for e in error.value.errors] == [(1, "race"), (3, "age")]
+
+
+def test_predict_answers_422_with_the_bad_field(serve, small_models):
+    client = serve(small_models)
+    response = client.post("/predict", json={**PATIENT, "race": "martian"})
+    assert response.status_code == 422
+    body = response.json()
+    assert body["feature_spec_version"] == small_models.encoder.version
+    assert [(e["row"], e["field"]) for e in body["detail"]] == [(0, "race")]
+    assert client.post("/predict", json=PATIENT).status_code == 200
+
+
+def test_predict_batch_answers_422_with_the_bad_rows(serve, small_models):
+    client = serve(small_models)
+    patients = [PATIENT, {**PATIENT, "gender": "unknown"}, PATIENT, {**PATIENT, "race": "martian"}]
+    response = client.post("/predict_batch", json={"patients": patients})
+    assert response.status_code == 422
+    assert [(e["row"], e["field"]) for e in response.json()["detail"]] == [(1, "gender"), (3, "race")]
+
+    # Type errors are caught by the request schema first, in FastAPI's own format
+    response = client.post("/predict_batch", json={"patients": [PATIENT, {**PATIENT, "age": "old"}]})
+    assert response.status_code == 422
+    assert response.json()["detail"][0]["loc"] == ["body", "patients", 1, "age"]
@@ -0,0 +1,42 @@
+"""LightGBM native contributions (EXPLANATION_BACKEND=native_contrib) against the shap explainer they replace."""
+import itertools
+
+import numpy as np
+import pytest
+
+from api.explainer import native_contributions, top_contributions
+
+shap = pytest.importorskip("shap")
+
+
+@pytest.fixture(scope="module")
+def grid_X(small_models):
+    """The whole Streamlit input grid, encoded."""
+    grid = [{"age": age, "gender": gender, "race": race}
+            for age, gender, race in itertools.product(range(18, 101), ["male", "female"],
+                                                       small_models.encoder.known_values("RACE"))]
+    return small_models.encoder.encode(grid)
+
+
+def test_native_contributions_match_shap(small_models, grid_X):
+    reference = shap.TreeExplainer(small_models.booster)(grid_X.astype(np.float64)).values
+    native = native_contributions(grid_X, small_models)
+    assert native.shape == reference.shape == (len(grid_X), small_models.encoder.n_features)
+    np.testing.assert_allclose(native, reference, rtol=0, atol=1e-9)
+
+
+def test_contributions_sum_to_raw_score(small_models, grid_X):
+    contribs = small_models.booster.predict(grid_X, pred_contrib=True)
+    np.testing.assert_allclose(contribs.sum(axis=1), small_models.booster.predict(grid_X, raw_score=True),
+                               rtol=0, atol=1e-9)
+
+
+def test_top_contributions_match_sorted_dict(small_models, grid_X):
+    """argpartition top-k picks the same features, in the same order, as sorting the full dict did."""
+    names = small_models.encoder.feature_names
+    contribs = native_contributions(grid_X, small_models)
+    fast = top_contributions(contribs, names, top_k=2)
+    for row, result in zip(contribs, fast):
+        legacy = dict(sorted(zip(names, row), key=lambda item: abs(item[1]), reverse=True)[:2])
+        assert [abs(v) for v in result.values()] == [abs(v) for v in legacy.values()]
+        assert list(result.values()) == list(legacy.values())
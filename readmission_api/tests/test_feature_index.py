@@ -0,0 +1,107 @@
+"""The encounter feature index: ml/feature_index.py build, api/feature_index.py lookup, the by-ID endpoints."""
+import numpy as np
+import pyarrow.parquet as pq
+import pytest
+
+from api.feature_index import load_feature_index
+from api.predictor import predict_encounters, predict_patients
+
+
+@pytest.fixture(scope="module")
+def export(encounter_model_dir):
+    """The features export the index was built from, as plain Python rows by encounter ID."""
+    rows = pq.read_table(encounter_model_dir.parent / "features.parquet").to_pylist()
+    return {row["encounter_id"]: row for row in rows}
+
+
+def encoded(models, rows: list) -> np.ndarray:
+    """rows encoded by hand from the feature spec's categories, every feature filled in."""
+    encoder = models.encoder
+    return np.array([[encoder.known_values(name).index(row[name]) if encoder.known_values(name) else row[name]
+                      for name in encoder.feature_names] for row in rows], dtype=np.float32)
+
+
+def booster_risk(models, rows: list) -> list:
+    return [round(float(risk), 4) for risk in models.booster.predict(encoded(models, rows))]
+
+
+def test_index_round_trip(encounter_model_dir, encounter_models, export):
+    index = load_feature_index(encounter_model_dir)
+    index.check(encounter_models.encoder)
+    assert len(index) == len(export) and index.config["patients"] == len({r["PATIENT"] for r in export.values()})
+
+    ids = ["e00042", "e03999", "nope", "e00000", "e" + "0" * 40]
+    rows = index.encounter_rows(ids)
+    assert (rows[[2, 4]] == -1).all() and (rows[[0, 1, 3]] >= 0).all()
+    hit = rows[[0, 1, 3]]
+    expected = encoded(encounter_models, [export[i] for i in ("e00042", "e03999", "e00000")])
+    np.testing.assert_array_equal(index.rows(hit), expected)
+    assert index.encounter_id(hit) == ["e00042", "e03999", "e00000"]
+    assert index.patient_id(hit) == ["p0008", "p0799", "p0000"]
+
+    p3, unknown, p0 = index.patient_rows_of(["p0003", "p9999", "p0000"])
+    assert index.encounter_id(p3) == [f"e{i:05d}" for i in range(15, 20)]
+    assert index.encounter_id(p0) == [f"e{i:05d}" for i in range(5)]
+    assert len(unknown) == 0
+
+
+def test_index_built_for_another_spec_is_rejected(encounter_model_dir, small_models):
+    with pytest.raises(ValueError, match="feature spec"):
+        load_feature_index(encounter_model_dir).check(small_models.encoder)
+
+
+def test_encounter_risks_match_the_booster(encounter_models, export):
+    """Index rows carry encounter features: never the risk table's demographic cell."""
+    ids = [f"e{i:05d}" for i in range(0, 4000, 37)]
+    results = predict_encounters(ids, encounter_models)
+    assert [r["readmission_risk"] for r in results] == booster_risk(encounter_models, [export[i] for i in ids])
+    assert [r["patient_id"] for r in results] == [export[i]["PATIENT"] for i in ids]
+
+    # Same patient, same demographics, different encounters: different risks
+    by_patient = predict_patients(["p0000"], encounter_models)[0]
+    risks = [e["readmission_risk"] for e in by_patient["encounters"]]
+    assert risks == booster_risk(encounter_models, [export[f"e{i:05d}"] for i in range(5)])
+    assert len(set(risks)) > 1 and by_patient["max_readmission_risk"] == max(risks)
+
+
+def test_predict_by_encounter(serve, encounter_models, export):
+    client = serve(encounter_models)
+    response = client.get("/predict_by_encounter/e00123")
+    assert response.status_code == 200
+    assert response.json() == {"encounter_id": "e00123", "patient_id": "p0024", "model_version": "encounters",
+                               "readmission_risk": booster_risk(encounter_models, [export["e00123"]])[0]}
+    assert client.get("/predict_by_encounter/e99999").status_code == 404
+
+    ids = ["e00007", "e99999", "e02500"]
+    response = client.post("/predict_by_encounter", json={"encounter_ids": ids})
+    assert response.status_code == 200
+    results = response.json()["results"]
+    assert [r["encounter_id"] for r in results] == ids
+    assert results[1] == {"encounter_id": "e99999", "patient_id": None, "readmission_risk": None}
+    assert [results[0]["readmission_risk"], results[2]["readmission_risk"]] == \
+        booster_risk(encounter_models, [export["e00007"], export["e02500"]])
+
+
+def test_predict_by_patient(serve, encounter_models, export):
+    client = serve(encounter_models)
+    response = client.get("/predict_by_patient/p0010")
+    assert response.status_code == 200
+    body = response.json()
+    expected = booster_risk(encounter_models, [export[f"e{i:05d}"] for i in range(50, 55)])
+    assert [e["readmission_risk"] for e in body["encounters"]] == expected
+    assert body["max_readmission_risk"] == max(expected) and body["model_version"] == "encounters"
+    assert client.get("/predict_by_patient/p9999").status_code == 404
+
+    response = client.post("/predict_by_patient", json={"patient_ids": ["p0011", "p9999", "p0010"]})
+    assert response.status_code == 200
+    results = response.json()["results"]
+    assert [r["patient_id"] for r in results] == ["p0011", "p9999", "p0010"]
+    assert results[1] == {"patient_id": "p9999", "encounters": [], "max_readmission_risk": None}
+    assert [e["encounter_id"] for e in results[0]["encounters"]] == [f"e{i:05d}" for i in range(55, 60)]
+    assert [e["readmission_risk"] for e in results[2]["encounters"]] == expected
+
+
+def test_models_without_an_index_answer_503(serve, small_models):
+    client = serve(small_models)
+    assert client.get("/predict_by_encounter/e00001").status_code == 503
+    assert client.post("/predict_by_patient", json={"patient_ids": ["p0001"]}).status_code == 503
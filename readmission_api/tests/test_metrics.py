@@ -0,0 +1,74 @@
+"""Stage instrumentation (api/metrics.py): histograms, /metrics and the Server-Timing header."""
+import contextvars
+import re
+import sys
+import threading
+
+from api import config, metrics
+from api.metrics import BUCKETS, Registry, record_stage, server_timing
+
+PATIENT = {"age": 64, "gender": "female", "race": "black"}
+
+
+def test_histogram_buckets_are_cumulative():
+    registry = Registry()
+    for seconds in (0.00005, 0.003, 0.003, 7.0, 60.0):
+        registry.observe("stage_seconds", "stage", "encode", seconds)
+    registry.inc("calls_total", "start", "cold")
+    text = registry.render()
+    assert "# TYPE calls_total counter" in text and 'calls_total{start="cold"} 1' in text
+    assert f'stage_seconds_bucket{{stage="encode",le="{BUCKETS[0]}"}} 1' in text
+    assert 'stage_seconds_bucket{stage="encode",le="0.0025"} 1' in text
+    assert 'stage_seconds_bucket{stage="encode",le="0.005"} 3' in text
+    assert 'stage_seconds_bucket{stage="encode",le="10.0"} 4' in text
+    assert 'stage_seconds_bucket{stage="encode",le="+Inf"} 5' in text
+    assert 'stage_seconds_count{stage="encode"} 5' in text
+
+
+def test_concurrent_stages_add_up_in_the_request_breakdown():
+    """Stage threads share their request's timings dict (as /predict_combined's stage pool does)."""
+    timings = {}
+    token = metrics._request_timings.set(timings)
+    try:
+        context = contextvars.copy_context()
+    finally:
+        metrics._request_timings.reset(token)
+
+    def stage():
+        for _ in range(10000):
+            record_stage("shap", 1.0)
+
+    # Switch threads as often as possible, so an unlocked read-modify-write loses updates
+    interval = sys.getswitchinterval()
+    sys.setswitchinterval(1e-6)
+    try:
+        # One context per thread, all pointing at the same dict
+        threads = [threading.Thread(target=context.copy().run, args=(stage,)) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+    finally:
+        sys.setswitchinterval(interval)
+    assert timings == {"shap": 80000.0}
+    assert server_timing(timings) == b"shap;dur=80000000.000"
+
+
+def test_metrics_and_server_timing(serve, small_models):
+    client = serve(small_models)
+    response = client.post("/predict", json=PATIENT)
+    assert response.status_code == 200
+    stages = dict(re.findall(r"(\w+);dur=([\d.]+)", response.headers["server-timing"]))
+    assert {"encode", "serialize", "total"} <= set(stages)
+    assert float(stages["total"]) >= float(stages["encode"])
+
+    text = client.get("/metrics").text
+    assert re.search(r'readmission_stage_duration_seconds_count\{stage="encode"\} [1-9]', text)
+    assert re.search(r'readmission_request_duration_seconds_count\{route="/predict"\} [1-9]', text)
+    assert 'readmission_invocations_total{start="warm"}' in text
+
+
+def test_server_timing_header_can_be_disabled(serve, small_models, monkeypatch):
+    monkeypatch.setattr(config, "TIMING_HEADER", False)
+    response = serve(small_models).post("/predict", json=PATIENT)
+    assert response.status_code == 200 and "server-timing" not in response.headers
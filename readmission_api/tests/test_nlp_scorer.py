@@ -0,0 +1,75 @@
+"""NlpScorer (the NumPy diagnosis scorer) against the sklearn Pipeline it was exported from."""
+from argparse import Namespace
+
+import numpy as np
+import pytest
+from sklearn.feature_extraction.text import TfidfVectorizer
+from sklearn.naive_bayes import MultinomialNB
+from sklearn.pipeline import Pipeline
+
+from api.bundle import load_nlp_bundle
+from api.nlp_scorer import NlpScorer
+from serving_bundle import export_nlp_bundle
+from train_nlp_diagnosis import make_pipeline
+
+COMPLAINTS = {
+    "Hypertension": ["high blood pressure headache", "elevated blood pressure reading", "pressure in head dizziness"],
+    "Diabetes": ["high blood sugar thirst", "frequent urination and thirst", "sugar level elevated fatigue"],
+    "Asthma": ["shortness of breath wheezing", "wheezing at night cough", "chest tightness breath"],
+    "Fracture": ["fell and hurt wrist", "arm pain after fall swelling", "ankle swelling cannot walk"],
+}
+
+TEXTS = [
+    "High blood pressure and a headache",
+    "wheezing, wheezing, WHEEZING",            # repeated term, case folding
+    "thirst thirst sugar breath pain",          # terms from several classes
+    "the and of it",                            # stop words only: no terms, priors alone
+    "zebra xylophone quantum",                  # out of vocabulary
+    "",
+    "blood-pressure: 180/110 after the fall",   # punctuation and digits in the token pattern
+]
+
+
+def training_texts(seed: int = 0):
+    rng = np.random.default_rng(seed)
+    texts, labels = [], []
+    for label, phrases in COMPLAINTS.items():
+        for _ in range(40):
+            picked = rng.choice(phrases, size=rng.integers(1, 3), replace=False)
+            texts.append(" ".join(picked))
+            labels.append(label)
+    return texts, labels
+
+
+def scorer_for(pipeline: Pipeline, tmp_path) -> NlpScorer:
+    pipeline.fit(*training_texts())
+    export_nlp_bundle(pipeline, tmp_path)
+    return NlpScorer(load_nlp_bundle(tmp_path))
+
+
+def test_matches_training_pipeline(tmp_path):
+    """The pipeline train_nlp_diagnosis.py fits: bigrams, English stop words, l2 norm."""
+    pipeline = make_pipeline(Namespace(max_features=1000, alpha=1.0))
+    scorer = scorer_for(pipeline, tmp_path)
+    assert list(scorer.classes_) == list(pipeline.classes_)
+    np.testing.assert_allclose(scorer.predict_proba(TEXTS), pipeline.predict_proba(TEXTS), rtol=0, atol=1e-9)
+
+
+@pytest.mark.parametrize("options", [
+    {"norm": "l1"},
+    {"norm": None, "sublinear_tf": True},
+    {"use_idf": False, "ngram_range": (1, 1)},
+    {"lowercase": False, "stop_words": None, "max_features": 10},
+])
+def test_matches_vectorizer_options(tmp_path, options):
+    pipeline = Pipeline([("tfidf", TfidfVectorizer(**options)), ("clf", MultinomialNB(alpha=0.5))])
+    scorer = scorer_for(pipeline, tmp_path)
+    np.testing.assert_allclose(scorer.predict_proba(TEXTS), pipeline.predict_proba(TEXTS), rtol=0, atol=1e-9)
+
+
+def test_texts_without_terms_score_the_priors(tmp_path):
+    pipeline = make_pipeline(Namespace(max_features=1000, alpha=1.0))
+    scorer = scorer_for(pipeline, tmp_path)
+    priors = np.exp(pipeline.named_steps["clf"].class_log_prior_)
+    np.testing.assert_allclose(scorer.predict_proba(["the and of it", "zebra"]), [priors, priors],
+                               rtol=0, atol=1e-12)
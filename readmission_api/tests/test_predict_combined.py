@@ -0,0 +1,71 @@
+"""/predict_combined's concurrent stages and their timeouts."""
+import time
+
+import pytest
+
+from api import config
+
+PATIENT = {"age": 64, "gender": "female", "race": "black", "chief_complaint": "chest pain"}
+DIAGNOSES = [{"diagnosis": "Hypertension", "probability": 0.6}]
+
+
+@pytest.fixture
+def stages(monkeypatch):
+    """main's SHAP and NLP stages replaced by ones sleeping stages.delay[name] seconds."""
+    import api.main as main
+
+    class Stages:
+        delay = {"shap": 0.0, "nlp": 0.0}
+
+        def explain(self, data, models):
+            time.sleep(self.delay["shap"])
+            return {"age": 0.2}
+
+        def diagnose(self, complaint, top_k, models):
+            time.sleep(self.delay["nlp"])
+            return DIAGNOSES
+
+    fake = Stages()
+    monkeypatch.setattr(main, "_explainer", fake.explain)
+    monkeypatch.setattr(main, "_nlp_predictor", fake.diagnose)
+    return fake
+
+
+def test_all_stages_complete(serve, small_models, stages):
+    response = serve(small_models).post("/predict_combined", json=PATIENT)
+    assert response.status_code == 200
+    body = response.json()
+    assert body["timed_out_stages"] == [] and body["model_version"] == small_models.version
+    assert body["risk_factors"] == {"age": 0.2} and body["predicted_diagnoses"] == DIAGNOSES
+    expected = round(float(small_models.booster.predict(small_models.encoder.encode(PATIENT))[0]), 4)
+    assert body["readmission_risk"] == expected
+
+
+def test_stages_run_concurrently(serve, small_models, stages):
+    stages.delay = {"shap": 0.4, "nlp": 0.4}
+    client = serve(small_models)
+    start = time.perf_counter()
+    assert client.post("/predict_combined", json=PATIENT).json()["timed_out_stages"] == []
+    assert time.perf_counter() - start < 0.75
+
+
+@pytest.mark.parametrize("stage, setting", [("shap", "STAGE_TIMEOUT_SHAP_S"), ("nlp", "STAGE_TIMEOUT_NLP_S")])
+def test_timed_out_stage_is_left_out(serve, small_models, stages, monkeypatch, stage, setting):
+    monkeypatch.setattr(config, setting, 0.05)
+    stages.delay[stage] = 0.5
+    client = serve(small_models)
+    start = time.perf_counter()
+    response = client.post("/predict_combined", json=PATIENT)
+    assert time.perf_counter() - start < 0.45
+    body = response.json()
+    assert response.status_code == 200 and body["timed_out_stages"] == [stage]
+    assert body["readmission_risk"] is not None
+    assert (body["risk_factors"] == {}) == (stage == "shap")
+    assert (body["predicted_diagnoses"] == []) == (stage == "nlp")
+
+
+def test_no_complaint_skips_nlp(serve, small_models, stages, monkeypatch):
+    monkeypatch.setattr(config, "STAGE_TIMEOUT_NLP_S", 0.01)
+    stages.delay["nlp"] = 0.5
+    body = serve(small_models).post("/predict_combined", json={**PATIENT, "chief_complaint": "  "}).json()
+    assert body["timed_out_stages"] == [] and body["predicted_diagnoses"] == []
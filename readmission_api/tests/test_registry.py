@@ -0,0 +1,104 @@
+"""Hot reload (api/registry.py): versioned directories and S3 as model sources."""
+import shutil
+
+import pytest
+
+from api.cache import result_cache
+from api.registry import LATEST, ModelRegistry, S3Source, VersionedDirSource
+
+BUCKET = "readmission-models"
+
+
+def publish(root, version: str, model_dir):
+    """Copy a model directory in as <root>/<version>/ and point LATEST at it."""
+    shutil.copytree(model_dir, root / version)
+    (root / LATEST).write_text(version)
+
+
+def test_bad_version_is_rejected_and_a_good_one_swaps_in(tmp_path, small_model_dir, encounter_model_dir):
+    publish(tmp_path, "v1", small_model_dir)
+    registry = ModelRegistry(VersionedDirSource(tmp_path), poll_interval=0)
+    serving = registry.current()
+    assert serving.version == "v1" and result_cache.version == "v1"
+    assert not registry.check()
+
+    # A broken booster: the load fails, v1 keeps serving
+    publish(tmp_path, "v2", small_model_dir)
+    (tmp_path / "v2" / "readmission_model.txt").write_text("not a model")
+    assert not registry.check()
+    assert registry.current() is serving
+    assert registry.failed_reloads == 1 and registry.last_error.startswith("v2:")
+    # ...and it isn't retried every poll
+    assert not registry.check() and registry.failed_reloads == 1
+
+    # A feature spec that disagrees with its booster is rejected too
+    publish(tmp_path, "v3", small_model_dir)
+    shutil.copy(encounter_model_dir / "feature_spec.json", tmp_path / "v3" / "feature_spec.json")
+    assert not registry.check()
+    assert registry.current() is serving and registry.failed_reloads == 2
+
+    publish(tmp_path, "v4", encounter_model_dir)
+    assert registry.check()
+    models = registry.current()
+    assert models.version == "v4" and models.feature_index is not None and result_cache.version == "v4"
+    assert registry.reloads == 1 and registry.stats()["model_version"] == "v4"
+    # A request still holding the old set keeps a consistent one
+    assert serving.version == "v1" and serving.encoder.feature_names == ["GENDER", "RACE", "age"]
+
+
+def test_without_latest_the_greatest_version_serves(tmp_path, small_model_dir):
+    shutil.copytree(small_model_dir, tmp_path / "20250101")
+    shutil.copytree(small_model_dir, tmp_path / "20250301")
+    assert VersionedDirSource(tmp_path).latest() == "20250301"
+
+
+@pytest.fixture
+def s3(monkeypatch):
+    moto = pytest.importorskip("moto")
+    import boto3
+
+    for name, value in {"AWS_ACCESS_KEY_ID": "testing", "AWS_SECRET_ACCESS_KEY": "testing",
+                        "AWS_SESSION_TOKEN": "testing", "AWS_DEFAULT_REGION": "us-east-1"}.items():
+        monkeypatch.setenv(name, value)
+    monkeypatch.delenv("S3_ENDPOINT_URL", raising=False)
+    with moto.mock_aws():
+        client = boto3.client("s3", region_name="us-east-1")
+        client.create_bucket(Bucket=BUCKET)
+        yield client
+
+
+def upload(s3, prefix: str, version: str, model_dir, latest: bool = True):
+    """A version as data_ingestion/s3_sync.py publishes it: files under <prefix>/<version>/, then LATEST."""
+    for path in sorted(model_dir.rglob("*")):
+        if path.is_file():
+            s3.upload_file(str(path), BUCKET, f"{prefix}/{version}/{path.relative_to(model_dir).as_posix()}")
+    if latest:
+        s3.put_object(Bucket=BUCKET, Key=f"{prefix}/{LATEST}", Body=version.encode())
+
+
+def test_s3_versions_are_downloaded_and_swapped_in(s3, tmp_path, small_model_dir, encounter_model_dir):
+    upload(s3, "models", "v1", small_model_dir, latest=False)
+    source = S3Source(f"s3://{BUCKET}/models", tmp_path / "downloads")
+    # No LATEST yet: the greatest version prefix
+    assert source.latest() == "v1"
+
+    registry = ModelRegistry(source, poll_interval=0)
+    assert registry.current().version == "v1"
+    assert sorted(path.name for path in (tmp_path / "downloads" / "v1").iterdir()) == \
+        sorted(path.name for path in small_model_dir.iterdir())
+
+    upload(s3, "models", "v2", encounter_model_dir)
+    assert source.latest() == "v2"
+    assert registry.check()
+    models = registry.current()
+    assert models.version == "v2" and len(models.feature_index) == 4000
+    assert models.model_dir == tmp_path / "downloads" / "v2"
+    assert not list((tmp_path / "downloads").glob(".*.partial"))
+
+
+def test_s3_source_without_versions(s3, tmp_path):
+    source = S3Source(f"s3://{BUCKET}/models", tmp_path)
+    with pytest.raises(FileNotFoundError):
+        source.latest()
+    with pytest.raises(FileNotFoundError):
+        source.fetch("v1")
@@ -0,0 +1,78 @@
+"""The precomputed risk table (api/risk_table.py) against the booster it was built from."""
+import copy
+import itertools
+
+import numpy as np
+import pytest
+
+from api.predictor import predict_encoded_batch, predict_risk_batch
+from api.risk_table import RiskTable, load_risk_table
+
+
+@pytest.fixture(scope="module")
+def grid(encounter_models):
+    """Every request the table covers."""
+    return [{"age": age, "gender": gender, "race": race}
+            for age, gender, race in itertools.product(range(18, 101), ["male", "female"],
+                                                       encounter_models.encoder.known_values("RACE"))]
+
+
+def without_table(models):
+    models = copy.copy(models)
+    models.risk_table = None
+    return models
+
+
+def test_table_is_loaded_and_checked(encounter_models):
+    table = encounter_models.risk_table
+    assert table is not None
+    table.check(encounter_models.booster, encounter_models.encoder, sample=0)
+
+
+def test_check_rejects_a_table_the_model_disagrees_with(encounter_model_dir, encounter_models):
+    table = load_risk_table(encounter_model_dir)
+    tampered = RiskTable(table.risk.copy(), table.top_index, table.top_value, table.config)
+    tampered.risk[17] += 0.01
+    with pytest.raises(ValueError, match="cell 17"):
+        tampered.check(encounter_models.booster, encounter_models.encoder, sample=0)
+
+    swapped = RiskTable(table.risk, table.top_index, -table.top_value, table.config)
+    with pytest.raises(ValueError, match="SHAP"):
+        swapped.check(encounter_models.booster, encounter_models.encoder, sample=0)
+
+
+def test_check_rejects_another_feature_spec(encounter_models, small_models):
+    with pytest.raises(ValueError, match="feature spec"):
+        encounter_models.risk_table.check(small_models.booster, small_models.encoder)
+
+
+def test_table_answers_match_the_booster(encounter_models, grid):
+    X = encounter_models.encoder.encode(grid)
+    assert (encounter_models.risk_table.cells(X, encounter_models.encoder.blank) >= 0).all()
+    expected = [round(float(risk), 4) for risk in encounter_models.booster.predict(X)]
+    assert predict_risk_batch(grid, encounter_models) == expected
+    assert predict_risk_batch(grid, without_table(encounter_models)) == expected
+
+
+def test_rows_outside_the_grid_fall_back_to_the_booster(encounter_models):
+    inputs = [{"age": 17, "gender": "male", "race": "white"}, {"age": 101, "gender": "female", "race": "asian"},
+              {"age": 40.5, "gender": "male", "race": "black"}, {"age": 40, "gender": "male", "race": "black"}]
+    X = encounter_models.encoder.encode(inputs)
+    cells = encounter_models.risk_table.cells(X, encounter_models.encoder.blank)
+    assert (cells[:3] == -1).all() and cells[3] >= 0
+    assert not encounter_models.in_risk_table(inputs[0]) and encounter_models.in_risk_table(inputs[3])
+    expected = [round(float(risk), 4) for risk in encounter_models.booster.predict(X)]
+    assert predict_risk_batch(inputs, encounter_models) == expected
+
+
+def test_rows_with_other_features_set_are_not_table_cells(encounter_models, grid):
+    """A row is a cell only if every non-axis column is the encoder's blank (the table was built on it)."""
+    encoder = encounter_models.encoder
+    X = encoder.encode(grid[:50])
+    X[:25, encoder.feature_names.index("total_cost")] = 2500.0
+    X[25:, encoder.feature_names.index("encounterclass")] = encoder.known_values("encounterclass").index("inpatient")
+    assert (encounter_models.risk_table.cells(X, encoder.blank) == -1).all()
+    expected = [round(float(risk), 4) for risk in encounter_models.booster.predict(X)]
+    assert predict_encoded_batch(X, encounter_models) == expected
+    # ...and they really differ from the demographic cell's risk
+    assert predict_encoded_batch(X, encounter_models) != predict_risk_batch(grid[:50], encounter_models)
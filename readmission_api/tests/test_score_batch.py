@@ -0,0 +1,77 @@
+"""The offline bulk scoring CLI (score_batch.py) against the booster."""
+import sys
+
+import numpy as np
+import pyarrow.csv as pa_csv
+import pyarrow.parquet as pq
+import pytest
+
+import score_batch
+
+
+@pytest.fixture
+def run(encounter_models, monkeypatch):
+    """run(*args): score_batch.main() with encounter_models as the registry's model set; the output table."""
+    from api.registry import registry
+
+    monkeypatch.setattr(registry, "_current", encounter_models)
+    monkeypatch.setattr(registry, "poll_interval", 0)
+
+    def main(input_path, output_path, *args):
+        monkeypatch.setattr(sys, "argv", ["score_batch.py", "--input", str(input_path), "--output", str(output_path),
+                                          "--batch-size", "500", *args])
+        score_batch.main()
+        return pq.read_table(output_path)
+
+    return main
+
+
+@pytest.fixture(scope="module")
+def export(encounter_model_dir):
+    return pq.read_table(encounter_model_dir.parent / "features.parquet")
+
+
+def expected_risk(models, table, missing: tuple = ()) -> np.ndarray:
+    """Booster.predict over the rows encoded by hand, `missing` columns as NaN."""
+    columns = []
+    for name in models.encoder.feature_names:
+        if name in missing:
+            columns.append(np.full(table.num_rows, np.nan))
+        elif models.encoder.known_values(name):
+            categories = models.encoder.known_values(name)
+            columns.append([categories.index(value) for value in table.column(name).to_pylist()])
+        else:
+            columns.append(table.column(name).to_numpy())
+    return models.booster.predict(np.column_stack(columns).astype(np.float32))
+
+
+def test_scores_match_the_booster(run, encounter_models, export, encounter_model_dir, tmp_path):
+    scores = run(encounter_model_dir.parent / "features.parquet", tmp_path / "scores.parquet", "--shap", "2")
+    assert scores.column_names == ["encounter_id", "PATIENT", "readmission_risk", "shap_top_features",
+                                   "shap_top_values"]
+    assert scores.column("encounter_id").to_pylist() == export.column("encounter_id").to_pylist()
+    np.testing.assert_allclose(scores.column("readmission_risk").to_numpy(), expected_risk(encounter_models, export),
+                               rtol=0, atol=1e-12)
+    top = scores.column("shap_top_features").to_pylist()
+    assert all(len(features) == 2 for features in top)
+    assert any(feature.startswith("encounterclass_") for features in top for feature in features)
+
+
+def test_csv_input(run, encounter_models, export, tmp_path):
+    pa_csv.write_csv(export.slice(0, 700), tmp_path / "features.csv")
+    scores = run(tmp_path / "features.csv", tmp_path / "scores.parquet", "--no-nlp")
+    np.testing.assert_allclose(scores.column("readmission_risk").to_numpy(),
+                               expected_risk(encounter_models, export.slice(0, 700)), rtol=0, atol=1e-12)
+
+
+def test_missing_categorical_column_is_missing_not_code_0(run, encounter_models, export, tmp_path):
+    pq.write_table(export.drop_columns(["encounterclass"]), tmp_path / "features.parquet")
+    scores = run(tmp_path / "features.parquet", tmp_path / "scores.parquet")
+    risk = scores.column("readmission_risk").to_numpy()
+    np.testing.assert_allclose(risk, expected_risk(encounter_models, export, missing=("encounterclass",)),
+                               rtol=0, atol=1e-12)
+    # Code 0 is "ambulatory", a real category with its own risk
+    code_0 = expected_risk(encounter_models, export.set_column(
+        export.schema.get_field_index("encounterclass"), "encounterclass",
+        [["ambulatory"] * export.num_rows]))
+    assert not np.allclose(risk, code_0)
@@ -0,0 +1,99 @@
+"""ml/train_model.py's streamed, cached Datasets against an in-memory build of the same splits."""
+import argparse
+import os
+
+import lightgbm as lgb
+import numpy as np
+import pyarrow.parquet as pq
+import pytest
+
+mlflow = pytest.importorskip("mlflow")
+import train_model  # noqa: E402
+from arrow_features import BatchEncoder  # noqa: E402
+from stage_log import StageLog  # noqa: E402
+from train_model import build_datasets, cache_key, dataset_params, load_datasets, open_matrix, train_params  # noqa: E402
+
+
+@pytest.fixture
+def args(encounter_model_dir):
+    """train_model.py's flags over the encounter features export, streamed 700 rows at a time."""
+    parser = argparse.ArgumentParser()
+    train_model.add_data_args(parser)
+    args = parser.parse_args(["--input", str(encounter_model_dir.parent / "features.parquet"),
+                              "--batch-size", "700", "--num-boost-round", "25"])
+    args.learning_rate, args.num_leaves, args.num_threads = 0.1, 15, 1
+    return args
+
+
+@pytest.fixture(autouse=True)
+def tracking(tmp_path, monkeypatch):
+    """MLflow runs go to tmp_path."""
+    monkeypatch.setenv("MLFLOW_ALLOW_FILE_STORE", "true")
+    mlflow.set_tracking_uri(f"file:{tmp_path / 'mlruns'}")
+
+
+def build(args, cache_dir, expected_cache: str) -> tuple:
+    """build_datasets in its own MLflow run, checking the dataset_cache param it logs."""
+    with mlflow.start_run() as run:
+        datasets = build_datasets(args, cache_dir, StageLog())
+    assert mlflow.get_run(run.info.run_id).data.params["dataset_cache"] == expected_cache
+    return datasets
+
+
+def train(args, meta, train_set) -> lgb.Booster:
+    return lgb.train(train_params(args, meta), train_set, num_boost_round=args.num_boost_round)
+
+
+def test_cached_datasets_are_reused(args, tmp_path, monkeypatch):
+    cache_dir = tmp_path / "cache" / cache_key(args)
+    train_set, _, meta = build(args, cache_dir, "miss")
+    assert sorted(path.name for path in cache_dir.iterdir()) == \
+        ["meta.json", "test_X.f32", "test_y.npy", "train.bin", "train_y.npy", "valid.bin", "valid_y.npy"]
+    built = train(args, meta, train_set)
+
+    def no_rescan(*args):
+        raise AssertionError("the input was scanned again")
+
+    monkeypatch.setattr(train_model, "spill_splits", no_rescan)
+    cached_train, cached_valid, cached_meta = build(args, cache_dir, "hit")
+    assert cached_meta == meta
+    assert (cached_train.num_data(), cached_valid.num_data()) == (meta["rows"]["train"], meta["rows"]["valid"])
+    # A model trained on the cached binary Dataset is the one the fresh build gives
+    X_test = open_matrix(cache_dir, "test", meta)
+    np.testing.assert_array_equal(train(args, meta, cached_train).predict(X_test), built.predict(X_test))
+    # tune_model.py's trial workers load it the same way
+    loaded, _ = load_datasets(cache_dir, dataset_params(args))
+    assert loaded.num_data() == meta["rows"]["train"]
+
+
+def test_cache_key_follows_the_input_and_binning(args):
+    key = cache_key(args)
+    args.num_threads = 8
+    assert cache_key(args) == key
+    args.max_bin = 63
+    assert cache_key(args) != key
+    args.max_bin = 255
+    stat = os.stat(args.input)
+    os.utime(args.input, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1))
+    assert cache_key(args) != key
+
+
+def test_streamed_model_matches_the_in_memory_one(args, tmp_path):
+    cache_dir = tmp_path / "cache" / cache_key(args)
+    train_set, _, meta = build(args, cache_dir, "miss")
+    streamed = train(args, meta, train_set)
+
+    # The same rows and splits, encoded in one batch and binned from an in-memory matrix
+    table = pq.read_table(args.input)
+    encoder = BatchEncoder(table.schema)
+    X, y = encoder.encode(table.combine_chunks().to_batches()[0])
+    u = np.random.default_rng(args.seed).random(len(y))
+    train_rows = u >= args.test_fraction + args.valid_fraction
+    test_rows = u < args.test_fraction
+    assert encoder.categories == meta["categories"]
+    np.testing.assert_array_equal(open_matrix(cache_dir, "test", meta), X[test_rows])
+
+    in_memory = train(args, meta, lgb.Dataset(X[train_rows], y[train_rows], feature_name=encoder.features,
+                                              categorical_feature=list(encoder.categories),
+                                              params=dataset_params(args)))
+    np.testing.assert_allclose(streamed.predict(X[test_rows]), in_memory.predict(X[test_rows]), rtol=0, atol=1e-12)
@@ -0,0 +1,49 @@
+"""Streaming NLP training on batches laid out the way data_ingestion/ingest.py writes them."""
+import pyarrow as pa
+import pytest
+
+import train_nlp_diagnosis as nlp
+
+DESCRIPTIONS = ["General examination", "Follow-up visit", None, "General examination", "Emergency room visit",
+                "Follow-up visit", "General examination", "Follow-up visit"]
+REASONS = ["Hypertension", "Diabetes mellitus", "Hypertension", "Flu", None,
+           "Hypertension", "Acute bronchitis", "Diabetes mellitus"]
+
+
+@pytest.fixture
+def settings(monkeypatch):
+    monkeypatch.setattr(nlp, "_settings", {"seed": 42, "test_fraction": 0.5})
+
+
+def plain_batch() -> pa.RecordBatch:
+    return pa.RecordBatch.from_pydict({nlp.TEXT: pa.array(DESCRIPTIONS, pa.string()),
+                                       nlp.LABEL: pa.array(REASONS, pa.string())})
+
+
+def dictionary_batch() -> pa.RecordBatch:
+    """Both text columns dictionary<int32, string>, as in ingest.py's encounters schema."""
+    batch = plain_batch()
+    return pa.RecordBatch.from_arrays([column.dictionary_encode() for column in batch.columns],
+                                      names=batch.schema.names)
+
+
+def test_count_labels_decodes_dictionaries():
+    result = nlp.count_labels(dictionary_batch(), 0)
+    # Short labels ("Flu") and rows without a description are left out
+    assert result["counts"] == {"Hypertension": 2, "Diabetes mellitus": 2, "Acute bronchitis": 1}
+    assert result["rows"] == len(DESCRIPTIONS)
+    assert result["counts"] == nlp.count_labels(plain_batch(), 0)["counts"]
+
+
+@pytest.mark.parametrize("split", ["train", "test"])
+def test_split_batch_decodes_dictionaries(settings, split):
+    labels = ["Hypertension", "Diabetes mellitus"]
+    got = nlp.split_batch(dictionary_batch(), 3, labels, split)
+    assert got.schema.field(nlp.TEXT).type == pa.string()
+    assert got.equals(nlp.split_batch(plain_batch(), 3, labels, split))
+
+
+def test_splits_cover_the_labelled_rows(settings):
+    labels = ["Hypertension", "Diabetes mellitus"]
+    rows = [nlp.split_batch(dictionary_batch(), 3, labels, split).num_rows for split in ("train", "test")]
+    assert sum(rows) == 4  # top labels with a description
@@ -0,0 +1,75 @@
+"""TreeEvaluator against Booster.predict on both of its code paths."""
+import numpy as np
+import pytest
+
+from api.tree_evaluator import MISSING_NAN, MISSING_ZERO, TreeEvaluator
+
+FEATURES = ["CODE", "lab", "dose", "score", "visits"]
+
+
+def mixed_rows(n: int, seed: int = 0):
+    """A categorical code plus numeric columns with NaNs, exact zeros and ties."""
+    rng = np.random.default_rng(seed)
+    code = rng.integers(0, 8, n).astype(np.float64)
+    lab = rng.normal(5, 2, n)
+    lab[rng.random(n) < 0.1] = np.nan
+    dose = rng.gamma(2, 3, n)
+    dose[rng.random(n) < 0.25] = 0.0
+    score = rng.random(n)
+    visits = rng.integers(0, 12, n).astype(np.float64)
+    logit = (0.6 * np.isin(code, [1, 4, 6]) + 0.3 * np.nan_to_num(lab - 5) - 0.2 * (dose == 0)
+             + 0.1 * dose + np.sin(6 * score) + 0.15 * visits - 2)
+    y = (rng.random(n) < 1 / (1 + np.exp(-logit))).astype(np.float64)
+    return np.column_stack([code, lab, dose, score, visits]), y
+
+
+@pytest.fixture(scope="module")
+def rows():
+    return mixed_rows(20000)
+
+
+@pytest.fixture(scope="module", params=[(15, False), (15, True), (128, False), (128, True)],
+                ids=["masks", "masks-zero_as_missing", "levels", "levels-zero_as_missing"])
+def model(request, rows, trainer):
+    num_leaves, zero_as_missing = request.param
+    X, y = rows
+    booster = trainer(X, y, FEATURES, categorical=["CODE"], rounds=12, num_leaves=num_leaves,
+                      min_data_in_leaf=3, zero_as_missing=zero_as_missing)
+    return booster, TreeEvaluator.from_booster(booster), num_leaves, zero_as_missing
+
+
+def test_branch_and_split_kinds(model):
+    """Each parametrization really exercises what it is named after."""
+    booster, evaluator, num_leaves, zero_as_missing = model
+    assert (evaluator.masks is None) == (num_leaves > 64)
+    assert evaluator.has_categorical
+    internal = evaluator.left != np.arange(len(evaluator.left))
+    missing = evaluator.missing_type[internal]
+    assert (missing == (MISSING_ZERO if zero_as_missing else MISSING_NAN)).any()
+
+
+def test_raw_score_matches_booster(model):
+    booster, evaluator, _, _ = model
+    X, _ = mixed_rows(3000, seed=1)
+    np.testing.assert_allclose(evaluator.raw_score(X), booster.predict(X, raw_score=True), rtol=0, atol=1e-9)
+
+
+def test_probe_rows_match_exactly(model):
+    """Thresholds, the next double up, every category code, zero, +-inf and NaN."""
+    booster, evaluator, _, _ = model
+    evaluator.check(booster, rows=2000)
+
+
+def test_predict_matches_booster(model):
+    booster, evaluator, _, _ = model
+    X, _ = mixed_rows(500, seed=2)
+    np.testing.assert_allclose(evaluator.predict(X), booster.predict(X), rtol=0, atol=1e-9)
+
+
+def test_single_rows(model):
+    """One row at a time takes the pure-Python lookup when masks are compiled."""
+    booster, evaluator, _, _ = model
+    X = np.vstack([mixed_rows(50, seed=3)[0], evaluator.probe_rows(50, seed=4), [[-1.0, 1e-36, -0.0, np.inf, 99]]])
+    for x in X:
+        np.testing.assert_allclose(evaluator.raw_score(x), booster.predict(x[None, :], raw_score=True),
+                                   rtol=0, atol=1e-9)
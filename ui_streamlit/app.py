@@ -1,5 +1,11 @@
+import hashlib
+import io
+
+import pandas as pd
+import requests
 import streamlit as st
-from utils import predict_combined
+from config import CACHE_TTL_S
+from utils import patients_from_frame, predict_combined, results_frame, score_patients
 
 
 
@@ -7,38 +13,83 @@ st.set_page_config(page_title="Readmission Risk AI", layout="centered")
 
 st.title("Diabetes Readmission Predictor")
 
-with st.form("patient_form"):
-    age = st.slider("Age", 18, 100, 60)
-    gender = st.selectbox("Gender", ["male", "female"])
-    race = st.selectbox("Race", ["white", "black", "asian", "hispanic", "other"])
-    complaint = st.text_area("Chief Complaint (optional)")
-
-    submitted = st.form_submit_button("Predict")
-
-if submitted:
-    input_data = {
-        "age": age,
-        "gender": gender.lower(),
-        "race": race.lower(),
-        "chief_complaint": complaint if complaint.strip() else None
-    }
-
-    # Call combined endpoint
-    with st.spinner("Analyzing patient data..."):
-        result = predict_combined(input_data)
-
-    # Display readmission risk
-    st.metric("📊 Readmission Risk", f"{result['readmission_risk']*100:.1f}%")
-    
-    # Display NLP-predicted diagnoses (if complaint was provided)
-    if result.get('predicted_diagnoses') and len(result['predicted_diagnoses']) > 0:
-        st.subheader("🩺 Predicted Diagnoses (from Chief Complaint):")
-        for diag in result['predicted_diagnoses']:
-            st.write(f"• **{diag['diagnosis']}** ({diag['probability']*100:.1f}% confidence)")
-
-    # Display SHAP risk factors
-    st.subheader("📈 Top Risk Factors (SHAP):")
-    for k, v in result['risk_factors'].items():
-        # Format with color based on positive/negative contribution
-        color = "🔴" if v > 0 else "🟢"
-        st.write(f"{color} **{k}**: {v:.3f}")
+
+@st.cache_data(ttl=CACHE_TTL_S, show_spinner=False)
+def cached_predict_combined(payload: dict) -> dict:
+    # Keyed on the payload: resubmitting an unchanged form doesn't call the API again
+    return predict_combined(payload)
+
+
+single_tab, bulk_tab = st.tabs(["Single patient", "Bulk CSV"])
+
+with single_tab:
+    with st.form("patient_form"):
+        age = st.slider("Age", 18, 100, 60)
+        gender = st.selectbox("Gender", ["male", "female"])
+        race = st.selectbox("Race", ["white", "black", "asian", "hispanic", "other"])
+        complaint = st.text_area("Chief Complaint (optional)")
+
+        submitted = st.form_submit_button("Predict")
+
+    if submitted:
+        input_data = {
+            "age": age,
+            "gender": gender.lower(),
+            "race": race.lower(),
+            "chief_complaint": complaint if complaint.strip() else None
+        }
+
+        # Call combined endpoint
+        result = None
+        with st.spinner("Analyzing patient data..."):
+            try:
+                result = cached_predict_combined(input_data)
+            except requests.RequestException as e:
+                st.error(f"Prediction failed: {e}")
+
+        if result is not None:
+            # Display readmission risk
+            st.metric("📊 Readmission Risk", f"{result['readmission_risk']*100:.1f}%")
+
+            # Display NLP-predicted diagnoses (if complaint was provided)
+            if result.get('predicted_diagnoses') and len(result['predicted_diagnoses']) > 0:
+                st.subheader("🩺 Predicted Diagnoses (from Chief Complaint):")
+                for diag in result['predicted_diagnoses']:
+                    st.write(f"• **{diag['diagnosis']}** ({diag['probability']*100:.1f}% confidence)")
+
+            # Display SHAP risk factors
+            st.subheader("📈 Top Risk Factors (SHAP):")
+            for k, v in result['risk_factors'].items():
+                # Format with color based on positive/negative contribution
+                color = "🔴" if v > 0 else "🟢"
+                st.write(f"{color} **{k}**: {v:.3f}")
+
+with bulk_tab:
+    st.write("Upload a CSV with columns `age`, `gender`, `race` and optionally `chief_complaint`.")
+    upload = st.file_uploader("Patients CSV", type="csv")
+    if upload is not None:
+        data = upload.getvalue()
+        upload_key = hashlib.sha1(data).hexdigest()
+        try:
+            patients = patients_from_frame(pd.read_csv(io.BytesIO(data)))
+        except ValueError as e:
+            st.error(str(e))
+            patients = []
+
+        if patients and st.button(f"Score {len(patients)} patients"):
+            progress = st.progress(0.0, text="Scoring...")
+            results = score_patients(
+                patients,
+                on_progress=lambda done, total: progress.progress(done / total, text=f"Scored {done}/{total}"),
+            )
+            # Kept across reruns (e.g. the download click) so the file isn't scored again
+            st.session_state["bulk_results"] = (upload_key, results)
+
+        stored = st.session_state.get("bulk_results")
+        if patients and stored is not None and stored[0] == upload_key:
+            table = results_frame(patients, stored[1])
+            failed = int(table["error"].notna().sum()) if "error" in table else 0
+            if failed:
+                st.warning(f"{failed} of {len(table)} patients could not be scored")
+            st.dataframe(table, use_container_width=True)
+            st.download_button("Download results", table.to_csv(index=False), "readmission_scores.csv", "text/csv")
@@ -1 +1,16 @@
-API_BASE_URL = "https://xzkhp6p0tj.execute-api.us-east-1.amazonaws.com/Prod"
+import os
+
+API_BASE_URL = os.getenv("API_BASE_URL", "https://xzkhp6p0tj.execute-api.us-east-1.amazonaws.com/Prod")
+
+# HTTP client (utils.py): one keep-alive session, retried on connection errors and 429/5xx
+CONNECT_TIMEOUT_S = float(os.getenv("CONNECT_TIMEOUT_S", "3.05"))
+READ_TIMEOUT_S = float(os.getenv("READ_TIMEOUT_S", "30"))  # covers a Lambda cold start
+MAX_RETRIES = int(os.getenv("MAX_RETRIES", "3"))
+RETRY_BACKOFF_S = float(os.getenv("RETRY_BACKOFF_S", "0.5"))
+
+# Identical form submissions are answered from Streamlit's cache for this long
+CACHE_TTL_S = int(os.getenv("CACHE_TTL_S", "600"))
+
+# Bulk CSV mode: patients per /predict_batch call, and calls in flight at once
+BULK_CHUNK_SIZE = int(os.getenv("BULK_CHUNK_SIZE", "50"))
+BULK_CONCURRENCY = int(os.getenv("BULK_CONCURRENCY", "4"))
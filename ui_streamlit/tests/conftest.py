@@ -0,0 +1,82 @@
+"""
+The UI's modules import their siblings; the tests do too. `api` is a local
+HTTP server standing in for API Gateway, scripted per path.
+"""
+import json
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+import pytest
+
+UI_DIR = Path(__file__).parent.parent
+if str(UI_DIR) not in sys.path:
+    sys.path.insert(0, str(UI_DIR))
+
+
+class StubApi:
+    """
+    routes[path] is called with the request's JSON body and returns
+    (status, body) or (status, body, delay_s). Every request is recorded as
+    (path, body, client port): one port per TCP connection.
+    """
+
+    def __init__(self):
+        self.routes = {}
+        self.requests = []
+        self._lock = threading.Lock()
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), self._handler())
+        self.server.daemon_threads = True
+        self.url = f"http://127.0.0.1:{self.server.server_port}"
+
+    def _handler(self):
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"  # keep-alive, as API Gateway does
+
+            def do_POST(self):
+                body = json.loads(self.rfile.read(int(self.headers["Content-Length"])) or b"null")
+                with stub._lock:
+                    stub.requests.append((self.path, body, self.client_address[1]))
+                route = stub.routes.get(self.path)
+                status, response, *delay = route(body) if route else (404, {"detail": "Not Found"})
+                if delay:
+                    time.sleep(delay[0])
+                data = json.dumps(response).encode()
+                try:
+                    self.send_response(status)
+                    self.send_header("Content-Type", "application/json")
+                    self.send_header("Content-Length", str(len(data)))
+                    self.end_headers()
+                    self.wfile.write(data)
+                except (BrokenPipeError, ConnectionResetError):
+                    pass  # the client timed out and hung up
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+    def calls(self, path: str) -> list:
+        return [body for request_path, body, _ in self.requests if request_path == path]
+
+
+@pytest.fixture
+def api(monkeypatch):
+    """A running StubApi, with utils pointed at it, a fresh session and no backoff sleeps."""
+    import utils
+
+    stub = StubApi()
+    thread = threading.Thread(target=stub.server.serve_forever, kwargs={"poll_interval": 0.05}, daemon=True)
+    thread.start()
+    monkeypatch.setattr(utils, "API_BASE_URL", stub.url)
+    monkeypatch.setattr(utils, "RETRY_BACKOFF_S", 0)
+    monkeypatch.setattr(utils, "_session", None)
+    yield stub
+    if utils._session is not None:
+        utils._session.close()
+    stub.server.shutdown()
+    stub.server.server_close()
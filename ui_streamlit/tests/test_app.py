@@ -0,0 +1,83 @@
+"""The Streamlit app's single-patient form, run headless against the stub API."""
+from pathlib import Path
+
+import pytest
+
+streamlit = pytest.importorskip("streamlit")
+from streamlit.testing.v1 import AppTest  # noqa: E402
+
+RESULT = {"readmission_risk": 0.425, "risk_factors": {"age": 0.31, "RACE": -0.05},
+          "predicted_diagnoses": [{"diagnosis": "Hypertension", "probability": 0.61}], "timed_out_stages": []}
+
+
+@pytest.fixture
+def app(api):
+    streamlit.cache_data.clear()
+    at = AppTest.from_file(str(Path(__file__).parent.parent / "app.py"), default_timeout=30)
+    at.run()
+    assert not at.exception
+    return at
+
+
+def submit(at, age: int = 72, complaint: str = "chest pain"):
+    at.slider[0].set_value(age)
+    at.text_area[0].input(complaint)
+    return at.button[0].click().run()
+
+
+def test_prediction_is_shown(app, api):
+    api.routes["/predict_combined"] = lambda body: (200, RESULT)
+    submit(app)
+    assert app.metric[0].value == "42.5%"
+    assert any("Hypertension" in md.value for md in app.markdown)
+    assert api.calls("/predict_combined") == [{"age": 72, "gender": "male", "race": "white",
+                                              "chief_complaint": "chest pain"}]
+
+
+def test_unchanged_form_is_answered_from_the_cache(app, api):
+    api.routes["/predict_combined"] = lambda body: (200, RESULT)
+    submit(app)
+    submit(app)
+    assert len(api.calls("/predict_combined")) == 1
+    submit(app, age=40)
+    assert len(api.calls("/predict_combined")) == 2
+
+
+def test_api_failure_is_reported(app, api, monkeypatch):
+    import utils
+    monkeypatch.setattr(utils, "MAX_RETRIES", 0)
+    api.routes["/predict_combined"] = lambda body: (503, {"message": "Service Unavailable"})
+    submit(app)
+    assert not app.exception
+    assert "Prediction failed" in app.error[0].value
+    assert not app.metric
+
+
+def test_bulk_csv_is_scored_in_order(app, api, monkeypatch):
+    import utils
+    monkeypatch.setattr(utils, "BULK_CHUNK_SIZE", 2)
+
+    def predict_batch(body):
+        detail = [{"row": row, "field": "race", "msg": "unknown category"}
+                  for row, patient in enumerate(body["patients"]) if patient["race"] == "martian"]
+        if detail:
+            return 422, {"detail": detail}
+        return 200, {"results": [{**RESULT, "readmission_risk": patient["age"] / 100} for patient in body["patients"]]}
+
+    api.routes["/predict_batch"] = predict_batch
+    csv = b"age,gender,race,chief_complaint\n30,male,white,\n45,Female,martian,cough\n60,female,black,chest pain\n"
+    app.file_uploader[0].set_value(("patients.csv", csv, "text/csv")).run()
+    next(button for button in app.button if button.label == "Score 3 patients").click().run()
+    assert not app.exception
+
+    table = app.dataframe[0].value
+    assert table["age"].tolist() == [30, 45, 60]
+    assert table["readmission_risk"].iloc[[0, 2]].tolist() == [0.30, 0.60]
+    assert table["error"].iloc[1] == "race: unknown category"
+    assert "1 of 3 patients could not be scored" in app.warning[0].value
+
+    # Reruns (e.g. the download click) show the stored results without scoring again
+    calls = len(api.calls("/predict_batch"))
+    app.run()
+    assert len(api.calls("/predict_batch")) == calls
+    assert app.dataframe[0].value["age"].tolist() == [30, 45, 60]
@@ -0,0 +1,149 @@
+"""The UI's API client against a local stub of the readmission API."""
+import time
+
+import pandas as pd
+import pytest
+import requests
+
+import utils
+
+
+def scored(patient: dict) -> dict:
+    """The stub's /predict_batch result for a patient: risk encodes the age, so order is checkable."""
+    return {"readmission_risk": patient["age"] / 100, "risk_factors": {"age": 0.1},
+            "predicted_diagnoses": [{"diagnosis": "Hypertension", "probability": 0.5}]}
+
+
+def predict_batch(body: dict):
+    """Accepts a batch unless a patient has no age or an unknown race, answering 422 like the API."""
+    detail = []
+    for row, patient in enumerate(body["patients"]):
+        if patient["age"] is None:
+            detail.append({"loc": ["body", "patients", row, "age"], "msg": "Input should be a valid integer"})
+        if patient["race"] == "martian":
+            detail.append({"row": row, "field": "race", "msg": "unknown category 'martian'"})
+    if detail:
+        return 422, {"detail": detail}
+    return 200, {"results": [scored(patient) for patient in body["patients"]]}
+
+
+def patients(n: int) -> list:
+    return [{"age": 20 + i, "gender": "male", "race": "white", "chief_complaint": None} for i in range(n)]
+
+
+def test_session_is_shared_and_connections_reused(api):
+    api.routes["/predict_combined"] = lambda body: (200, scored(body))
+    session = utils.get_session()
+    for age in (40, 50, 60, 70):
+        assert utils.predict_combined({"age": age})["readmission_risk"] == age / 100
+    assert utils.get_session() is session
+    # Sequential calls ride one keep-alive connection
+    assert len({port for _, _, port in api.requests}) == 1
+
+
+def test_5xx_is_retried_with_backoff(api, monkeypatch):
+    monkeypatch.setattr(utils, "RETRY_BACKOFF_S", 0.05)
+    attempts = []
+
+    def flaky(body):
+        attempts.append(time.perf_counter())
+        return (503, {"message": "Service Unavailable"}) if len(attempts) < 4 else (200, scored(body))
+
+    api.routes["/predict_combined"] = flaky
+    assert utils.predict_combined({"age": 55})["readmission_risk"] == 0.55
+    assert len(attempts) == utils.MAX_RETRIES + 1
+    # urllib3 backs off 0, 2 x 0.05, 4 x 0.05 s between the attempts
+    gaps = [b - a for a, b in zip(attempts, attempts[1:])]
+    assert gaps[1] >= 0.1 * 0.9 and gaps[2] >= 0.2 * 0.9
+
+
+def test_5xx_after_the_last_retry_raises(api):
+    api.routes["/predict_combined"] = lambda body: (502, {"message": "Bad Gateway"})
+    with pytest.raises(requests.HTTPError) as error:
+        utils.predict_combined({"age": 55})
+    assert error.value.response.status_code == 502
+    assert len(api.calls("/predict_combined")) == utils.MAX_RETRIES + 1
+
+
+def test_other_errors_are_not_retried(api):
+    api.routes["/predict_combined"] = lambda body: (500, {"detail": "Internal Server Error"})
+    with pytest.raises(requests.HTTPError):
+        utils.predict_combined({"age": 55})
+    assert len(api.calls("/predict_combined")) == 1
+
+
+def test_read_timeout(api, monkeypatch):
+    monkeypatch.setattr(utils, "READ_TIMEOUT_S", 0.2)
+    monkeypatch.setattr(utils, "MAX_RETRIES", 1)
+    api.routes["/predict_combined"] = lambda body: (200, scored(body), 1.0)
+    start = time.perf_counter()
+    with pytest.raises(requests.RequestException):
+        utils.predict_combined({"age": 55})
+    # Each attempt gives up after the read timeout, not the server's delay
+    assert time.perf_counter() - start < 1.0
+    assert len(api.calls("/predict_combined")) == 2
+
+
+def test_bulk_results_keep_input_order(api, monkeypatch):
+    monkeypatch.setattr(utils, "BULK_CHUNK_SIZE", 3)
+    monkeypatch.setattr(utils, "BULK_CONCURRENCY", 3)
+    # Earlier chunks answer later, so chunks finish out of order
+    api.routes["/predict_batch"] = lambda body: (*predict_batch(body), 0.2 if body["patients"][0]["age"] < 26 else 0)
+    progress = []
+    batch = patients(10)
+    results = utils.score_patients(batch, on_progress=lambda done, total: progress.append((done, total)))
+    assert [result["readmission_risk"] for result in results] == [p["age"] / 100 for p in batch]
+    assert sorted(len(call["patients"]) for call in api.calls("/predict_batch")) == [1, 3, 3, 3]
+    assert progress[-1] == (10, 10) and [done for done, _ in progress] == sorted(done for done, _ in progress)
+
+
+def test_bulk_rejected_rows_get_errors_and_the_rest_is_resubmitted(api, monkeypatch):
+    monkeypatch.setattr(utils, "BULK_CHUNK_SIZE", 4)
+    api.routes["/predict_batch"] = predict_batch
+    batch = patients(8)
+    batch[1]["age"] = None
+    batch[2]["race"] = "martian"
+    batch[6]["race"] = "martian"
+    results = utils.score_patients(batch)
+
+    assert results[1] == {"error": "age: Input should be a valid integer"}
+    assert results[2] == {"error": "race: unknown category 'martian'"}
+    assert results[6] == {"error": "race: unknown category 'martian'"}
+    for row in (0, 3, 4, 5, 7):
+        assert results[row]["readmission_risk"] == batch[row]["age"] / 100
+    # Each chunk: one rejected call, then one with only its valid rows
+    assert sorted(len(call["patients"]) for call in api.calls("/predict_batch")) == [2, 3, 4, 4]
+
+
+def test_bulk_failed_chunk_only_fails_its_rows(api, monkeypatch):
+    monkeypatch.setattr(utils, "BULK_CHUNK_SIZE", 2)
+    monkeypatch.setattr(utils, "MAX_RETRIES", 0)
+
+    def route(body):
+        if body["patients"][0]["age"] == 22:
+            return 503, {"message": "Service Unavailable"}
+        return predict_batch(body)
+
+    api.routes["/predict_batch"] = route
+    results = utils.score_patients(patients(6))
+    assert ["error" in result for result in results] == [False, False, True, True, False, False]
+    assert "503" in results[2]["error"]
+
+
+def test_patients_from_frame():
+    df = pd.DataFrame({"age": [65.0, None], "gender": [" Male", "female"], "race": ["White", None],
+                       "chief_complaint": ["chest pain", "  "]})
+    assert utils.patients_from_frame(df) == [
+        {"age": 65, "gender": "male", "race": "white", "chief_complaint": "chest pain"},
+        {"age": None, "gender": "female", "race": None, "chief_complaint": None},
+    ]
+    with pytest.raises(ValueError, match="race"):
+        utils.patients_from_frame(df.drop(columns="race"))
+
+
+def test_results_frame():
+    batch = patients(2)
+    table = utils.results_frame(batch, [scored(batch[0]), {"error": "race: unknown category"}])
+    assert table["readmission_risk"].iloc[0] == 0.2 and pd.isna(table["readmission_risk"].iloc[1])
+    assert table["top_risk_factor"].iloc[0] == "age" and table["top_diagnosis"].iloc[0] == "Hypertension"
+    assert table["error"].iloc[1] == "race: unknown category" and pd.isna(table["error"].iloc[0])
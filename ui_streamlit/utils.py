@@ -1,32 +1,164 @@
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+import pandas as pd
 import requests
-from config import API_BASE_URL
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 
-def predict(payload):
-    """Legacy endpoint for structured risk prediction only"""
-    url = f"{API_BASE_URL}/predict"
-    r = requests.post(url, json=payload)
-    print(f"Status: {r.status_code}")
-    print(f"Response text: {r.text}")
+from config import (API_BASE_URL, BULK_CHUNK_SIZE, BULK_CONCURRENCY, CONNECT_TIMEOUT_S, MAX_RETRIES,
+                    READ_TIMEOUT_S, RETRY_BACKOFF_S)
+
+logger = logging.getLogger(__name__)
+
+_session = None
+_session_lock = threading.Lock()
+
+
+def get_session() -> requests.Session:
+    """
+    One keep-alive Session for the whole app (Streamlit reruns the script, not
+    the process), so TLS handshakes to API Gateway happen once per pooled
+    connection instead of once per call.
+    """
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                # Predictions have no side effects, so POSTs are safe to retry
+                retry = Retry(total=MAX_RETRIES, backoff_factor=RETRY_BACKOFF_S,
+                              status_forcelist=(429, 502, 503, 504),
+                              allowed_methods=frozenset({"GET", "POST"}), raise_on_status=False)
+                adapter = HTTPAdapter(max_retries=retry, pool_connections=1, pool_maxsize=max(BULK_CONCURRENCY, 1))
+                session = requests.Session()
+                session.mount("http://", adapter)
+                session.mount("https://", adapter)
+                _session = session
+    return _session
+
+
+def _post(path: str, payload: dict) -> dict:
+    r = get_session().post(f"{API_BASE_URL}{path}", json=payload, timeout=(CONNECT_TIMEOUT_S, READ_TIMEOUT_S))
+    logger.debug(f"POST {path}: {r.status_code} in {r.elapsed.total_seconds() * 1000:.0f} ms")
     r.raise_for_status()
     return r.json()
 
+
+def predict(payload):
+    """Legacy endpoint for structured risk prediction only"""
+    return _post("/predict", payload)
+
+
 def explain(payload):
     """Legacy endpoint for SHAP explanations only"""
-    url = f"{API_BASE_URL}/explain"
-    r = requests.post(url, json=payload)
-    print(f"Status: {r.status_code}")
-    print(f"Response text: {r.text}")
-    r.raise_for_status()
-    return r.json()
+    return _post("/explain", payload)
+
 
 def predict_combined(payload):
     """
     Combined endpoint: Returns structured risk + SHAP + NLP diagnoses.
     Payload should include: age, gender, race, chief_complaint (optional)
     """
-    url = f"{API_BASE_URL}/predict_combined"
-    r = requests.post(url, json=payload)
-    print(f"Status: {r.status_code}")
-    print(f"Response text: {r.text}")
-    r.raise_for_status()
-    return r.json()
\ No newline at end of file
+    return _post("/predict_combined", payload)
+
+
+def patients_from_frame(df) -> list:
+    """
+    CSV rows -> /predict_combined payloads (age, gender, race, optional
+    chief_complaint). Blank cells become None, so the API rejects just that row.
+    """
+    missing = [field for field in ("age", "gender", "race") if field not in df.columns]
+    if missing:
+        raise ValueError(f"CSV is missing column(s): {', '.join(missing)}")
+    # NaN is not valid JSON; empty cells go out as null
+    df = df.astype(object).where(df.notna(), None)
+    patients = []
+    for record in df.to_dict("records"):
+        age = record["age"]
+        complaint = record.get("chief_complaint")
+        patients.append({
+            "age": int(age) if isinstance(age, float) and age.is_integer() else age,
+            "gender": str(record["gender"]).strip().lower() if record["gender"] is not None else None,
+            "race": str(record["race"]).strip().lower() if record["race"] is not None else None,
+            "chief_complaint": complaint if isinstance(complaint, str) and complaint.strip() else None,
+        })
+    return patients
+
+
+def _rejected_rows(response: requests.Response) -> dict:
+    """Chunk row -> message from a 422: feature-spec errors carry "row", pydantic ones a body location."""
+    rejected = {}
+    for error in response.json().get("detail", []):
+        row = error.get("row")
+        loc = error.get("loc", [])
+        if row is None and len(loc) > 2 and loc[:2] == ["body", "patients"]:
+            row = loc[2]
+        if row is not None:
+            field = error.get("field") or loc[-1]
+            rejected.setdefault(row, []).append(f"{field}: {error.get('msg')}")
+    return {row: "; ".join(messages) for row, messages in rejected.items()}
+
+
+def _score_chunk(patients: list) -> list:
+    """One /predict_batch call; rows the API rejects get {"error"} and the rest are resubmitted once."""
+    try:
+        return _post("/predict_batch", {"patients": patients})["results"]
+    except requests.HTTPError as e:
+        if e.response is None or e.response.status_code != 422:
+            raise
+        rejected = _rejected_rows(e.response)
+        if not rejected:
+            raise
+    results = [{"error": rejected[row]} if row in rejected else None for row in range(len(patients))]
+    valid = [row for row in range(len(patients)) if row not in rejected]
+    if valid:
+        scored = _post("/predict_batch", {"patients": [patients[row] for row in valid]})["results"]
+        for row, result in zip(valid, scored):
+            results[row] = result
+    return results
+
+
+def score_patients(patients: list, on_progress=None) -> list:
+    """
+    Score many patients through /predict_batch, BULK_CHUNK_SIZE per call and
+    BULK_CONCURRENCY calls in flight. Returns one result per patient in input
+    order; a patient whose chunk failed gets {"error": message} instead.
+
+    on_progress(done, total) is called from the calling thread as chunks
+    finish, so it may update Streamlit elements.
+    """
+    chunks = [(start, patients[start:start + BULK_CHUNK_SIZE]) for start in range(0, len(patients), BULK_CHUNK_SIZE)]
+    results = [None] * len(patients)
+    done = 0
+    with ThreadPoolExecutor(max_workers=max(BULK_CONCURRENCY, 1)) as pool:
+        futures = {pool.submit(_score_chunk, chunk): (start, chunk) for start, chunk in chunks}
+        for future in as_completed(futures):
+            start, chunk = futures[future]
+            try:
+                chunk_results = future.result()
+            except requests.RequestException as e:
+                logger.warning(f"Patients {start}-{start + len(chunk) - 1} failed: {e}")
+                chunk_results = [{"error": str(e)} for _ in chunk]
+            results[start:start + len(chunk)] = chunk_results
+            done += len(chunk)
+            if on_progress is not None:
+                on_progress(done, len(patients))
+    return results
+
+
+def results_frame(patients: list, results: list) -> pd.DataFrame:
+    """One row per patient: inputs, risk, strongest SHAP factor and top diagnosis (or the error)."""
+    rows = []
+    for patient, result in zip(patients, results):
+        row = {field: patient[field] for field in ("age", "gender", "race")}
+        if "error" in result:
+            row["error"] = result["error"]
+        else:
+            factors = result.get("risk_factors") or {}
+            diagnoses = result.get("predicted_diagnoses") or []
+            row["readmission_risk"] = result["readmission_risk"]
+            row["top_risk_factor"] = next(iter(factors), None)
+            row["top_diagnosis"] = diagnoses[0]["diagnosis"] if diagnoses else None
+        rows.append(row)
+    return pd.DataFrame(rows)